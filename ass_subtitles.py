@@ -0,0 +1,126 @@
+"""
+Write timed text overlays as a single ASS subtitle track.
+ffmpeg's `subtitles` filter (libass) then draws every segment in one node,
+so per-frame cost no longer grows with the number of text segments.
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Named colors used by the overlay styles, as (R, G, B)
+COLORS = {
+    'white': (0xFF, 0xFF, 0xFF),
+    'gold': (0xFF, 0xD7, 0x00),
+    'black': (0x00, 0x00, 0x00),
+}
+
+# Side margins for libass auto-wrapping (pixels at PlayRes)
+SIDE_MARGIN = 60
+
+# Static overlays have no end time; show them for the whole video
+STATIC_END = 10 * 3600 - 0.01
+
+
+def ass_color(name: str, alpha: float = 1.0) -> str:
+    """Convert a named color and opacity to ASS &HAABBGGRR notation."""
+    r, g, b = COLORS.get(name, COLORS['white'])
+    transparency = round((1.0 - alpha) * 255)
+    return f"&H{transparency:02X}{b:02X}{g:02X}{r:02X}"
+
+
+def ass_timestamp(seconds: float) -> str:
+    """Format seconds as an ASS timestamp (h:mm:ss.cc)."""
+    centiseconds = int(round(max(seconds, 0) * 100))
+    hours, centiseconds = divmod(centiseconds, 360000)
+    minutes, centiseconds = divmod(centiseconds, 6000)
+    secs, centiseconds = divmod(centiseconds, 100)
+    return f"{hours}:{minutes:02d}:{secs:02d}.{centiseconds:02d}"
+
+
+def escape_ass_text(text: str) -> str:
+    """Escape characters that ASS treats as markup."""
+    # Braces open override blocks and backslashes start tags; swap in look-alikes
+    escaped = text.replace('\\', '⧵').replace('{', '｛').replace('}', '｝')
+    return escaped.replace('\n', r'\N')
+
+
+def style_line(name: str, style: Dict, font_name: str, height: int) -> str:
+    """Build one [V4+ Styles] line from an overlay style."""
+    y = style.get('y')
+    if y is None:
+        alignment, margin_v = 5, 0  # Middle center
+    elif y >= 0:
+        alignment, margin_v = 8, y  # Top center, y pixels from the top
+    else:
+        alignment, margin_v = 8, height + y  # Top center, measured from the bottom edge
+
+    return (
+        f"Style: {name},{font_name},{style['fontsize']},"
+        f"{ass_color(style.get('color', 'white'), style.get('alpha', 1.0))},&H000000FF,"
+        f"{ass_color(style.get('border_color', 'black'))},&H00000000,"
+        f"0,0,0,0,100,100,0,0,1,{style.get('border', 2)},0,"
+        f"{alignment},{SIDE_MARGIN},{SIDE_MARGIN},{margin_v},1"
+    )
+
+
+def write_ass_file(
+    items: List[Dict],
+    styles: Dict[str, Dict],
+    output_path: Path,
+    font_name: str,
+    width: int,
+    height: int
+) -> Optional[Path]:
+    """
+    Write overlay items to an ASS file.
+
+    Args:
+        items: Overlay items with 'style', 'text', and optional 'start'/'end' seconds
+        styles: Style definitions keyed by style name
+        output_path: Where to write the .ass file
+        font_name: Font family name libass should use
+        width: Video width (PlayResX)
+        height: Video height (PlayResY)
+
+    Returns:
+        Path to the written file, or None on failure
+    """
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {width}",
+        f"PlayResY: {height}",
+        "WrapStyle: 0",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+        "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+        "Alignment, MarginL, MarginR, MarginV, Encoding",
+    ]
+    used_styles = []
+    for item in items:
+        if item['style'] not in used_styles:
+            used_styles.append(item['style'])
+    lines += [style_line(name, styles[name], font_name, height) for name in used_styles]
+
+    lines += [
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+    for item in items:
+        start = item.get('start') or 0
+        end = item.get('end')
+        lines.append(
+            f"Dialogue: 0,{ass_timestamp(start)},{ass_timestamp(STATIC_END if end is None else end)},"
+            f"{item['style']},,0,0,0,,{escape_ass_text(item['text'])}"
+        )
+
+    try:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+        return output_path
+    except Exception as e:
+        print(f"Error writing subtitles {output_path}: {e}")
+        return None
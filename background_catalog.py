@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Compiled, indexed catalog of approved background videos.
+approved_videos.json is compiled once into a SQLite file in the media cache
+directory and recompiled only when the JSON changes (mtime or size). Every
+facet value (category, orientation, resolution, duration) gets a dense
+bucket of positions, so picking a random background is a count lookup plus
+one primary-key read instead of parsing ~800 KB of JSON per render.
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from media_cache import CACHE_DIR
+
+APPROVED_VIDEOS_FILE = Path("approved_videos.json")
+CATALOG_PATH = Path(os.environ.get("BACKGROUND_CATALOG", str(CACHE_DIR / "background_catalog.sqlite3")))
+
+# Bump when the schema or bucketing rules change so old catalogs are recompiled
+CATALOG_VERSION = 1
+
+# Facets with a precomputed bucket index, plus "all" (a single bucket holding every video)
+FACETS = ("category", "orientation", "resolution", "duration")
+
+# Attempts at rejection sampling before falling back to a filtered SQL scan
+MAX_SAMPLE_ATTEMPTS = 32
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE videos (
+    pos INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    category TEXT NOT NULL,
+    orientation TEXT NOT NULL,
+    resolution TEXT NOT NULL,
+    duration TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE TABLE buckets (
+    facet TEXT NOT NULL,
+    value TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    pos INTEGER NOT NULL,
+    PRIMARY KEY (facet, value, idx)
+) WITHOUT ROWID;
+CREATE TABLE bucket_sizes (
+    facet TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (facet, value)
+) WITHOUT ROWID;
+"""
+
+
+def orientation_bucket(video: Dict) -> str:
+    """portrait / landscape / square (from dimensions, falling back to is_portrait)."""
+    width, height = video.get('width') or 0, video.get('height') or 0
+    if width and height:
+        if width == height:
+            return 'square'
+        return 'portrait' if height > width else 'landscape'
+    return 'portrait' if video.get('is_portrait') else 'landscape'
+
+
+def resolution_bucket(video: Dict) -> str:
+    """Resolution class by the short side: 2160p / 1440p / 1080p / 720p / sd / unknown."""
+    short_side = min(video.get('width') or 0, video.get('height') or 0)
+    if not short_side:
+        return 'unknown'
+    for threshold, name in ((2160, '2160p'), (1440, '1440p'), (1080, '1080p'), (720, '720p')):
+        if short_side >= threshold * 0.95:
+            return name
+    return 'sd'
+
+
+def duration_bucket(video: Dict) -> str:
+    """Clip length class: short (<30s) / medium (30-59s) / long (60s+) / unknown."""
+    duration = video.get('duration') or 0
+    if not duration:
+        return 'unknown'
+    if duration < 30:
+        return 'short'
+    if duration < 60:
+        return 'medium'
+    return 'long'
+
+
+def video_facets(video: Dict) -> Dict[str, str]:
+    """Facet values for one approved video."""
+    return {
+        'category': str(video.get('category') or 'uncategorized'),
+        'orientation': orientation_bucket(video),
+        'resolution': resolution_bucket(video),
+        'duration': duration_bucket(video),
+    }
+
+
+def source_signature(source_path: Path) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of the source JSON, or None if it is missing."""
+    try:
+        stat = source_path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def compile_catalog(source_path: Path, catalog_path: Path) -> int:
+    """
+    Compile approved_videos.json into a SQLite catalog (atomic replace).
+
+    Returns:
+        Number of videos compiled
+    """
+    signature = source_signature(source_path)
+    with open(source_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    videos = data.get('approved_videos', data.get('videos', []))
+
+    catalog_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=catalog_path.parent, prefix=f".{catalog_path.name}-", suffix=".tmp")
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.executescript(SCHEMA)
+            buckets: Dict[Tuple[str, str], List[int]] = {}
+            seen = set()
+            pos = 0
+            for video in videos:
+                video_id = str(video.get('id'))
+                if video.get('id') is None or video_id in seen:
+                    continue
+                seen.add(video_id)
+                if 'video_url' not in video and 'url' in video:
+                    video['video_url'] = video['url']
+                facets = video_facets(video)
+                conn.execute(
+                    "INSERT INTO videos (pos, id, category, orientation, resolution, duration, record) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (pos, video_id, facets['category'], facets['orientation'], facets['resolution'],
+                     facets['duration'], json.dumps(video, ensure_ascii=False))
+                )
+                buckets.setdefault(('all', ''), []).append(pos)
+                for facet in FACETS:
+                    buckets.setdefault((facet, facets[facet]), []).append(pos)
+                pos += 1
+
+            for (facet, value), positions in buckets.items():
+                conn.executemany(
+                    "INSERT INTO buckets (facet, value, idx, pos) VALUES (?, ?, ?, ?)",
+                    ((facet, value, idx, p) for idx, p in enumerate(positions))
+                )
+                conn.execute(
+                    "INSERT INTO bucket_sizes (facet, value, size) VALUES (?, ?, ?)",
+                    (facet, value, len(positions))
+                )
+            meta = {
+                'version': str(CATALOG_VERSION),
+                'source': str(source_path),
+                'source_mtime_ns': str(signature[0]) if signature else '',
+                'source_size': str(signature[1]) if signature else '',
+                'count': str(pos),
+            }
+            conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", meta.items())
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(tmp_path, catalog_path)
+    except Exception:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return pos
+
+
+class BackgroundCatalog:
+    """
+    Read side of the compiled catalog.
+
+    Keeps one SQLite connection open for the life of the process and
+    recompiles the catalog whenever the source JSON changes. Safe to
+    share between threads of one process.
+    """
+
+    def __init__(self, source_path: Path = APPROVED_VIDEOS_FILE, catalog_path: Path = CATALOG_PATH):
+        self.source_path = Path(source_path)
+        self.catalog_path = Path(catalog_path)
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._signature: Optional[Tuple[int, int]] = None
+
+    def _is_current(self, conn: sqlite3.Connection, signature: Tuple[int, int]) -> bool:
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        except sqlite3.DatabaseError:
+            return False
+        return (
+            meta.get('version') == str(CATALOG_VERSION)
+            and meta.get('source_mtime_ns') == str(signature[0])
+            and meta.get('source_size') == str(signature[1])
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open connection to an up-to-date catalog, recompiling if the source changed."""
+        with self._lock:
+            signature = source_signature(self.source_path)
+            if signature is None:
+                raise FileNotFoundError(f"{self.source_path} not found")
+            if self._conn is not None and signature == self._signature:
+                return self._conn
+
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+            conn = None
+            if self.catalog_path.exists():
+                conn = sqlite3.connect(str(self.catalog_path), check_same_thread=False)
+                if not self._is_current(conn, signature):
+                    conn.close()
+                    conn = None
+            if conn is None:
+                count = compile_catalog(self.source_path, self.catalog_path)
+                print(f"Compiled background catalog: {count} videos -> {self.catalog_path}")
+                conn = sqlite3.connect(str(self.catalog_path), check_same_thread=False)
+
+            self._conn = conn
+            self._signature = signature
+            return conn
+
+    def count(self, filters: Optional[Dict[str, str]] = None) -> int:
+        """Number of videos matching every facet filter."""
+        filters = self._clean_filters(filters)
+        with self._lock:
+            conn = self._connection()
+            if len(filters) <= 1:
+                facet, value = next(iter(filters.items()), ('all', ''))
+                row = conn.execute(
+                    "SELECT size FROM bucket_sizes WHERE facet = ? AND value = ?", (facet, value)
+                ).fetchone()
+                return row[0] if row else 0
+            where, params = self._where(filters)
+            return conn.execute(f"SELECT COUNT(*) FROM videos WHERE {where}", params).fetchone()[0]
+
+    def facet_values(self, facet: str) -> Dict[str, int]:
+        """Bucket sizes for one facet (value -> number of videos)."""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT value, size FROM bucket_sizes WHERE facet = ? ORDER BY value", (facet,)
+            ).fetchall()
+        return dict(rows)
+
+    def get(self, video_id: str) -> Optional[Dict]:
+        """Look up one video by id."""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT record FROM videos WHERE id = ?", (str(video_id),)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def sample(self, filters: Optional[Dict[str, str]] = None, rng: Optional[random.Random] = None) -> Optional[Dict]:
+        """
+        Pick a uniformly random video matching every facet filter.
+
+        Args:
+            filters: Facet -> value, e.g. {'category': 'water', 'orientation': 'landscape'}
+            rng: Random source (defaults to the module-level generator)
+
+        Returns:
+            Video record, or None if nothing matches
+        """
+        rng = rng or random
+        filters = self._clean_filters(filters)
+        with self._lock:
+            conn = self._connection()
+            # Draw from the smallest matching bucket and check the remaining facets
+            sizes = []
+            for facet, value in (filters.items() or [('all', '')]):
+                row = conn.execute(
+                    "SELECT size FROM bucket_sizes WHERE facet = ? AND value = ?", (facet, value)
+                ).fetchone()
+                if not row:
+                    return None
+                sizes.append((row[0], facet, value))
+            size, facet, value = min(sizes)
+
+            for _ in range(MAX_SAMPLE_ATTEMPTS if len(filters) > 1 else 1):
+                row = conn.execute(
+                    "SELECT v.category, v.orientation, v.resolution, v.duration, v.record "
+                    "FROM buckets b JOIN videos v ON v.pos = b.pos "
+                    "WHERE b.facet = ? AND b.value = ? AND b.idx = ?",
+                    (facet, value, rng.randrange(size))
+                ).fetchone()
+                if row and all(row[FACETS.index(f)] == v for f, v in filters.items()):
+                    return json.loads(row[4])
+
+            # Sparse intersection: pick by offset among the exact matches
+            where, params = self._where(filters)
+            total = conn.execute(f"SELECT COUNT(*) FROM videos WHERE {where}", params).fetchone()[0]
+            if not total:
+                return None
+            row = conn.execute(
+                f"SELECT record FROM videos WHERE {where} ORDER BY pos LIMIT 1 OFFSET ?",
+                params + [rng.randrange(total)]
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def iter_videos(self, filters: Optional[Dict[str, str]] = None) -> Iterator[Dict]:
+        """Iterate matching videos in source order."""
+        filters = self._clean_filters(filters)
+        where, params = self._where(filters) if filters else ("1", [])
+        with self._lock:
+            rows = self._connection().execute(
+                f"SELECT record FROM videos WHERE {where} ORDER BY pos", params
+            ).fetchall()
+        for row in rows:
+            yield json.loads(row[0])
+
+    @staticmethod
+    def _clean_filters(filters: Optional[Dict[str, str]]) -> Dict[str, str]:
+        filters = {k: str(v) for k, v in (filters or {}).items() if v is not None}
+        unknown = set(filters) - set(FACETS)
+        if unknown:
+            raise ValueError(f"Unknown catalog facets {sorted(unknown)} (expected {FACETS})")
+        return filters
+
+    @staticmethod
+    def _where(filters: Dict[str, str]) -> Tuple[str, List]:
+        return " AND ".join(f"{facet} = ?" for facet in filters), list(filters.values())
+
+
+_catalog: Optional[BackgroundCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> BackgroundCatalog:
+    """Get the shared background catalog (one open connection per process)."""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = BackgroundCatalog()
+        return _catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile and inspect the background video catalog')
+    parser.add_argument('--rebuild', action='store_true', help='Recompile even if the catalog is current')
+    parser.add_argument('--sample', type=int, default=0, help='Print N random picks')
+    for facet in FACETS:
+        parser.add_argument(f'--{facet}', type=str, help=f'Filter by {facet}')
+    args = parser.parse_args()
+
+    catalog = get_catalog()
+    if args.rebuild:
+        count = compile_catalog(catalog.source_path, catalog.catalog_path)
+        print(f"Compiled background catalog: {count} videos -> {catalog.catalog_path}")
+
+    print(f"Catalog: {catalog.catalog_path} ({catalog.count()} videos)")
+    for facet in FACETS:
+        buckets = ", ".join(f"{value}={size}" for value, size in catalog.facet_values(facet).items())
+        print(f"  {facet}: {buckets}")
+
+    filters = {facet: getattr(args, facet) for facet in FACETS if getattr(args, facet)}
+    if filters:
+        print(f"Matching {filters}: {catalog.count(filters)}")
+    for _ in range(args.sample):
+        video = catalog.sample(filters)
+        print(f"  {video['id'] if video else None}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Scored background selection.
+Instead of a uniform random pick, a handful of candidates is sampled from
+the background catalog and each one is scored by a set of weighted scorers:
+clips that cover the recitation without looping, portrait or near-1080p
+sources (less to decode and scale), clips with a prepared proxy, and clips
+that were not used recently. Scorers are plain functions registered in
+SCORERS; weights come from DEFAULT_WEIGHTS, overridden by the
+BACKGROUND_POLICY_WEIGHTS environment variable (inline JSON or a path to a
+JSON file).
+"""
+
+import json
+import os
+import random
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+
+from background_catalog import BackgroundCatalog
+from media_cache import STATE_DIR
+
+# Candidates sampled per selection (1 = plain random pick)
+POLICY_CANDIDATES = int(os.environ.get("BACKGROUND_POLICY_CANDIDATES", "16"))
+
+# Recently used background ids, newest last
+RECENT_BACKGROUNDS_FILE = STATE_DIR / "recent_backgrounds.json"
+RECENT_BACKGROUNDS_LIMIT = int(os.environ.get("RECENT_BACKGROUNDS_LIMIT", "50"))
+
+# Output frame the renderer scales every background to
+TARGET_PIXELS = 1080 * 1920
+
+DEFAULT_WEIGHTS = {
+    'duration': 3.0,
+    'orientation': 1.0,
+    'resolution': 1.5,
+    'proxy': 2.0,
+    'recency': 4.0,
+}
+
+_recent_lock = threading.Lock()
+
+
+# ----------------------------------------------------------------------
+# Scorers: (video, context) -> score in [0, 1]
+# ----------------------------------------------------------------------
+
+def score_duration(video: Dict, context: Dict) -> float:
+    """1.0 when the clip covers the whole recitation, less the more it has to loop."""
+    target = context.get('target_seconds') or 0
+    duration = video.get('duration') or 0
+    if not target:
+        return 1.0
+    if not duration:
+        return 0.5
+    return min(1.0, duration / target)
+
+
+def score_orientation(video: Dict, context: Dict) -> float:
+    """Portrait sources need no crop of the long side; landscape throws most pixels away."""
+    width, height = video.get('width') or 0, video.get('height') or 0
+    if width and height:
+        if height > width:
+            return 1.0
+        return 0.5 if height == width else 0.0
+    return 1.0 if video.get('is_portrait') else 0.0
+
+
+def score_resolution(video: Dict, context: Dict) -> float:
+    """Prefer sources close to the output frame: 4K costs ~4x the decode and scale work."""
+    width, height = video.get('width') or 0, video.get('height') or 0
+    if not width or not height:
+        return 0.5
+    pixels = width * height
+    if pixels >= TARGET_PIXELS:
+        return TARGET_PIXELS / pixels
+    # Smaller sources decode fast but have to be upscaled
+    return 0.5 * pixels / TARGET_PIXELS
+
+
+def score_proxy(video: Dict, context: Dict) -> float:
+    """A prepared proxy skips download, scale, crop and color adjustment entirely."""
+    return 1.0 if str(video.get('id')) in context.get('proxy_ids', set()) else 0.0
+
+
+def score_recency(video: Dict, context: Dict) -> float:
+    """0.0 for the clip used last, rising to 1.0 for clips outside the recent window."""
+    recent = context.get('recent_ids') or []
+    video_id = str(video.get('id'))
+    if video_id not in recent:
+        return 1.0
+    # recent is oldest first: the last entry (just used) scores 0.0, the oldest the most
+    return (len(recent) - 1 - recent.index(video_id)) / len(recent)
+
+
+SCORERS: Dict[str, Callable[[Dict, Dict], float]] = {
+    'duration': score_duration,
+    'orientation': score_orientation,
+    'resolution': score_resolution,
+    'proxy': score_proxy,
+    'recency': score_recency,
+}
+
+
+def register_scorer(name: str, scorer: Callable[[Dict, Dict], float], weight: float = 1.0):
+    """Add (or replace) a scorer; its default weight can still be overridden from the environment."""
+    SCORERS[name] = scorer
+    DEFAULT_WEIGHTS[name] = weight
+
+
+def load_weights() -> Dict[str, float]:
+    """Scorer weights: DEFAULT_WEIGHTS overridden by BACKGROUND_POLICY_WEIGHTS."""
+    weights = dict(DEFAULT_WEIGHTS)
+    raw = os.environ.get("BACKGROUND_POLICY_WEIGHTS", "").strip()
+    if not raw:
+        return weights
+    try:
+        if not raw.startswith('{'):
+            raw = Path(raw).read_text(encoding='utf-8')
+        overrides = json.loads(raw)
+        for name, weight in overrides.items():
+            if name not in SCORERS:
+                print(f"Ignoring weight for unknown background scorer: {name}")
+                continue
+            weights[name] = float(weight)
+    except Exception as e:
+        print(f"Could not read BACKGROUND_POLICY_WEIGHTS ({e}), using defaults")
+    return weights
+
+
+# ----------------------------------------------------------------------
+# Recent-use history
+# ----------------------------------------------------------------------
+
+def load_recent_backgrounds() -> List[str]:
+    """Recently used background ids, oldest first."""
+    try:
+        with open(RECENT_BACKGROUNDS_FILE, 'r', encoding='utf-8') as f:
+            return [str(video_id) for video_id in json.load(f).get('recent', [])]
+    except FileNotFoundError:
+        return []
+    except Exception as e:
+        print(f"Recent backgrounds unreadable ({e}), starting empty")
+        return []
+
+
+def record_background_use(video_id: str):
+    """Append a background to the recent-use history (atomic rewrite)."""
+    video_id = str(video_id)
+    with _recent_lock:
+        recent = [v for v in load_recent_backgrounds() if v != video_id] + [video_id]
+        recent = recent[-RECENT_BACKGROUNDS_LIMIT:]
+        try:
+            RECENT_BACKGROUNDS_FILE.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=RECENT_BACKGROUNDS_FILE.parent, prefix=".recent-", suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'recent': recent}, f)
+            os.replace(tmp_path, RECENT_BACKGROUNDS_FILE)
+        except Exception as e:
+            print(f"Could not save recent backgrounds: {e}")
+
+
+# ----------------------------------------------------------------------
+# Selection
+# ----------------------------------------------------------------------
+
+def score_video(video: Dict, context: Dict, weights: Dict[str, float]) -> Dict[str, float]:
+    """Per-scorer scores plus the weighted 'total'."""
+    scores = {name: scorer(video, context) for name, scorer in SCORERS.items() if weights.get(name)}
+    scores['total'] = sum(weights[name] * score for name, score in scores.items())
+    return scores
+
+
+def select_background(
+    catalog: BackgroundCatalog,
+    target_seconds: float = 0,
+    proxy_ids: Optional[Set[str]] = None,
+    filters: Optional[Dict[str, str]] = None,
+    candidates: Optional[int] = None,
+    rng: Optional[random.Random] = None
+) -> Optional[Dict]:
+    """
+    Pick the best-scoring background among randomly sampled candidates.
+
+    Args:
+        catalog: Background catalog to sample from
+        target_seconds: Recitation length the clip should cover
+        proxy_ids: Ids of backgrounds with a prepared proxy
+        filters: Catalog facet filters applied before scoring
+        candidates: Number of candidates to sample (default POLICY_CANDIDATES)
+        rng: Random source
+
+    Returns:
+        Video record with a '_scores' breakdown, or None if nothing matches
+    """
+    rng = rng or random
+    sample_size = max(1, candidates or POLICY_CANDIDATES)
+    pool = {}
+    for _ in range(sample_size):
+        video = catalog.sample(filters, rng)
+        if video is None:
+            return None
+        pool.setdefault(str(video.get('id')), video)
+
+    context = {
+        'target_seconds': target_seconds,
+        'proxy_ids': {str(v) for v in (proxy_ids or ())},
+        'recent_ids': load_recent_backgrounds(),
+    }
+    weights = load_weights()
+    scored = [(score_video(video, context, weights), video) for video in pool.values()]
+    best_total = max(scores['total'] for scores, _ in scored)
+    # Break ties randomly so equally good clips share the load
+    scores, video = rng.choice([item for item in scored if item[0]['total'] >= best_total - 1e-9])
+    video['_scores'] = {name: round(value, 3) for name, value in scores.items()}
+    return video
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the render pipeline.
+
+Builds synthetic groups with sine-tone ayah audio (FFmpeg lavfi), word segment
+timings and Arabic/English text, plus synthetic background clips. It then
+renders them with process_group across a sweep of:
+- group sizes (ayahs)
+- segments per ayah (words)
+- encoder profiles
+- overlay backends
+
+The media is served from a loopback server (local_server.py), so the
+download path is exercised without any network.
+
+Every render runs in its own worker process with a fresh media cache, so runs
+are cold and independent. Each result records:
+- the wall time of every stage (from the run_report spans)
+- the peak RSS of the worker and of its FFmpeg children
+- the output size and encode speed
+
+The results form a JSON baseline (bench/results/<commit>.json by default).
+Compare two baselines with --compare.
+
+Examples:
+  # Default sweep
+  python bench/render_bench.py
+
+  # Custom sweep, 3 runs per case (medians are kept)
+  python bench/render_bench.py --sizes 3,10 --segments 4,12 --profiles fast,archive --backends drawtext,ass,png --repeat 3
+
+  # What changed between two commits (exit status 1 on a regression)
+  python bench/render_bench.py --compare bench/results/old.json bench/results/new.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+BENCH_WORK_DIR = Path(os.environ.get("BENCH_WORK_DIR", str(REPO_DIR / ".cache" / "bench")))
+BENCH_RESULTS_DIR = REPO_DIR / "bench" / "results"
+
+# Default sweep
+BENCH_SIZES = (3, 8)
+BENCH_SEGMENTS = (4, 12)
+BENCH_PROFILES = ("fast",)
+BENCH_BACKENDS = ("drawtext", "ass", "png")
+BENCH_AYAH_SECONDS = float(os.environ.get("BENCH_AYAH_SECONDS", "3"))
+BENCH_BACKGROUND_SECONDS = 10
+
+# A case is a regression when it gets this much slower (or bigger)
+BENCH_THRESHOLD = float(os.environ.get("BENCH_THRESHOLD", "0.10"))
+
+BENCH_RECITER = "AbdulBaset AbdulSamad"
+ARABIC_WORDS = ("بِسْمِ", "ٱللَّهِ", "ٱلرَّحْمَٰنِ", "ٱلرَّحِيمِ", "ٱلْحَمْدُ", "لِلَّهِ", "رَبِّ", "ٱلْعَٰلَمِينَ",
+                "مَٰلِكِ", "يَوْمِ", "ٱلدِّينِ", "إِيَّاكَ", "نَعْبُدُ", "وَإِيَّاكَ", "نَسْتَعِينُ")
+ENGLISH_WORDS = ("In the name of Allah the Entirely Merciful the Especially Merciful all praise is due to "
+                 "Allah Lord of the worlds Sovereign of the Day of Recompense").split()
+BACKGROUNDS = {'bench_landscape': (1920, 1080), 'bench_portrait': (1080, 1920)}
+
+# Repo files the renderer reads from its working directory
+METADATA_FILES = ("surah_names.json", "reciter_names.json")
+
+
+def find_ffmpeg() -> Optional[str]:
+    return os.environ.get("FFMPEG") or shutil.which("ffmpeg")
+
+
+def max_rss_kb(who: int) -> int:
+    """Peak resident set size in KB (ru_maxrss is bytes on macOS, KB elsewhere)."""
+    rss = resource.getrusage(who).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+# ----------------------------------------------------------------------
+# Synthetic data
+# ----------------------------------------------------------------------
+
+def generate_asset(ffmpeg_path: str, path: Path, lavfi_source: str, codec_args: List[str]) -> bool:
+    """Render one lavfi source to a file (kept between benchmark runs)."""
+    if path.exists() and path.stat().st_size > 0:
+        return True
+    tmp_path = path.with_name(f".{path.stem}.part{path.suffix}")
+    cmd = [ffmpeg_path, '-f', 'lavfi', '-i', lavfi_source, *codec_args, '-y', str(tmp_path)]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0 or not tmp_path.exists():
+        print(f"Could not generate {path.name}:\n{result.stderr[-2000:]}")
+        return False
+    os.replace(tmp_path, path)
+    return True
+
+
+def generate_assets(ffmpeg_path: str, assets_dir: Path, max_ayahs: int, ayah_seconds: float) -> bool:
+    """Sine-tone ayah audio (a different pitch per ayah) and test-pattern background clips."""
+    assets_dir.mkdir(parents=True, exist_ok=True)
+    for index in range(max_ayahs):
+        path = assets_dir / f"ayah_{ayah_seconds:g}s_{index + 1:03d}.mp3"
+        source = f"sine=frequency={220 + 20 * index}:sample_rate=44100:duration={ayah_seconds:g}"
+        if not generate_asset(ffmpeg_path, path, source, ['-c:a', 'libmp3lame', '-b:a', '128k']):
+            return False
+    for name, (width, height) in BACKGROUNDS.items():
+        source = f"testsrc2=size={width}x{height}:rate=30:duration={BENCH_BACKGROUND_SECONDS}"
+        codec_args = ['-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p']
+        if not generate_asset(ffmpeg_path, assets_dir / f"{name}.mp4", source, codec_args):
+            return False
+    return True
+
+
+def build_group(surah: int, ayahs: int, segments: int, ayah_seconds: float, base_url: str) -> Dict:
+    """One synthetic group: ayahs of ayah_seconds, each with `segments` timed words."""
+    ayah_ms = int(ayah_seconds * 1000)
+    word_ms = ayah_ms // segments
+    words = itertools.cycle(ARABIC_WORDS)
+    english = itertools.cycle(ENGLISH_WORDS)
+    group_ayahs = []
+    for number in range(1, ayahs + 1):
+        group_ayahs.append({
+            'ayah_number': number,
+            'audio_url': f"{base_url}/videos/ayah_{ayah_seconds:g}s_{number:03d}.mp3",
+            'arabic_words': [next(words) for _ in range(segments)],
+            'segments': [[i, i + 1, i * word_ms, (i + 1) * word_ms] for i in range(segments)],
+            'translation': " ".join(next(english) for _ in range(2 * segments)),
+            'duration_ms': ayah_ms,
+        })
+    return {
+        'surah': surah,
+        'ayah_start': 1,
+        'ayah_end': ayahs,
+        'duration_ms': ayah_ms * ayahs,
+        'ayahs': group_ayahs,
+    }
+
+
+def write_bench_data(data_dir: Path, base_url: str, sizes: List[int], segments: List[int], ayah_seconds: float) -> Dict:
+    """
+    Lay out a working directory the renderer can run in.
+
+    Returns:
+        {(size, segments): group_id}
+    """
+    groups_dir = data_dir / "quran_groups"
+    groups_dir.mkdir(parents=True, exist_ok=True)
+    for name in METADATA_FILES:
+        if (REPO_DIR / name).exists():
+            shutil.copyfile(REPO_DIR / name, data_dir / name)
+
+    group_ids = {}
+    groups = {}
+    for surah, (size, count) in enumerate(itertools.product(sizes, segments), 1):
+        group_id = f"reciter1_s{surah:03d}_001-{size:03d}"
+        groups[group_id] = build_group(surah, size, count, ayah_seconds, base_url)
+        group_ids[(size, count)] = group_id
+    with open(groups_dir / "reciter_1_Bench_groups.json", 'w', encoding='utf-8') as f:
+        json.dump({'reciter_id': 1, 'reciter_name': BENCH_RECITER, 'total_groups': len(groups), 'groups': groups},
+                  f, ensure_ascii=False)
+
+    videos = [{
+        'id': name, 'category': 'bench', 'url': f"{base_url}/videos/{name}.mp4", 'duration': BENCH_BACKGROUND_SECONDS,
+        'width': width, 'height': height, 'is_portrait': height > width, 'tags': 'synthetic test pattern',
+    } for name, (width, height) in BACKGROUNDS.items()]
+    with open(data_dir / "approved_videos.json", 'w', encoding='utf-8') as f:
+        json.dump({'videos': videos}, f, indent=2)
+    return group_ids
+
+
+# ----------------------------------------------------------------------
+# Worker (one render per process)
+# ----------------------------------------------------------------------
+
+def run_worker(spec_path: Path, result_path: Path):
+    """Render one case. Runs inside the bench data directory with the environment set by run_case."""
+    with open(spec_path, 'r', encoding='utf-8') as f:
+        spec = json.load(f)
+
+    from generate_simple_video import ENCODE_STATS, process_group
+    from run_report import get_run_id, load_spans, summarize_spans
+
+    output_path = Path(spec['output'])
+    start = time.perf_counter()
+    try:
+        success = process_group(spec['group_id'], spec['ffmpeg'], overlay_backend=spec['backend'],
+                                encoder_profile=spec['profile'], background_id=spec['background_id'],
+                                output_video_path=output_path, audio_mode=spec['audio_mode'], force=True)
+    except Exception as e:
+        print(f"Render failed: {e}")
+        success = False
+    seconds = time.perf_counter() - start
+
+    summary = summarize_spans(load_spans(get_run_id()))
+    stats = ENCODE_STATS.get(str(output_path), {})
+    result = {
+        'success': success,
+        'seconds': round(seconds, 3),
+        'stages': {stage: values['total_seconds'] for stage, values in summary['stages'].items()},
+        'peak_rss_kb': max_rss_kb(resource.RUSAGE_SELF),
+        'ffmpeg_peak_rss_kb': max_rss_kb(resource.RUSAGE_CHILDREN),
+        'size_bytes': output_path.stat().st_size if success and output_path.exists() else None,
+        'encode_fps': stats.get('encode_fps'),
+        'encode_speed': stats.get('encode_speed'),
+    }
+    with open(result_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f)
+
+
+def run_case(spec: Dict, work_dir: Path, run_id: str) -> Optional[Dict]:
+    """Run one render in a fresh worker process with its own cold media cache."""
+    run_dir = work_dir / "runs" / run_id
+    if run_dir.exists():
+        shutil.rmtree(run_dir)
+    run_dir.mkdir(parents=True)
+    spec = dict(spec, output=str(run_dir / "output.mp4"))
+    spec_path, result_path = run_dir / "spec.json", run_dir / "result.json"
+    with open(spec_path, 'w', encoding='utf-8') as f:
+        json.dump(spec, f)
+
+    env = dict(os.environ, QURAN_CACHE_DIR=str(run_dir / "cache"), RUN_REPORT_DIR=str(run_dir), RUN_ID=run_id,
+               RUN_REPORTS="1", FFMPEG_PROGRESS_INTERVAL="0", PYTHONPATH=os.pathsep.join(
+                   filter(None, [str(REPO_DIR), os.environ.get("PYTHONPATH")])))
+    env.pop("GITHUB_RUN_ID", None)
+    with open(run_dir / "render.log", 'w', encoding='utf-8') as log:
+        subprocess.run([sys.executable, str(Path(__file__).resolve()), '--worker', str(spec_path), str(result_path)],
+                       cwd=work_dir / "data", env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        with open(result_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        print(f"  worker crashed, see {run_dir / 'render.log'}")
+        return None
+
+
+def median_result(runs: List[Dict]) -> Dict:
+    """Combine repeated runs of a case: medians for timings, maxima for memory."""
+    ok = [run for run in runs if run and run['success']]
+    if not ok:
+        return {'success': False, 'runs': len(runs)}
+    from run_report import STAGES
+    seen = {stage for run in ok for stage in run['stages']}
+    stages = [stage for stage in STAGES if stage in seen] + sorted(seen - set(STAGES))
+
+    def median(key):
+        values = [run[key] for run in ok if run.get(key) is not None]
+        return round(statistics.median(values), 3) if values else None
+
+    return {
+        'success': True,
+        'runs': len(ok),
+        'seconds': median('seconds'),
+        'stages': {stage: round(statistics.median(run['stages'].get(stage, 0) for run in ok), 3) for stage in stages},
+        'peak_rss_kb': max(run['peak_rss_kb'] for run in ok),
+        'ffmpeg_peak_rss_kb': max(run['ffmpeg_peak_rss_kb'] for run in ok),
+        'size_bytes': median('size_bytes'),
+        'encode_fps': median('encode_fps'),
+        'encode_speed': median('encode_speed'),
+    }
+
+
+# ----------------------------------------------------------------------
+# Baselines
+# ----------------------------------------------------------------------
+
+def git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, capture_output=True, text=True, timeout=10)
+        return result.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def ffmpeg_version(ffmpeg_path: str) -> Optional[str]:
+    try:
+        output = subprocess.run([ffmpeg_path, '-version'], capture_output=True, text=True, timeout=10).stdout
+        return output.splitlines()[0] if output else None
+    except Exception:
+        return None
+
+
+def run_benchmark(args) -> Dict:
+    """Generate the data, run every case of the sweep and return the baseline."""
+    from local_server import LocalServerHandler, start_local_server
+
+    class QuietHandler(LocalServerHandler):
+        def log_message(self, format, *args):
+            pass
+
+    work_dir = Path(args.work_dir)
+    assets_dir = work_dir / "assets"
+    if not generate_assets(args.ffmpeg, assets_dir, max(args.sizes), args.ayah_seconds):
+        sys.exit(1)
+    server = start_local_server(directory=work_dir / "uploads", static_dir=assets_dir)
+    server.RequestHandlerClass = QuietHandler
+    try:
+        group_ids = write_bench_data(work_dir / "data", server.base_url, args.sizes, args.segments, args.ayah_seconds)
+        cases = []
+        sweep = list(itertools.product(args.sizes, args.segments, args.profiles, args.backends))
+        for number, (size, segments, profile, backend) in enumerate(sweep, 1):
+            name = f"ayahs{size}_seg{segments}_{profile}_{backend}"
+            spec = {
+                'group_id': group_ids[(size, segments)], 'ffmpeg': args.ffmpeg, 'profile': profile, 'backend': backend,
+                'background_id': args.background, 'audio_mode': args.audio_mode,
+            }
+            runs = [run_case(spec, work_dir, f"{name}-{attempt}") for attempt in range(args.repeat)]
+            result = median_result(runs)
+            cases.append({'name': name, 'params': {'ayahs': size, 'segments': segments, 'profile': profile,
+                                                   'backend': backend, 'audio_mode': args.audio_mode}, **result})
+            status = f"{result['seconds']:.2f}s, {result['encode_speed'] or '?'}x" if result['success'] else "FAILED"
+            print(f"[{number}/{len(sweep)}] {name}: {status}")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    return {
+        'version': 1,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'ffmpeg': ffmpeg_version(args.ffmpeg),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'settings': {'ayah_seconds': args.ayah_seconds, 'background_id': args.background,
+                     'audio_mode': args.audio_mode, 'repeat': args.repeat},
+        'cases': cases,
+    }
+
+
+def compare_baselines(old: Dict, new: Dict, threshold: float = BENCH_THRESHOLD) -> List[str]:
+    """
+    Print case-by-case changes between two baselines.
+
+    Returns:
+        Names of the cases that regressed (slower, bigger output or more memory by more than threshold)
+    """
+    old_cases = {case['name']: case for case in old.get('cases', [])}
+    print(f"Baseline {(old.get('commit') or '?')[:10]} -> {(new.get('commit') or '?')[:10]} "
+          f"(regression threshold {threshold:.0%})")
+    print(f"  {'case':<36}{'seconds':>23}{'encode s':>23}{'ffmpeg RSS MB':>23}{'size MB':>23}")
+
+    def change(before, after, scale=1.0):
+        if before is None or after is None:
+            return f"{'-':>23}", False
+        ratio = (after - before) / before if before else 0.0
+        flag = ratio > threshold
+        return f"{before / scale:>7.2f} -> {after / scale:<6.2f}{ratio:>+5.0%}{'!' if flag else ' '}", flag
+
+    regressions = []
+    for case in new.get('cases', []):
+        before = old_cases.get(case['name'])
+        if not before or not before.get('success') or not case.get('success'):
+            print(f"  {case['name']:<36}{'(not comparable)':>23}")
+            continue
+        columns = [
+            change(before['seconds'], case['seconds']),
+            change(before['stages'].get('encode'), case['stages'].get('encode')),
+            change(before['ffmpeg_peak_rss_kb'], case['ffmpeg_peak_rss_kb'], 1024),
+            change(before['size_bytes'], case['size_bytes'], 1e6),
+        ]
+        print(f"  {case['name']:<36}" + "".join(text for text, _ in columns))
+        if any(flag for _, flag in columns):
+            regressions.append(case['name'])
+    missing = sorted(set(old_cases) - {case['name'] for case in new.get('cases', [])})
+    if missing:
+        print(f"  Only in the old baseline: {', '.join(missing)}")
+    return regressions
+
+
+def parse_list(value: str, cast=str) -> List:
+    return [cast(item.strip()) for item in value.split(',') if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline render pipeline benchmark',
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     epilog=__doc__.split("Examples:", 1)[1])
+    parser.add_argument('--sizes', type=lambda v: parse_list(v, int), default=list(BENCH_SIZES),
+                        help=f'Ayahs per group (default: {",".join(map(str, BENCH_SIZES))})')
+    parser.add_argument('--segments', type=lambda v: parse_list(v, int), default=list(BENCH_SEGMENTS),
+                        help=f'Timed words per ayah (default: {",".join(map(str, BENCH_SEGMENTS))})')
+    parser.add_argument('--profiles', type=parse_list, default=list(BENCH_PROFILES),
+                        help=f'Encoder profiles (default: {",".join(BENCH_PROFILES)})')
+    parser.add_argument('--backends', type=parse_list, default=list(BENCH_BACKENDS),
+                        help=f'Overlay backends (default: {",".join(BENCH_BACKENDS)})')
+    parser.add_argument('--audio-mode', type=str, default="direct", choices=["direct", "merged"],
+                        help='Audio mode (default: direct)')
+    parser.add_argument('--background', type=str, default="bench_landscape", choices=sorted(BACKGROUNDS),
+                        help='Synthetic background (default: bench_landscape, which needs scale/crop)')
+    parser.add_argument('--ayah-seconds', type=float, default=BENCH_AYAH_SECONDS,
+                        help=f'Length of each synthetic ayah (default: {BENCH_AYAH_SECONDS:g})')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per case, medians are kept (default: 1)')
+    parser.add_argument('--work-dir', type=str, default=str(BENCH_WORK_DIR), help=f'Scratch directory (default: {BENCH_WORK_DIR})')
+    parser.add_argument('--output', type=str, help='Baseline path (default: bench/results/<commit>.json)')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='Compare two baselines instead of running')
+    parser.add_argument('--threshold', type=float, default=BENCH_THRESHOLD,
+                        help=f'Relative change counted as a regression (default: {BENCH_THRESHOLD})')
+    parser.add_argument('--worker', nargs=2, metavar=('SPEC', 'RESULT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(Path(args.worker[0]), Path(args.worker[1]))
+        return
+
+    if args.compare:
+        baselines = []
+        for path in args.compare:
+            with open(path, 'r', encoding='utf-8') as f:
+                baselines.append(json.load(f))
+        regressions = compare_baselines(*baselines, threshold=args.threshold)
+        print(f"\n{len(regressions)} regression(s){': ' + ', '.join(regressions) if regressions else ''}")
+        sys.exit(1 if regressions else 0)
+
+    args.ffmpeg = find_ffmpeg()
+    if not args.ffmpeg:
+        print("FFmpeg not found (install it or set FFMPEG)")
+        sys.exit(1)
+    args.repeat = max(1, args.repeat)
+
+    baseline = run_benchmark(args)
+    output = Path(args.output) if args.output else BENCH_RESULTS_DIR / f"{(baseline['commit'] or time.strftime('%Y%m%d-%H%M%S'))[:12]}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=2, ensure_ascii=False)
+    failed = sum(1 for case in baseline['cases'] if not case['success'])
+    print(f"\nBaseline saved to {output} ({len(baseline['cases'])} cases, {failed} failed)")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Adaptive polling schedule for Graph API media containers.
+Instead of a fixed 10 s start with 1.5x backoff, the next poll is timed for
+when the container is expected to be ready:
+
+- from processing_progress, when the API reports it (extrapolating the rate
+  seen so far), else
+- from the processing times of previous uploads of a similar size, kept in
+  a small history file in the media cache, else
+- with the old capped exponential backoff.
+
+Time is measured with time.monotonic(), so request latency counts against the
+timeout and clock changes do not. Each delay gets a small capped jitter, so
+many containers polled at once do not hit the API in lockstep. Used by both
+publish_reel.py and graph_api_async.py.
+"""
+
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+from media_cache import STATE_DIR
+
+POLL_HISTORY_FILE = STATE_DIR / "container_poll_history.json"
+POLL_HISTORY_LIMIT = int(os.environ.get("POLL_HISTORY_LIMIT", "50"))
+
+# Bounds for a single wait, in seconds
+MIN_POLL_INTERVAL = float(os.environ.get("MIN_POLL_INTERVAL", "2"))
+MAX_POLL_INTERVAL = float(os.environ.get("MAX_POLL_INTERVAL", "30"))
+POLL_BACKOFF = 1.5
+
+# Jitter: +-10% of the wait, never more than 2 s
+POLL_JITTER = 0.1
+MAX_POLL_JITTER = 2.0
+
+# Aim a little before the predicted ready time; a poll that is slightly early costs one request
+PREDICTION_LEAD = 0.9
+
+# Field sets asked for in order; a set the API rejects is dropped for the rest of the poll
+POLL_FIELD_SETS = ("status_code,processing_progress", "status_code", None)
+
+_history_lock = threading.Lock()
+
+
+def load_poll_history() -> List[Dict]:
+    """Past processing times ({'size_bytes', 'seconds', 'polls'}), oldest first."""
+    try:
+        with open(POLL_HISTORY_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f).get('containers', [])
+    except FileNotFoundError:
+        return []
+    except Exception as e:
+        print(f"Poll history unreadable ({e}), starting empty")
+        return []
+
+
+def record_poll_result(size_bytes: Optional[int], seconds: float, polls: int):
+    """Append one finished container to the history (atomic rewrite, last POLL_HISTORY_LIMIT kept)."""
+    with _history_lock:
+        history = load_poll_history() + [{
+            'size_bytes': size_bytes,
+            'seconds': round(seconds, 2),
+            'polls': polls,
+            'time': time.time(),
+        }]
+        history = history[-POLL_HISTORY_LIMIT:]
+        try:
+            POLL_HISTORY_FILE.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=POLL_HISTORY_FILE.parent, prefix=".poll-history-", suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'containers': history}, f)
+            os.replace(tmp_path, POLL_HISTORY_FILE)
+        except Exception as e:
+            print(f"Could not save poll history: {e}")
+
+
+def estimate_processing_seconds(size_bytes: Optional[int], history: Optional[List[Dict]] = None) -> Optional[float]:
+    """
+    Expected processing time for a video of this size from past containers.
+
+    Uses the median seconds per MB when both sizes are known (processing
+    scales with the file), else the median processing time. None without history.
+    """
+    history = load_poll_history() if history is None else history
+    if not history:
+        return None
+    if size_bytes:
+        rates = [entry['seconds'] / (entry['size_bytes'] / 1e6) for entry in history if entry.get('size_bytes')]
+        if rates:
+            return statistics.median(rates) * size_bytes / 1e6
+    return statistics.median(entry['seconds'] for entry in history)
+
+
+def parse_progress(value) -> Optional[float]:
+    """processing_progress as a percentage (accepts 42, "42" or "42%"), None if absent."""
+    try:
+        progress = float(str(value).strip().rstrip('%'))
+    except (TypeError, ValueError):
+        return None
+    return progress if 0 <= progress <= 100 else None
+
+
+class AdaptivePoller:
+    """
+    Schedule of waits between container status polls.
+
+    Create it right after the container, then for every poll: call
+    next_delay(response) while the container is pending, and finish() once it
+    is ready so the processing time joins the history.
+    """
+
+    def __init__(self, size_bytes: Optional[int] = None, max_wait: float = 1500,
+                 initial_interval: float = 10, rng: Optional[random.Random] = None):
+        self.size_bytes = size_bytes
+        self.max_wait = max_wait
+        self.start = time.monotonic()
+        self.polls = 0
+        self.field_set = 0
+        self.expected = estimate_processing_seconds(size_bytes)
+        self._backoff = initial_interval
+        self._rng = rng or random
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start
+
+    def remaining(self) -> float:
+        """Seconds left before the timeout."""
+        return self.max_wait - self.elapsed()
+
+    @property
+    def fields(self) -> Optional[str]:
+        """Fields to request on the next poll (None = API defaults)."""
+        return POLL_FIELD_SETS[self.field_set]
+
+    def drop_fields(self) -> bool:
+        """The API rejected the current field set: fall back to the next one. False if none is left."""
+        if self.field_set + 1 >= len(POLL_FIELD_SETS):
+            return False
+        self.field_set += 1
+        return True
+
+    def predict_remaining(self, response: Dict) -> Optional[float]:
+        """Seconds until the container should be ready, or None if there is nothing to go on."""
+        elapsed = self.elapsed()
+        progress = parse_progress(response.get('processing_progress'))
+        if progress and elapsed > 0:
+            # Extrapolate the rate seen so far
+            return (100 - progress) * elapsed / progress
+        if self.expected is not None and self.expected > elapsed:
+            return self.expected - elapsed
+        return None
+
+    def next_delay(self, response: Optional[Dict] = None) -> float:
+        """How long to wait before the next poll (never past the timeout)."""
+        self.polls += 1
+        predicted = self.predict_remaining(response or {})
+        if predicted is not None:
+            delay = predicted * PREDICTION_LEAD
+        else:
+            delay = self._backoff
+            self._backoff = min(MAX_POLL_INTERVAL, self._backoff * POLL_BACKOFF)
+        delay = min(MAX_POLL_INTERVAL, max(MIN_POLL_INTERVAL, delay))
+        jitter = min(MAX_POLL_JITTER, delay * POLL_JITTER)
+        delay += self._rng.uniform(-jitter, jitter)
+        return max(0.0, min(delay, self.remaining()))
+
+    def finish(self):
+        """Record the processing time of a container that became ready."""
+        record_poll_result(self.size_bytes, self.elapsed(), self.polls + 1)
@@ -0,0 +1,193 @@
+"""
+Run FFmpeg with live progress instead of as a black box.
+
+FFmpeg is started with `-progress pipe:1 -nostats`. It then writes a block of
+key=value lines (frame, fps, out_time_us, total_size, speed, ...) to stdout
+about twice a second, ending each block with progress=continue|end. The
+blocks are parsed as they arrive. Each one becomes an EncodeProgress handed
+to an on_progress callback, which can show ETA and throughput or record them.
+
+stderr is drained on a separate thread and only its last FFMPEG_STDERR_TAIL
+lines are kept for error messages, so a long encode does not buffer its whole
+log in memory.
+"""
+
+import os
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+# stderr lines kept for error reports
+FFMPEG_STDERR_TAIL = int(os.environ.get("FFMPEG_STDERR_TAIL", "40"))
+
+# Seconds between progress lines printed by the default callback (0 = silent)
+FFMPEG_PROGRESS_INTERVAL = float(os.environ.get("FFMPEG_PROGRESS_INTERVAL", "10"))
+
+PROGRESS_ARGS = ['-progress', 'pipe:1', '-nostats']
+
+
+def parse_speed(value: Optional[str]) -> Optional[float]:
+    """FFmpeg speed ("1.5x", "N/A") as a float multiple of realtime."""
+    try:
+        speed = float((value or '').strip().rstrip('x'))
+    except ValueError:
+        return None
+    return speed if speed > 0 else None
+
+
+def parse_out_time(block: Dict[str, str]) -> Optional[float]:
+    """Output position in seconds from out_time_us (or out_time as HH:MM:SS.micro)."""
+    try:
+        return int(block['out_time_us']) / 1e6
+    except (KeyError, ValueError):
+        pass
+    try:
+        hours, minutes, seconds = block['out_time'].split(':')
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    except (KeyError, ValueError):
+        return None
+
+
+class EncodeProgress:
+    """One progress report from a running FFmpeg."""
+
+    def __init__(self, block: Dict[str, str], elapsed: float, duration: Optional[float] = None):
+        self.frame = int(block['frame']) if block.get('frame', '').isdigit() else None
+        try:
+            self.fps = float(block.get('fps', ''))
+        except ValueError:
+            self.fps = None
+        self.speed = parse_speed(block.get('speed'))
+        self.out_time = parse_out_time(block)
+        self.total_size = int(block['total_size']) if block.get('total_size', '').isdigit() else None
+        self.elapsed = elapsed
+        self.duration = duration
+        self.done = block.get('progress') == "end"
+
+    @property
+    def percent(self) -> Optional[float]:
+        """Share of the output written so far (needs the expected duration)."""
+        if not self.duration or self.out_time is None:
+            return None
+        return min(100.0, 100.0 * self.out_time / self.duration)
+
+    @property
+    def realtime_speed(self) -> Optional[float]:
+        """Seconds of output per second of wall time, measured here (for when FFmpeg reports speed=N/A)."""
+        if self.out_time is None or self.elapsed <= 0:
+            return None
+        return self.out_time / self.elapsed
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Seconds until the encode should finish at the speed so far."""
+        speed = self.speed or self.realtime_speed
+        if self.done:
+            return 0.0
+        if not self.duration or self.out_time is None or not speed:
+            return None
+        return max(0.0, (self.duration - self.out_time) / speed)
+
+    def to_dict(self) -> Dict:
+        return {
+            'frame': self.frame,
+            'fps': self.fps,
+            'speed': self.speed,
+            'out_time': None if self.out_time is None else round(self.out_time, 3),
+            'total_size': self.total_size,
+            'elapsed': round(self.elapsed, 3),
+            'percent': None if self.percent is None else round(self.percent, 1),
+            'eta': None if self.eta is None else round(self.eta, 1),
+        }
+
+
+class FFmpegRun:
+    """Outcome of run_ffmpeg (returncode and stderr like subprocess.CompletedProcess)."""
+
+    def __init__(self, returncode: int, stderr: str, progress: Optional[EncodeProgress], seconds: float):
+        self.returncode = returncode
+        self.stderr = stderr
+        self.progress = progress
+        self.seconds = seconds
+
+    @property
+    def speed(self) -> Optional[float]:
+        """Final encode speed as a multiple of realtime."""
+        if not self.progress:
+            return None
+        return self.progress.speed or self.progress.realtime_speed
+
+
+def progress_printer(label: str = "", interval: float = FFMPEG_PROGRESS_INTERVAL) -> Callable[[EncodeProgress], None]:
+    """Callback printing one progress line at most every interval seconds (and the last one)."""
+    last_printed = [float('-inf')]
+
+    def report(progress: EncodeProgress):
+        if not interval or (not progress.done and progress.elapsed - last_printed[0] < interval):
+            return
+        last_printed[0] = progress.elapsed
+        position = f"{progress.out_time:.1f}s" if progress.out_time is not None else "?"
+        if progress.percent is not None:
+            position += f" ({progress.percent:.0f}%)"
+        eta = f", ETA {progress.eta:.0f}s" if progress.eta is not None and not progress.done else ""
+        print(f"  {label}{'done' if progress.done else 'encoding'}: {position}, frame {progress.frame}, "
+              f"{progress.fps or 0:.1f} fps, {progress.speed or 0:.2f}x{eta}")
+
+    return report
+
+
+def run_ffmpeg(
+    cmd: List[str],
+    duration: Optional[float] = None,
+    on_progress: Optional[Callable[[EncodeProgress], None]] = None,
+    tail_lines: int = FFMPEG_STDERR_TAIL
+) -> FFmpegRun:
+    """
+    Run an FFmpeg command, parsing its progress as it runs.
+
+    Args:
+        cmd: FFmpeg command (executable first); the progress arguments are added
+        duration: Expected output duration in seconds (for percent and ETA)
+        on_progress: Called with every EncodeProgress (default: progress_printer())
+        tail_lines: stderr lines kept for the result
+
+    Returns:
+        FFmpegRun with the return code, the stderr tail and the last progress report
+    """
+    on_progress = on_progress or progress_printer()
+    start = time.perf_counter()
+    process = subprocess.Popen([cmd[0], *PROGRESS_ARGS, *cmd[1:]], stdin=subprocess.DEVNULL,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               text=True, encoding='utf-8', errors='replace', bufsize=1)
+
+    stderr_tail = deque(maxlen=max(1, tail_lines))
+    stderr_thread = threading.Thread(target=stderr_tail.extend, args=(process.stderr,), name="ffmpeg-stderr", daemon=True)
+    stderr_thread.start()
+
+    progress = None
+    block: Dict[str, str] = {}
+    try:
+        for line in process.stdout:
+            key, sep, value = line.strip().partition('=')
+            if not sep:
+                continue
+            block[key] = value.strip()
+            if key == "progress":
+                progress = EncodeProgress(block, time.perf_counter() - start, duration)
+                block = {}
+                try:
+                    on_progress(progress)
+                except Exception as e:
+                    print(f"  Progress callback failed: {e}")
+        process.wait()
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        stderr_thread.join()
+        process.stdout.close()
+        process.stderr.close()
+
+    return FFmpegRun(process.returncode, "".join(stderr_tail), progress, time.perf_counter() - start)
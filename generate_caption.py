@@ -4,66 +4,34 @@ Generate Instagram caption with Arabic and English information.
 Includes: Surah name, Ayah numbers, Reciter name (both languages)
 """
 
-import json
 import sys
 import random
 from pathlib import Path
 
+from quran_metadata import find_reciter_by_id, find_surah
+
 # Configuration
 HASHTAG_COUNT = 15  # Fixed number of hashtags to use per post
 
 
-def load_json(file_path):
-    """Load JSON file."""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Error loading {file_path}: {e}")
-        return {}
-
-
 def get_surah_info(surah_num):
     """Get surah name in Arabic and English."""
-    surah_names = load_json('surah_names.json')
-    surahs = surah_names.get('surahs', {})
-    surah_key = str(surah_num)
-    
-    if surah_key in surahs:
+    surah = find_surah(surah_num)
+    if surah:
         return {
-            'arabic': surahs[surah_key].get('arabic', ''),
-            'english': surahs[surah_key].get('english', ''),
+            'arabic': surah.get('arabic', ''),
+            'english': surah.get('english', ''),
         }
     return {'arabic': '', 'english': f'Surah {surah_num}'}
 
 
 def get_reciter_info(reciter_id):
-    """Get reciter name in Arabic and English."""
-    reciter_names = load_json('reciter_names.json')
-    reciters = reciter_names.get('reciters', {})
-    
-    # Map reciter ID to name (based on available_reciters.json)
-    reciter_map = {
-        '1': 'abdulbaset abdulsamad',
-        '2': 'abdulbaset abdulsamad',
-        '3': 'abdur-rahman as-sudais',
-        '4': 'abu bakr al-shatri',
-        '5': 'hani ar-rifai',
-        '6': 'mahmoud khalil al-husary',
-        '7': 'mishari rashid al-afasy',
-        '8': 'mohamed siddiq al-minshawi',
-        '9': 'mohamed siddiq al-minshawi',
-        '10': 'sa`ud ash-shuraym',
-        '11': 'mohamed al-tablawi',
-        '12': 'mahmoud khalil al-husary'
-    }
-    
-    reciter_key = reciter_map.get(reciter_id, '').lower()
-    
-    if reciter_key in reciters:
+    """Get reciter name in Arabic and English (reciter ids from available_reciters.json)."""
+    reciter = find_reciter_by_id(reciter_id)
+    if reciter:
         return {
-            'arabic': reciters[reciter_key].get('arabic', ''),
-            'english': reciters[reciter_key].get('english', '')
+            'arabic': reciter.get('arabic', ''),
+            'english': reciter.get('english', '')
         }
     return {'arabic': '', 'english': f'Reciter {reciter_id}'}
 
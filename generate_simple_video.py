@@ -3,18 +3,30 @@ import os
 import sys
 import requests
 import argparse
+import hashlib
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import subprocess
 import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+from ass_subtitles import write_ass_file
+from background_catalog import get_catalog
+from background_policy import record_background_use, select_background
+from ffmpeg_progress import progress_printer, run_ffmpeg
+from group_index import QURAN_GROUPS_DIR, get_group_index
+from media_cache import CACHE_DIR, MediaCache
+from quran_metadata import find_reciter, find_surah
+from run_report import span
+from text_renderer import RENDER_VERSION, render_text_image
 
-QURAN_GROUPS_DIR = Path("quran_groups")
 MERGED_AUDIO_DIR = Path("merged_audio_samples")
 OUTPUT_VIDEO_DIR = Path("generated_videos")
 TEMP_AUDIO_DIR = Path("temp_audio_downloads")
-APPROVED_VIDEOS_FILE = Path("approved_videos.json")
-SURAH_NAMES_FILE = Path("surah_names.json")
-RECITER_NAMES_FILE = Path("reciter_names.json")
 
 # Video settings (Instagram Reels optimal)
 VIDEO_WIDTH = 1080
@@ -24,11 +36,80 @@ VIDEO_FPS = 30
 # Audio settings (higher quality for better output)
 AUDIO_BITRATE = "256k"
 
-# Text overlay data (Arabic - displays in center)
-ARABIC_TEXT = []
+# Audio path: "direct" feeds the ayah files to the final render through the concat demuxer
+# and encodes AAC once; "merged" first stream-copies them into {group_id}_merged.mp3.
+AUDIO_MODES = ("direct", "merged")
+AUDIO_MODE = os.environ.get("AUDIO_MODE", "direct").lower()
+
+# Named x264 encoding profiles (threads 0 = let x264 decide). archive matches the original
+# high-quality settings; fast is meant for scheduled runs on small runners
+# (Instagram re-encodes uploads anyway).
+ENCODER_PROFILES = {
+    'archive': {'preset': 'slow', 'crf': 18, 'maxrate': None, 'bufsize': None, 'gop': None, 'threads': 0},
+    'balanced': {'preset': 'medium', 'crf': 20, 'maxrate': '10M', 'bufsize': '20M', 'gop': 2 * VIDEO_FPS, 'threads': 0},
+    'fast': {'preset': 'veryfast', 'crf': 23, 'maxrate': '6M', 'bufsize': '12M', 'gop': 2 * VIDEO_FPS, 'threads': 0},
+}
+ENCODER_PROFILE = os.environ.get("ENCODER_PROFILE", "archive").lower()
+# Per-encode x264 thread override for profiles with threads=0 (batch mode splits cores between jobs)
+ENCODER_THREADS = int(os.environ.get("ENCODER_THREADS", "0"))
+
+# Download settings (ayah audio is fetched concurrently over one keep-alive pool)
+AUDIO_DOWNLOAD_WORKERS = int(os.environ.get("AUDIO_DOWNLOAD_WORKERS", "8"))
+MAX_CONNECTIONS_PER_HOST = int(os.environ.get("MAX_CONNECTIONS_PER_HOST", "4"))
+
+# Ayah audio cache (persists across runs, keyed by audio URL)
+AUDIO_CACHE_DIR = CACHE_DIR / "audio"
+AUDIO_CACHE_MAX_MB = int(os.environ.get("AUDIO_CACHE_MAX_MB", "512"))
+AUDIO_CACHE = MediaCache(
+    AUDIO_CACHE_DIR,
+    max_bytes=AUDIO_CACHE_MAX_MB * 1024 * 1024,
+    suffix=".mp3",
+    revalidate=os.environ.get("AUDIO_CACHE_REVALIDATE", "0") == "1",
+)
+
+# Background clip cache (4K Pixabay sources are tens of MB, so keep them between runs)
+BACKGROUND_CACHE_DIR = CACHE_DIR / "backgrounds"
+BACKGROUND_CACHE_MAX_MB = int(os.environ.get("BACKGROUND_CACHE_MAX_MB", "2048"))
+BACKGROUND_CACHE = MediaCache(
+    BACKGROUND_CACHE_DIR,
+    max_bytes=BACKGROUND_CACHE_MAX_MB * 1024 * 1024,
+    suffix=".mp4",
+    policy=os.environ.get("BACKGROUND_CACHE_POLICY", "lru").lower(),
+)
+
+# Pre-normalized 1080x1920@30 background proxies (built by prepare_backgrounds.py)
+BACKGROUND_PROXY_DIR = Path(os.environ.get("BACKGROUND_PROXY_DIR", str(CACHE_DIR / "proxies")))
+BACKGROUND_PROXY_INDEX = BACKGROUND_PROXY_DIR / "index.json"
 
-# Text overlay data (English - displays at bottom)
-ENGLISH_TEXT = []
+# Text overlay backend: "drawtext" (one filter per segment), "ass" (single libass track)
+# or "png" (Pillow-shaped text images composited with overlay)
+OVERLAY_BACKENDS = ("drawtext", "ass", "png")
+OVERLAY_BACKEND = os.environ.get("OVERLAY_BACKEND", "drawtext").lower()
+
+# Text overlay layout shared by every overlay backend.
+# y: pixels from the top, negative for pixels from the bottom, None to center vertically.
+# wrap: characters per line for timed segments (drawtext only; ass/png wrap by pixel width).
+OVERLAY_STYLES = {
+    'surah_ar': {'fontsize': 50, 'color': 'gold', 'alpha': 1.0, 'border': 2, 'y': 220},
+    'reciter_ar': {'fontsize': 40, 'color': 'white', 'alpha': 0.9, 'border': 2, 'y': 280},
+    'arabic': {'fontsize': 60, 'color': 'white', 'alpha': 1.0, 'border': 3, 'y': None, 'wrap': 20},
+    'surah_en': {'fontsize': 45, 'color': 'gold', 'alpha': 1.0, 'border': 2, 'y': -280},
+    'reciter_en': {'fontsize': 38, 'color': 'white', 'alpha': 0.9, 'border': 2, 'y': -220},
+    'english': {'fontsize': 32, 'color': 'white', 'alpha': 1.0, 'border': 2, 'y': -350, 'wrap': 18},
+}
+
+# Side margin for backends that wrap by pixel width
+OVERLAY_SIDE_MARGIN = 60
+
+# Encode statistics of the most recent renders, keyed by output path
+ENCODE_STATS: Dict[str, Dict] = {}
+
+# Cache entries pinned by prefetch_group_assets until release_group_assets, keyed by group id
+_group_pins: Dict[str, List[Tuple[MediaCache, str]]] = {}
+_group_pins_lock = threading.Lock()
+
+# Bump when rendering changes in a way the render key does not capture, so old outputs are re-rendered
+RENDER_MANIFEST_VERSION = 1
 
 # Create directories
 for directory in [MERGED_AUDIO_DIR, OUTPUT_VIDEO_DIR, TEMP_AUDIO_DIR]:
@@ -88,16 +169,18 @@ def load_json_file(file_path: Path) -> Dict:
         return {}
 
 
-def load_surah_names() -> Dict:
-    """Load surah names from JSON file."""
-    data = load_json_file(SURAH_NAMES_FILE)
-    return data.get('surahs', {})
+def load_group(group_id: str) -> Optional[Dict]:
+    """Load one group's data (a private copy, with group_id and reciter_name filled in)."""
+    group_data = get_group_index().get(group_id)
+    if not group_data:
+        print(f"Error: Group ID {group_id} not found in {QURAN_GROUPS_DIR}")
+        return None
+    return group_data
 
 
-def load_reciter_names() -> Dict:
-    """Load reciter names from JSON file."""
-    data = load_json_file(RECITER_NAMES_FILE)
-    return data.get('reciters', {})
+def find_surah_groups(surah: int, reciter_num: Optional[str] = None) -> List[str]:
+    """List group ids for a surah (optionally one reciter), in recitation order."""
+    return get_group_index().group_ids([reciter_num] if reciter_num else None, surah)
 
 
 def wrap_text(text: str, max_chars_per_line: int = 35) -> str:
@@ -139,7 +222,7 @@ def wrap_text(text: str, max_chars_per_line: int = 35) -> str:
 
 def get_surah_info(surah_number: int) -> Dict[str, str]:
     """Get surah information."""
-    surah_data = load_surah_names().get(str(surah_number), {})
+    surah_data = find_surah(surah_number) or {}
     return {
         'arabic': surah_data.get('arabic', f'سورة {surah_number}'),
         'english': surah_data.get('english', f'Surah {surah_number}')
@@ -148,8 +231,7 @@ def get_surah_info(surah_number: int) -> Dict[str, str]:
 
 def get_reciter_names(reciter_name: str) -> Dict[str, str]:
     """Get reciter names in both languages."""
-    normalized = reciter_name.lower().strip().replace('_', ' ')
-    reciter_data = load_reciter_names().get(normalized, {})
+    reciter_data = find_reciter(reciter_name) or {}
     return {
         'arabic': reciter_data.get('arabic', reciter_name),
         'english': reciter_data.get('english', reciter_name.title())
@@ -165,34 +247,87 @@ def format_size(size_bytes: int) -> str:
     return f"{size_bytes:.1f}TB"
 
 
-def download_audio_file(url: str, output_path: Path) -> bool:
-    """Download audio file from URL."""
-    try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        output_path.write_bytes(response.content)
-        return True
-    except Exception as e:
-        print(f"  Error downloading: {e}")
-        return False
+_http_session: Optional[requests.Session] = None
+_http_session_lock = threading.Lock()
+_host_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+
+
+def get_http_session() -> requests.Session:
+    """Get the shared HTTP session (one keep-alive connection pool per process)."""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            pool_size = max(AUDIO_DOWNLOAD_WORKERS, MAX_CONNECTIONS_PER_HOST)
+            adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _http_session = session
+        return _http_session
+
+
+def get_host_semaphore(url: str) -> threading.BoundedSemaphore:
+    """Get the semaphore limiting concurrent requests to the host of a URL."""
+    host = urlparse(url).netloc
+    with _http_session_lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.BoundedSemaphore(MAX_CONNECTIONS_PER_HOST)
+        return _host_semaphores[host]
+
+
+def download_audio_file(url: str, group_id: Optional[str] = None) -> Optional[Path]:
+    """Download audio file from URL into the audio cache (no-op on a cache hit)."""
+    with span("download", group_id=group_id, kind="audio", url=url) as record:
+        try:
+            with get_host_semaphore(url):
+                path, hit = AUDIO_CACHE.fetch_with_status(url, get_http_session(), timeout=30)
+            record.update(cache="hit" if hit else "miss", bytes=0 if hit else path.stat().st_size)
+            return path
+        except Exception as e:
+            print(f"  Error downloading: {e}")
+            record.update(status="failed", error=str(e))
+            return None
 
 
-def process_ayah_audio(ayah: Dict, index: int, total: int) -> Optional[Path]:
+def process_ayah_audio(ayah: Dict, index: int, total: int, group_id: Optional[str] = None) -> Optional[Path]:
     """Process single ayah audio."""
-    print(f"  [{index+1}/{total}] Ayah {ayah.get('ayah_number', index+1)}")
-    
     audio_url = ayah.get('audio_url')
     if not audio_url:
-        print("  Warning: No audio URL")
+        print(f"  [{index+1}/{total}] Warning: No audio URL for ayah {ayah.get('ayah_number', index+1)}")
         return None
     
-    temp_audio_path = TEMP_AUDIO_DIR / f"ayah_{index+1:03d}.mp3"
-    print(f"  Downloading: {Path(audio_url).name}")
+    audio_path = download_audio_file(audio_url, group_id)
+    if audio_path:
+        print(f"  [{index+1}/{total}] Ayah {ayah.get('ayah_number', index+1)}: {Path(audio_url).name} -> {audio_path.name}")
+    return audio_path
+
+
+def download_ayah_audio_files(ayahs: List[Dict], group_id: Optional[str] = None) -> List[Optional[Path]]:
+    """
+    Download audio for all ayahs concurrently.
+    
+    Downloads run on a bounded worker pool sharing one HTTP session, with at most
+    MAX_CONNECTIONS_PER_HOST requests in flight per host.
     
-    if download_audio_file(audio_url, temp_audio_path):
-        print(f"  Completed: {temp_audio_path.name}")
-        return temp_audio_path
-    return None
+    Returns:
+        List of audio paths in ayah order (None for ayahs that failed)
+    """
+    total = len(ayahs)
+    if not total:
+        return []
+    
+    workers = max(1, min(AUDIO_DOWNLOAD_WORKERS, total))
+    print(f"Downloading {total} ayahs with {workers} workers")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ayah-download") as executor:
+        return list(executor.map(process_ayah_audio, ayahs, range(total), [total] * total, [group_id] * total))
+
+
+def write_concat_file(audio_files: List[Path]) -> str:
+    """Write an FFmpeg concat demuxer list for the given files (caller deletes it)."""
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False, encoding='utf-8') as f:
+        for audio_file in audio_files:
+            f.write(f"file '{str(audio_file.absolute()).replace(chr(92), '/')}'\n")
+        return f.name
 
 
 def merge_audio_files(audio_files: List[Path], output_path: Path, ffmpeg_path: str) -> bool:
@@ -204,10 +339,7 @@ def merge_audio_files(audio_files: List[Path], output_path: Path, ffmpeg_path: s
     print(f"Merging {len(audio_files)} audio files...")
     
     # Create concat file for FFmpeg
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False, encoding='utf-8') as f:
-        concat_file = f.name
-        for audio_file in audio_files:
-            f.write(f"file '{str(audio_file.absolute()).replace(chr(92), '/')}'\n")
+    concat_file = write_concat_file(audio_files)
     
     try:
         cmd = [ffmpeg_path, '-f', 'concat', '-safe', '0', '-i', concat_file, '-c', 'copy', '-y', str(output_path)]
@@ -232,55 +364,124 @@ def merge_audio_files(audio_files: List[Path], output_path: Path, ffmpeg_path: s
     return False
 
 
-def get_random_background_video() -> Optional[Dict]:
-    """Get random approved background video."""
+def get_random_background_video(video_id: Optional[str] = None, filters: Optional[Dict[str, str]] = None) -> Optional[Dict]:
+    """
+    Get random approved background video (or a specific one by id).
+
+    Args:
+        video_id: Specific background id to use
+        filters: Catalog facet filters, e.g. {'category': 'water'} (see background_catalog.FACETS)
+    """
     try:
-        data = load_json_file(APPROVED_VIDEOS_FILE)
-        videos = data.get('approved_videos', data.get('videos', []))
-        if not videos:
-            print("No approved videos found")
+        catalog = get_catalog()
+        if video_id is not None:
+            video = catalog.get(video_id)
+            if not video:
+                print(f"Background video {video_id} not found")
+                return None
+            return video
+
+        video = catalog.sample(filters)
+        if not video:
+            print(f"No approved videos found{f' matching {filters}' if filters else ''}")
             return None
-        
-        print(f"Loaded {len(videos)} approved background videos")
-        
-        import random
-        video = random.choice(videos)
-        if 'video_url' not in video and 'url' in video:
-            video['video_url'] = video['url']
+        print(f"Picked background {video.get('id')} from {catalog.count(filters)} approved videos")
         return video
     except Exception as e:
         print(f"Error loading approved videos: {e}")
         return None
 
 
-def download_background_video(video_info: Dict) -> Optional[Path]:
-    """Download background video."""
+def select_background_video(target_seconds: float, filters: Optional[Dict[str, str]] = None) -> Optional[Dict]:
+    """
+    Pick a background for a recitation with the scored selection policy.
+
+    Prefers clips that cover target_seconds without looping, sources close to
+    1080x1920, prepared proxies and clips that were not used recently
+    (see background_policy.py).
+    """
+    try:
+        video = select_background(get_catalog(), target_seconds, set(load_proxy_index()), filters)
+        if not video:
+            print(f"No approved videos found{f' matching {filters}' if filters else ''}")
+            return None
+        scores = video.pop('_scores', {})
+        print(f"Picked background {video.get('id')} "
+              f"({video.get('width')}x{video.get('height')}, {video.get('duration')}s, score {scores.get('total')})")
+        return video
+    except Exception as e:
+        print(f"Error selecting background video: {e}")
+        return None
+
+
+def download_background_video(video_info: Dict, group_id: Optional[str] = None) -> Optional[Path]:
+    """Download background video (served from the background cache when possible)."""
     video_url = video_info.get('video_url')
     if not video_url:
         print("No video URL found")
         return None
     
-    video_filename = f"bg_{video_info.get('id', 'video')}.mp4"
-    output_path = TEMP_AUDIO_DIR / video_filename
+    with span("download", group_id=group_id, kind="background", background_id=video_info.get('id'), url=video_url) as record:
+        session = get_http_session()
+        output_path = BACKGROUND_CACHE.get(video_url, session)
+        if output_path:
+            print(f"  Using cached background: {format_size(output_path.stat().st_size)}")
+            record.update(cache="hit", bytes=0)
+            return output_path
+        
+        print("  Downloading background video...")
+        try:
+            with get_host_semaphore(video_url):
+                output_path = BACKGROUND_CACHE.fetch(video_url, session, timeout=60)
+            print(f"  Downloaded: {format_size(output_path.stat().st_size)}")
+            record.update(cache="miss", bytes=output_path.stat().st_size)
+            return output_path
+        except Exception as e:
+            print(f"  Error downloading video: {e}")
+            record.update(cache="miss", status="failed", error=str(e))
+            return None
+
+def build_background_filter(input_label: str, output_label: str) -> List[str]:
+    """
+    Build the filter chain that turns any background clip into a 1080x1920 frame.
     
-    if output_path.exists():
-        print(f"  Using cached background: {format_size(output_path.stat().st_size)}")
-        return output_path
+    Shared by the renderer and prepare_backgrounds.py so proxies look identical
+    to clips normalized on the fly.
+    """
+    return [
+        # Scale video to COVER the entire frame (9:16) so there are NO black bars.
+        # If input is wider than 9:16, scale height to VIDEO_HEIGHT (width will be >= VIDEO_WIDTH).
+        # If input is taller (narrower) than 9:16, scale width to VIDEO_WIDTH (height will be >= VIDEO_HEIGHT).
+        f"[{input_label}]scale='if(gt(a,{9/16}),-2,{VIDEO_WIDTH})':'if(gt(a,{9/16}),{VIDEO_HEIGHT},-2)'[scaled]",
+        # Center-crop to exact 1080x1920 to guarantee no black margins and exact dimensions
+        f"[scaled]crop={VIDEO_WIDTH}:{VIDEO_HEIGHT}:(iw-{VIDEO_WIDTH})/2:(ih-{VIDEO_HEIGHT})/2[cropped]",
+        # Enhance brightness and contrast for better visibility
+        f"[cropped]eq=brightness=0.05:contrast=1.15:saturation=1.1[{output_label}]",
+    ]
+
+
+def load_proxy_index() -> Dict:
+    """Load the background proxy index ({video_id: proxy entry})."""
+    if not BACKGROUND_PROXY_INDEX.exists():
+        return {}
+    return load_json_file(BACKGROUND_PROXY_INDEX).get('proxies', {})
+
+
+def get_background_proxy(video_info: Dict) -> Optional[Path]:
+    """Get the pre-normalized proxy for a background video, if one has been prepared."""
+    entry = load_proxy_index().get(str(video_info.get('id')))
+    if not entry:
+        return None
     
-    print("  Downloading background video...")
-    try:
-        response = requests.get(video_url, timeout=60, stream=True)
-        response.raise_for_status()
-        
-        with open(output_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        
-        print(f"  Downloaded: {format_size(output_path.stat().st_size)}")
-        return output_path
-    except Exception as e:
-        print(f"  Error downloading video: {e}")
+    # A proxy built from a different source URL is stale
+    if entry.get('source_url') != video_info.get('video_url'):
         return None
+    
+    proxy_path = BACKGROUND_PROXY_DIR / entry.get('filename', '')
+    if proxy_path.is_file() and proxy_path.stat().st_size > 0:
+        return proxy_path
+    return None
+
 
 def convert_number_to_arabic(num: int) -> str:
     """Convert Western numerals to Arabic-Indic numerals."""
@@ -288,24 +489,315 @@ def convert_number_to_arabic(num: int) -> str:
                      '5': '٥', '6': '٦', '7': '٧', '8': '٨', '9': '٩'}
     return ''.join(arabic_digits.get(digit, digit) for digit in str(num))
 
+def build_header_text(group_data: Dict) -> Dict[str, str]:
+    """Static header lines (surah/ayah range and reciter, in Arabic and English) keyed by style name."""
+    surah_info = get_surah_info(group_data.get('surah', 1))
+    reciter_names = get_reciter_names(group_data.get('reciter_name', ''))
+    ayah_start = group_data.get('ayah_start', 1)
+    ayah_end = group_data.get('ayah_end', 1)
+    
+    if ayah_start == ayah_end:
+        ayah_numbers_ar = convert_number_to_arabic(ayah_start)
+        english_info = f"{surah_info['english']} | Verse {ayah_start}"
+    else:
+        ayah_numbers_ar = f"{convert_number_to_arabic(ayah_start)}-{convert_number_to_arabic(ayah_end)}"
+        english_info = f"{surah_info['english']} | Verses {ayah_start}-{ayah_end}"
+    
+    return {
+        'surah_ar': f"{surah_info['arabic']} {ayah_numbers_ar}",
+        'reciter_ar': reciter_names['arabic'],
+        'surah_en': english_info,
+        'reciter_en': reciter_names['english'],
+    }
+
+
+def build_timeline(text_data: Optional[List[tuple]]) -> List[Tuple[str, float, float]]:
+    """Turn (text, duration) tuples into back-to-back (text, start, end) entries."""
+    timeline = []
+    current_time = 0
+    for text, duration in text_data or []:
+        timeline.append((text, current_time, current_time + duration))
+        current_time += duration
+    return timeline
+
+
+def build_overlay_items(
+    header: Dict[str, str],
+    text_data: Optional[List[tuple]] = None,
+    english_text_data: Optional[List[tuple]] = None
+) -> List[Dict]:
+    """
+    Build the ordered list of text overlays for a video.
+    
+    Args:
+        header: Static lines keyed by style name (surah_ar, reciter_ar, surah_en, reciter_en)
+        text_data: Optional list of (text, duration) tuples for center Arabic text
+        english_text_data: Optional list of (text, duration) tuples for bottom English text
+    
+    Returns:
+        Overlay items ({'style', 'text', 'start', 'end'}) in drawing order
+    """
+    items = [{'style': name, 'text': header[name]} for name in ('surah_ar', 'reciter_ar')]
+    items += [{'style': 'arabic', 'text': text, 'start': start, 'end': end} for text, start, end in build_timeline(text_data)]
+    items += [{'style': name, 'text': header[name]} for name in ('surah_en', 'reciter_en')]
+    items += [{'style': 'english', 'text': text, 'start': start, 'end': end} for text, start, end in build_timeline(english_text_data)]
+    return items
+
+
+def escape_drawtext(text: str) -> str:
+    """Escape text for FFmpeg drawtext (preserve newlines for multi-line text)."""
+    # First escape special characters, but preserve actual newlines
+    escaped = text.replace(":", r"\:").replace("'", r"\'").replace(",", r"\,")
+    # Replace actual newlines with FFmpeg's newline escape sequence
+    return escaped.replace("\n", r"\n")
+
+
+def escape_filter_path(path: Path) -> str:
+    """Escape a file path for use as a filter option value."""
+    return str(path.absolute()).replace(chr(92), '/').replace(':', r'\:')
+
+
+def build_drawtext_filters(items: List[Dict], input_label: str, output_label: str, font_path: str) -> List[str]:
+    """Render overlay items as a chain of drawtext filters (one node per item)."""
+    if not items:
+        return [f"[{input_label}]null[{output_label}]"]
+    
+    filter_parts = []
+    current_filter = input_label
+    for i, item in enumerate(items):
+        style = OVERLAY_STYLES[item['style']]
+        text = wrap_text(item['text'], max_chars_per_line=style['wrap']) if 'wrap' in style else item['text']
+        color = style['color'] if style['alpha'] >= 1.0 else f"{style['color']}@{style['alpha']}"
+        y = style['y']
+        y_expr = "(h-text_h)/2" if y is None else (str(y) if y >= 0 else f"h-{-y}")
+        enable = f":enable='between(t,{item['start']},{item['end']})'" if item.get('end') is not None else ""
+        next_filter = output_label if i == len(items) - 1 else f"o{i+1}"
+        
+        filter_parts.append(
+            f"[{current_filter}]drawtext=fontfile='{font_path}':text='{escape_drawtext(text)}':"
+            f"fontsize={style['fontsize']}:fontcolor={color}:bordercolor=black:borderw={style['border']}:"
+            f"x=(w-text_w)/2:y={y_expr}{enable}[{next_filter}]"
+        )
+        current_filter = next_filter
+    return filter_parts
+
+
+def font_file_path(font_path: str) -> str:
+    """Undo the filtergraph escaping get_font_path applies (e.g. Windows drive colons)."""
+    return font_path.replace("\\:", ":")
+
+
+def get_font_family(font_path: str) -> str:
+    """Get the family name of a font file (libass selects fonts by name)."""
+    try:
+        from PIL import ImageFont
+        return ImageFont.truetype(font_file_path(font_path), 10).getname()[0]
+    except Exception:
+        return Path(font_path).stem
+
+
+def build_ass_filters(
+    items: List[Dict],
+    input_label: str,
+    output_label: str,
+    font_path: str,
+    subtitle_path: Path
+) -> Optional[List[str]]:
+    """Render overlay items as one ASS subtitle track drawn by a single libass filter."""
+    if not write_ass_file(items, OVERLAY_STYLES, subtitle_path, get_font_family(font_path), VIDEO_WIDTH, VIDEO_HEIGHT):
+        return None
+    
+    fonts_dir = Path(font_file_path(font_path)).parent
+    return [
+        f"[{input_label}]subtitles=filename='{escape_filter_path(subtitle_path)}':"
+        f"fontsdir='{escape_filter_path(fonts_dir)}'[{output_label}]"
+    ]
+
+
+def build_png_overlay_filters(
+    items: List[Dict],
+    input_label: str,
+    output_label: str,
+    font_path: str,
+    first_input_index: int
+) -> Optional[Tuple[List[str], List[Path]]]:
+    """
+    Render overlay items as cached PNGs composited with one overlay filter each.
+    
+    Text is shaped with arabic-reshaper/python-bidi and rasterized once per
+    (text, font, size, colors), so repeated lines are reused across videos.
+    
+    Returns:
+        (filter_parts, image_paths) where image_paths must be added as ffmpeg
+        inputs starting at first_input_index, or None on failure
+    """
+    if not items:
+        return [f"[{input_label}]null[{output_label}]"], []
+    
+    filter_parts = []
+    image_paths = []
+    current_filter = input_label
+    for i, item in enumerate(items):
+        style = OVERLAY_STYLES[item['style']]
+        image_path = render_text_image(
+            item['text'], font_file_path(font_path), style['fontsize'],
+            color=style['color'], alpha=style['alpha'], border_width=style['border'],
+            max_width=VIDEO_WIDTH - 2 * OVERLAY_SIDE_MARGIN
+        )
+        if not image_path:
+            return None
+        
+        y = style['y']
+        y_expr = "(H-h)/2" if y is None else (str(y) if y >= 0 else f"H-{-y}")
+        enable = f":enable='between(t,{item['start']},{item['end']})'" if item.get('end') is not None else ""
+        next_filter = output_label if i == len(items) - 1 else f"o{i+1}"
+        
+        filter_parts.append(
+            f"[{current_filter}][{first_input_index + len(image_paths)}:v]overlay=x=(W-w)/2:y={y_expr}{enable}[{next_filter}]"
+        )
+        image_paths.append(image_path)
+        current_filter = next_filter
+    return filter_parts, image_paths
+
+
+def get_subtitle_path(group_data: Dict) -> Path:
+    """Where the ASS overlay backend writes a group's subtitle track."""
+    return TEMP_AUDIO_DIR / f"{group_data.get('group_id', 'overlay')}.ass"
+
+
+def get_encoder_args(profile_name: str, threads: Optional[int] = None) -> List[str]:
+    """Build x264 encoder arguments for a named profile (threads overrides ENCODER_THREADS)."""
+    profile = ENCODER_PROFILES[profile_name]
+    args = [
+        '-c:v', 'libx264',
+        '-preset', profile['preset'],
+        '-crf', str(profile['crf']),
+        '-profile:v', 'high',  # High profile for better compression
+        '-level', '4.2',  # H.264 level for HD video
+    ]
+    if profile['maxrate']:
+        # Cap peaks so CRF cannot blow up the file on busy backgrounds
+        args += ['-maxrate', profile['maxrate'], '-bufsize', profile['bufsize']]
+    if profile['gop']:
+        args += ['-g', str(profile['gop'])]
+    threads = profile['threads'] or threads or ENCODER_THREADS
+    if threads:
+        args += ['-threads', str(threads)]
+    return args
+
+
+def build_render_inputs(
+    group_data: Dict,
+    text_data: Optional[List[tuple]],
+    english_text_data: Optional[List[tuple]],
+    video_info: Dict,
+    font_path: str,
+    profile_name: str,
+    overlay_backend: str,
+    audio_mode: str
+) -> Dict:
+    """
+    Everything that affects a rendered video, in a JSON-serializable form.
+    
+    Thread counts are left out on purpose: they change encode speed, not the picture.
+    """
+    is_proxy = get_background_proxy(video_info) is not None
+    return {
+        'version': RENDER_MANIFEST_VERSION,
+        'audio_urls': [ayah.get('audio_url') for ayah in group_data.get('ayahs', [])],
+        'audio_mode': audio_mode,
+        'audio_bitrate': AUDIO_BITRATE,
+        'overlay_items': build_overlay_items(build_header_text(group_data), text_data, english_text_data),
+        'overlay_backend': overlay_backend,
+        'overlay_styles': OVERLAY_STYLES,
+        'text_render_version': RENDER_VERSION,
+        'font': font_path,
+        'background': {'id': str(video_info.get('id')), 'url': video_info.get('video_url'), 'proxy': is_proxy},
+        'background_filter': ["[0:v]null[adjusted]"] if is_proxy else build_background_filter("0:v", "adjusted"),
+        'encoder_profile': profile_name,
+        'encoder': {k: v for k, v in ENCODER_PROFILES.get(profile_name, {}).items() if k != 'threads'},
+        'video': {'width': VIDEO_WIDTH, 'height': VIDEO_HEIGHT, 'fps': VIDEO_FPS},
+    }
+
+
+def compute_render_key(render_inputs: Dict) -> str:
+    """Stable hash of the render inputs."""
+    payload = json.dumps(render_inputs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def render_manifest_path(output_path: Path) -> Path:
+    """Manifest stored next to a rendered video ({name}.manifest.json)."""
+    return output_path.with_name(f"{output_path.stem}.manifest.json")
+
+
+def load_render_manifest(output_path: Path) -> Optional[Dict]:
+    """Load the render manifest for an output video, if any."""
+    manifest_path = render_manifest_path(output_path)
+    if not manifest_path.exists():
+        return None
+    manifest = load_json_file(manifest_path)
+    return manifest or None
+
+
+def save_render_manifest(output_path: Path, render_key: str, render_inputs: Dict, stats: Dict):
+    """Write the render manifest for an output video (atomic rewrite)."""
+    manifest_path = render_manifest_path(output_path)
+    manifest = {
+        'render_key': render_key,
+        'output': output_path.name,
+        'size_bytes': output_path.stat().st_size,
+        'background_id': render_inputs['background']['id'],
+        'created': datetime.now().isoformat(),
+        'stats': stats,
+        'inputs': render_inputs,
+    }
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=manifest_path.parent, prefix=f".{manifest_path.name}-", suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, manifest_path)
+    except Exception as e:
+        print(f"Could not save render manifest: {e}")
+
+
+def is_render_current(output_path: Path, manifest: Optional[Dict], render_key: str) -> bool:
+    """Check that an output exists and was rendered from exactly these inputs."""
+    if not manifest or manifest.get('render_key') != render_key:
+        return False
+    if not output_path.exists():
+        return False
+    return output_path.stat().st_size == manifest.get('size_bytes')
+
+
 def create_simple_video(
     group_data: Dict,
     audio_path: Path,
     output_path: Path,
     ffmpeg_path: str,
     text_data: Optional[List[tuple]] = None,
-    english_text_data: Optional[List[tuple]] = None
+    english_text_data: Optional[List[tuple]] = None,
+    overlay_backend: Optional[str] = None,
+    encoder_profile: Optional[str] = None,
+    background_id: Optional[str] = None,
+    audio_is_concat: bool = False,
+    encoder_threads: Optional[int] = None
 ) -> bool:
     """
     Create video with background, audio, and text overlays.
     
     Args:
         group_data: Group metadata
-        audio_path: Path to merged audio
+        audio_path: Path to merged audio, or to a concat list when audio_is_concat
         output_path: Output video path
         ffmpeg_path: FFmpeg executable path
         text_data: Optional list of (text, duration) tuples to display in center (Arabic)
         english_text_data: Optional list of (text, duration) tuples to display at bottom (English)
+        overlay_backend: Text overlay backend ("drawtext", "ass" or "png", default OVERLAY_BACKEND)
+        encoder_profile: Encoder profile name (default ENCODER_PROFILE)
+        background_id: Optional approved background id (random when omitted)
+        audio_is_concat: Read audio_path with the concat demuxer (single-pass audio)
+        encoder_threads: x264 threads for profiles with threads=0 (default ENCODER_THREADS)
     """
     print(f"\n{'='*70}")
     print("CREATING VIDEO WITH TEXT OVERLAY")
@@ -314,41 +806,40 @@ def create_simple_video(
     audio_duration = group_data.get('duration_ms', 0) / 1000.0
     print(f"Audio duration: {audio_duration:.1f}s")
     
-    video_info = get_random_background_video()
-    if not video_info:
+    profile_name = (encoder_profile or ENCODER_PROFILE).lower()
+    if profile_name not in ENCODER_PROFILES:
+        print(f"Unknown encoder profile: {profile_name} (expected one of {', '.join(ENCODER_PROFILES)})")
         return False
     
-    print(f"Selected background: {video_info.get('tags', 'video')[:50]}")
-    
-    bg_video_path = download_background_video(video_info)
-    if not bg_video_path:
+    if background_id is not None:
+        video_info = get_random_background_video(background_id)
+    else:
+        video_info = select_background_video(audio_duration)
+    if not video_info:
         return False
     
-    # Get metadata
-    surah_info = get_surah_info(group_data.get('surah', 1))
-    reciter_names = get_reciter_names(group_data.get('reciter_name', ''))
-    ayah_start = group_data.get('ayah_start', 1)
-    ayah_end = group_data.get('ayah_end', 1)
-    
-    # Convert numbers to Arabic numerals
-    arabic_digits = '٠١٢٣٤٥٦٧٨٩'
-    to_arabic_numerals = lambda num: ''.join(arabic_digits[int(d)] if d.isdigit() else d for d in str(num))
+    print(f"Selected background: {video_info.get('tags', 'video')[:50]}")
     
-    # Prepare text overlays
-    surah_arabic = surah_info['arabic']
-    ayah_numbers_ar = to_arabic_numerals(ayah_start) if ayah_start == ayah_end else f"{to_arabic_numerals(ayah_start)}-{to_arabic_numerals(ayah_end)}"
-    top_arabic = f"{surah_arabic} {ayah_numbers_ar}"
-    reciter_arabic = reciter_names['arabic']
+    group_id = group_data.get('group_id')
+    bg_video_path = get_background_proxy(video_info)
+    is_proxy = bg_video_path is not None
+    if is_proxy:
+        print(f"  Using prepared proxy: {bg_video_path.name}")
+        with span("download", group_id=group_id, kind="background", background_id=video_info.get('id'),
+                  proxy=True, cache="hit", bytes=0):
+            pass
+    else:
+        bg_video_path = download_background_video(video_info, group_id)
+        if not bg_video_path:
+            return False
     
-    surah_english = surah_info['english']
-    english_info = f"{surah_english} | Verse {ayah_start}" if ayah_start == ayah_end else f"{surah_english} | Verses {ayah_start}-{ayah_end}"
-    reciter_english = reciter_names['english']
+    header = build_header_text(group_data)
     
     print(f"\nText overlay:")
-    print(f"  Top: {top_arabic}")
-    print(f"  Top 2: {reciter_arabic}")
-    print(f"  Bottom: {english_info}")
-    print(f"  Bottom 2: {reciter_english}")
+    print(f"  Top: {header['surah_ar']}")
+    print(f"  Top 2: {header['reciter_ar']}")
+    print(f"  Bottom: {header['surah_en']}")
+    print(f"  Bottom 2: {header['reciter_en']}")
     
     if text_data:
         print(f"  Center text items: {len(text_data)}")
@@ -358,108 +849,54 @@ def create_simple_video(
 
     print(f"\nBuilding video with FFmpeg...")
     
-    # Escape text for FFmpeg (preserve newlines for multi-line text)
-    def escape_text(text):
-        # First escape special characters, but preserve actual newlines
-        escaped = text.replace(":", r"\:").replace("'", r"\'").replace(",", r"\,")
-        # Replace actual newlines with FFmpeg's newline escape sequence
-        escaped = escaped.replace("\n", r"\n")
-        return escaped
-    
-    top_arabic_esc, reciter_arabic_esc = escape_text(top_arabic), escape_text(reciter_arabic)
-    english_info_esc, reciter_english_esc = escape_text(english_info), escape_text(reciter_english)
-    
     # Get appropriate font path for the platform
     font_path = get_font_path()
     print(f"Using font: {font_path}")
     
-    # Create filter complex with proper scaling and cropping for Instagram Reels (9:16 aspect ratio)
-    # This ensures NO black margins and perfect fit
-    filter_parts = [
-        # Scale video to COVER the entire frame (9:16) so there are NO black bars.
-        # If input is wider than 9:16, scale height to VIDEO_HEIGHT (width will be >= VIDEO_WIDTH).
-        # If input is taller (narrower) than 9:16, scale width to VIDEO_WIDTH (height will be >= VIDEO_HEIGHT).
-        f"[0:v]scale='if(gt(a,{9/16}),-2,{VIDEO_WIDTH})':'if(gt(a,{9/16}),{VIDEO_HEIGHT},-2)'[scaled]",
-        # Center-crop to exact 1080x1920 to guarantee no black margins and exact dimensions
-        f"[scaled]crop={VIDEO_WIDTH}:{VIDEO_HEIGHT}:(iw-{VIDEO_WIDTH})/2:(ih-{VIDEO_HEIGHT})/2[cropped]",
-        # Enhance brightness and contrast for better visibility
-        f"[cropped]eq=brightness=0.05:contrast=1.15:saturation=1.1[adjusted]",
-        f"[adjusted]drawtext=fontfile='{font_path}':text='{top_arabic_esc}':fontsize=50:fontcolor=gold:bordercolor=black:borderw=2:x=(w-text_w)/2:y=220[t1]",
-        f"[t1]drawtext=fontfile='{font_path}':text='{reciter_arabic_esc}':fontsize=40:fontcolor=white@0.9:bordercolor=black:borderw=2:x=(w-text_w)/2:y=280[t2]",
-    ]
-    
-    # Add center text with timing if provided (Arabic - larger font)
-    current_filter = "t2"
-    if text_data:
-        current_time = 0
-        for i, (text, duration) in enumerate(text_data):
-            start_time = current_time
-            end_time = current_time + duration
-            # Wrap text to prevent overflow (20 chars per line for 70px Arabic font to ensure no overflow)
-            wrapped_text = wrap_text(text, max_chars_per_line=20)
-            text_esc = escape_text(wrapped_text)
-            next_filter = f"c{i+1}" if i < len(text_data) - 1 else "t3"
-            
-            # Larger Arabic font (70px) with proper positioning
-            filter_parts.append(
-                f"[{current_filter}]drawtext=fontfile='{font_path}':"
-                f"text='{text_esc}':fontsize=60:fontcolor=white:bordercolor=black:borderw=3:"
-                f"x=(w-text_w)/2:y=(h-text_h)/2:"
-                f"enable='between(t,{start_time},{end_time})'[{next_filter}]"
-            )
-            current_filter = next_filter
-            current_time = end_time
-    else:
-        filter_parts.append(f"[{current_filter}]null[t3]")
-        current_filter = "t3"
-    
-    # Add bottom static text (English info and reciter)
-    filter_parts.append(
-        f"[{current_filter}]drawtext=fontfile='{font_path}':text='{english_info_esc}':"
-        f"fontsize=45:fontcolor=gold:bordercolor=black:borderw=2:x=(w-text_w)/2:y=h-280[t4]"
-    )
-    
-    filter_parts.append(
-        f"[t4]drawtext=fontfile='{font_path}':text='{reciter_english_esc}':"
-        f"fontsize=38:fontcolor=white@0.9:bordercolor=black:borderw=2:x=(w-text_w)/2:y=h-220[t5]"
-    )
-    
-    # Add bottom English text with timing if provided (higher position)
-    current_filter = "t5"
-    if english_text_data:
-        current_time = 0
-        for i, (text, duration) in enumerate(english_text_data):
-            start_time = current_time
-            end_time = current_time + duration
-            # Wrap text to prevent overflow (18 chars per line for 48px English font to ensure no overflow)
-            wrapped_text = wrap_text(text, max_chars_per_line=18)
-            text_esc = escape_text(wrapped_text)
-            next_filter = f"be{i+1}" if i < len(english_text_data) - 1 else "output"
-            
-            # English text positioned higher (y=h-350) with larger font 
-            filter_parts.append(
-                f"[{current_filter}]drawtext=fontfile='{font_path}':"
-                f"text='{text_esc}':fontsize=32:fontcolor=white:bordercolor=black:borderw=2:"
-                f"x=(w-text_w)/2:y=h-350:"
-                f"enable='between(t,{start_time},{end_time})'[{next_filter}]"
-            )
-            current_filter = next_filter
-            current_time = end_time
-    else:
-        filter_parts.append(f"[{current_filter}]null[output]")
+    backend = (overlay_backend or OVERLAY_BACKEND).lower()
+    with span("filter_graph", group_id=group_id, backend=backend) as record:
+        # Create filter complex with proper scaling and cropping for Instagram Reels (9:16 aspect ratio)
+        # This ensures NO black margins and perfect fit
+        # Proxies are already cropped and color-adjusted, so skip the expensive scale/crop/eq
+        filter_parts = ["[0:v]null[adjusted]"] if is_proxy else build_background_filter("0:v", "adjusted")
+    
+        overlay_items = build_overlay_items(header, text_data, english_text_data)
+    
+        print(f"Overlay backend: {backend} ({len(overlay_items)} text items)")
+        record['items'] = len(overlay_items)
+        overlay_inputs = []
+        if backend == "png":
+            # Inputs 0 and 1 are the background and the audio
+            png_overlay = build_png_overlay_filters(overlay_items, "adjusted", "output", font_path, first_input_index=2)
+            if not png_overlay:
+                record['status'] = "failed"
+                return False
+            overlay_filters, overlay_inputs = png_overlay
+        elif backend == "ass":
+            subtitle_path = get_subtitle_path(group_data)
+            overlay_filters = build_ass_filters(overlay_items, "adjusted", "output", font_path, subtitle_path)
+            if not overlay_filters:
+                record['status'] = "failed"
+                return False
+        elif backend == "drawtext":
+            overlay_filters = build_drawtext_filters(overlay_items, "adjusted", "output", font_path)
+        else:
+            print(f"Unknown overlay backend: {backend} (expected one of {', '.join(OVERLAY_BACKENDS)})")
+            record['status'] = "failed"
+            return False
+        filter_parts += overlay_filters
     
-    filter_complex = ";".join(filter_parts)
+        filter_complex = ";".join(filter_parts)
     
     # High-quality encoding settings for Instagram Reels
     cmd = [
-        ffmpeg_path, '-stream_loop', '-1', '-i', str(bg_video_path), '-i', str(audio_path),
+        ffmpeg_path, '-stream_loop', '-1', '-i', str(bg_video_path),
+        # Ayah list goes through the concat demuxer so AAC is encoded once from the sources
+        *(['-f', 'concat', '-safe', '0'] if audio_is_concat else []), '-i', str(audio_path),
+        *[arg for image_path in overlay_inputs for arg in ('-i', str(image_path))],
         '-filter_complex', filter_complex, '-map', '[output]', '-map', '1:a',
-        # Video encoding with higher quality
-        '-c:v', 'libx264',
-        '-preset', 'slow',  # Slower preset = better quality
-        '-crf', '18',  # Lower CRF = higher quality (18 is visually lossless)
-        '-profile:v', 'high',  # High profile for better compression
-        '-level', '4.2',  # H.264 level for HD video
+        # Video encoding (preset/CRF/rate cap/GOP/threads come from the encoder profile)
+        *get_encoder_args(profile_name, encoder_threads),
         '-pix_fmt', 'yuv420p',  # Pixel format for maximum compatibility
         '-movflags', '+faststart',  # Optimize for streaming
         # Audio encoding with higher quality
@@ -473,31 +910,53 @@ def create_simple_video(
         '-y', str(output_path)
     ]
     
-    print("  Encoding video...")
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    print(f"  Encoding video (profile: {profile_name})...")
+    with span("encode", group_id=group_id, profile=profile_name, backend=backend, cache="miss") as record:
+        # Progress is parsed live (ETA every FFMPEG_PROGRESS_INTERVAL s); only the stderr tail is kept
+        result = run_ffmpeg(cmd, audio_duration, progress_printer(f"[{group_id}] " if group_id else ""))
+        encode_seconds = result.seconds
+        encode_speed = round(result.speed, 2) if result.speed else None
+        record['speed'] = encode_speed
+        if result.returncode != 0 or not output_path.exists():
+            record['status'] = "failed"
+        else:
+            record['bytes'] = output_path.stat().st_size
     
     if result.returncode != 0:
         print(f"\nFFmpeg error:\n{result.stderr}")
-        cleanup_temp_files(bg_video_path)
+        cleanup_temp_files()
         return False
     
     if output_path.exists() and output_path.stat().st_size > 0:
+        frames = (result.progress.frame if result.progress else None) or int(audio_duration * VIDEO_FPS)
+        ENCODE_STATS[str(output_path)] = {
+            'profile': profile_name,
+            'background_id': video_info.get('id'),
+            'encode_seconds': round(encode_seconds, 2),
+            'frames': frames,
+            'encode_fps': round(frames / encode_seconds, 2) if encode_seconds > 0 else None,
+            'encode_speed': encode_speed,
+            'size_bytes': output_path.stat().st_size,
+        }
         print(f"\n{'='*70}")
-        print(f"SUCCESS! Video created: {format_size(output_path.stat().st_size)}")
+        print(f"SUCCESS! Video created: {format_size(output_path.stat().st_size)} "
+              f"in {encode_seconds:.1f}s ({ENCODE_STATS[str(output_path)]['encode_fps']} fps, {encode_speed or '?'}x realtime)")
         print(f"{'='*70}")
-        cleanup_temp_files(bg_video_path)
+        record_background_use(video_info.get('id'))
+        cleanup_temp_files()
         return True
     else:
         print("Video file is empty or missing")
-        cleanup_temp_files(bg_video_path)
+        cleanup_temp_files()
         return False
 
 
-def cleanup_temp_files(bg_video_path: Optional[Path] = None):
-    """Clean up temporary audio and video files."""
+def cleanup_temp_files():
+    """Clean up temporary files and trim the media caches to their size budgets."""
     print("\nCleaning up temporary files...")
     
     if TEMP_AUDIO_DIR.exists():
+        # Leftovers from older versions that stored ayahs by position
         for temp_file in TEMP_AUDIO_DIR.glob("ayah_*.mp3"):
             try:
                 temp_file.unlink()
@@ -505,96 +964,38 @@ def cleanup_temp_files(bg_video_path: Optional[Path] = None):
             except Exception as e:
                 print(f"  Could not remove {temp_file.name}: {e}")
     
-    if bg_video_path and bg_video_path.exists():
-        try:
-            bg_video_path.unlink()
-            print(f"  Removed: {bg_video_path.name}")
-        except Exception as e:
-            print(f"  Could not remove {bg_video_path.name}: {e}")
+    for name, cache in (("audio", AUDIO_CACHE), ("background", BACKGROUND_CACHE)):
+        freed = cache.evict()
+        if freed:
+            print(f"  Evicted {format_size(freed)} from {name} cache")
     
     print("Cleanup complete.")
 
 
-def process_group(group_id: str, ffmpeg_path: str, text_data: Optional[List[tuple]] = None, english_text_data: Optional[List[tuple]] = None) -> bool:
-    """Process a single group to create video.
-    
-    Args:
-        group_id: The group identifier
-        ffmpeg_path: Path to FFmpeg executable
-        text_data: Optional list of (text, duration) tuples for center text display
-        english_text_data: Optional list of (text, duration) tuples for bottom English text display
+def extract_text_segments(group_data: Dict) -> Tuple[List[tuple], List[tuple]]:
     """
-    # Clear global text arrays at the start
-    global ARABIC_TEXT, ENGLISH_TEXT
-    ARABIC_TEXT.clear()
-    ENGLISH_TEXT.clear()
-    
-    print(f"\n{'='*80}")
-    print("SIMPLE QURAN VIDEO GENERATOR")
-    print(f"{'='*80}")
-    print(f"Group ID: {group_id}")
-    print(f"{'='*80}")
-    
-    # Find and load group file
-    reciter_num = group_id.split('_')[0].replace('reciter', '')
-    group_files = list(QURAN_GROUPS_DIR.glob(f"reciter_{reciter_num}_*_groups.json"))
+    Build timed overlay text from a group's ayahs.
     
-    if not group_files:
-        print(f"Error: Group file not found for reciter {reciter_num}")
-        return False
-    
-    print(f"Loading: {group_files[0].name}")
-    groups_data = load_json_file(group_files[0])
-    group_data = groups_data.get('groups', {}).get(group_id)
-    
-    if not group_data:
-        print(f"Error: Group ID {group_id} not found in file")
-        return False
-    
-    group_data['group_id'] = group_id
-    group_data['reciter_name'] = groups_data.get('reciter_name', '')
-    
-    # Show group info
-    surah_info = get_surah_info(group_data.get('surah', 1))
-    reciter_names = get_reciter_names(group_data.get('reciter_name', ''))
-    
-    print(f"\nGroup Information:")
-    print(f"  Surah: {surah_info['english']} ({surah_info['arabic']})")
-    print(f"  Ayahs: {group_data.get('ayah_start')}-{group_data.get('ayah_end')}")
-    print(f"  Reciter: {reciter_names['english']}")
-    print(f"  Duration: {group_data.get('duration_ms', 0) / 1000:.1f}s")
-    
-    # Process audio
-    print(f"\n{'='*70}\nAUDIO PROCESSING\n{'='*70}")
-    ayahs = group_data.get('ayahs', [])
-    print(f"Processing {len(ayahs)} ayahs")
-    
-    audio_files = [audio_path for i, ayah in enumerate(ayahs) if (audio_path := process_ayah_audio(ayah, i, len(ayahs)))]
-    
-    if not audio_files:
-        print("Error: No audio files processed")
-        return False
-    
-    # Merge audio
-    merged_audio_path = MERGED_AUDIO_DIR / f"{group_id}_merged.mp3"
-    if not merge_audio_files(audio_files, merged_audio_path, ffmpeg_path):
-        return False
+    Returns:
+        (arabic_text, english_text) lists of (text, duration) tuples
+    """
+    arabic_text = []
+    english_text = []
     
-    # Populate text overlays from ayah data (if not disabled)
     def extract_arabic_text(segments, words, verse_num_arabic, lower_limit=5, upper_limit=8):
         if(len(words) == 0) or len(segments) == 0:
             return
         if len(words) < lower_limit:
             duration = ((segments[-1][-1] - segments[0][2]) / 1000.0) + 1
-            ARABIC_TEXT.append(("﴾" + " ".join(words) + f" ﴿{verse_num_arabic}", duration))
+            arabic_text.append(("﴾" + " ".join(words) + f" ﴿{verse_num_arabic}", duration))
         elif len(words) >= lower_limit and len(words) < upper_limit:
             duration1 = ((segments[len(words)//2][-1] - segments[0][2]) / 1000.0) + 1
             duration2 = ((segments[-1][-1] - segments[len(words)//2 + 1][2]) / 1000.0) + 1
-            ARABIC_TEXT.append((" ".join(words[:len(words)//2]), duration1))
-            ARABIC_TEXT.append(("﴾" + " ".join(words[len(words)//2:]) + f" ﴿{verse_num_arabic}", duration2))
+            arabic_text.append((" ".join(words[:len(words)//2]), duration1))
+            arabic_text.append(("﴾" + " ".join(words[len(words)//2:]) + f" ﴿{verse_num_arabic}", duration2))
         else:
             duration = ((segments[lower_limit-1][-1] - segments[0][2]) / 1000.0) + 1.5
-            ARABIC_TEXT.append((" ".join(words[:lower_limit]), duration))
+            arabic_text.append((" ".join(words[:lower_limit]), duration))
             extract_arabic_text(segments[lower_limit:], words=words[lower_limit:],verse_num_arabic=verse_num_arabic)
     
     def extract_english_text(words, duration, lower_limit=10):
@@ -603,7 +1004,7 @@ def process_group(group_id: str, ffmpeg_path: str, text_data: Optional[List[tupl
         for i in range(groups):
             start = i * lower_limit
             end = start + lower_limit
-            ENGLISH_TEXT.append((" ".join(words[start:end]), group_duration))
+            english_text.append((" ".join(words[start:end]), group_duration))
     
     # Extract text from ayahs
     for ayah in group_data.get('ayahs', []):
@@ -625,28 +1026,372 @@ def process_group(group_id: str, ffmpeg_path: str, text_data: Optional[List[tupl
         extract_arabic_text(segments, words=words, verse_num_arabic=verse_num_arabic)
         extract_english_text(english_words, ayah.get('duration_ms', 0) / 1000.0)
     
-    print(f"Generated {len(ARABIC_TEXT)} Arabic text segments")
-    print(f"Generated {len(ENGLISH_TEXT)} English text segments")
+    return arabic_text, english_text
+
+
+def process_group(
+    group_id: str,
+    ffmpeg_path: str,
+    text_data: Optional[List[tuple]] = None,
+    english_text_data: Optional[List[tuple]] = None,
+    overlay_backend: Optional[str] = None,
+    encoder_profile: Optional[str] = None,
+    background_id: Optional[str] = None,
+    output_video_path: Optional[Path] = None,
+    audio_mode: Optional[str] = None,
+    force: bool = False,
+    encoder_threads: Optional[int] = None
+) -> bool:
+    """Process a single group to create video.
     
-    # Use populated text arrays unless disabled by function parameters
-    final_arabic_text = ARABIC_TEXT if text_data is None else text_data
-    final_english_text = ENGLISH_TEXT if english_text_data is None else english_text_data
+    The output is skipped when it already exists and its render manifest
+    ({name}.manifest.json) has the same render key, i.e. nothing that affects
+    the video changed since it was rendered.
     
-    # Create video
-    print(f"\n{'='*70}\nVIDEO GENERATION\n{'='*70}")
-    output_video_path = OUTPUT_VIDEO_DIR / f"{group_id}.mp4"
+    Args:
+        group_id: The group identifier
+        ffmpeg_path: Path to FFmpeg executable
+        text_data: Optional list of (text, duration) tuples for center text display
+            (None = extract from ayah data, [] = no center text)
+        english_text_data: Optional list of (text, duration) tuples for bottom English text display
+            (None = extract from ayah data, [] = no English text)
+        overlay_backend: Text overlay backend ("drawtext", "ass" or "png", default OVERLAY_BACKEND)
+        encoder_profile: Encoder profile name (default ENCODER_PROFILE)
+        background_id: Optional approved background id (default: the previous render's, else picked by policy)
+        output_video_path: Output path (default generated_videos/{group_id}.mp4)
+        audio_mode: "direct" (single-pass) or "merged" (default AUDIO_MODE)
+        force: Re-render even if the output is up to date
+        encoder_threads: x264 threads for profiles with threads=0 (default ENCODER_THREADS)
+    """
+    print(f"\n{'='*80}")
+    print("SIMPLE QURAN VIDEO GENERATOR")
+    print(f"{'='*80}")
+    print(f"Group ID: {group_id}")
+    print(f"{'='*80}")
     
-    if not create_simple_video(group_data, merged_audio_path, output_video_path, ffmpeg_path, final_arabic_text, final_english_text):
+    # Find and load group file
+    group_data = load_group(group_id)
+    if not group_data:
         return False
     
+    # Show group info
+    surah_info = get_surah_info(group_data.get('surah', 1))
+    reciter_names = get_reciter_names(group_data.get('reciter_name', ''))
+    
+    print(f"\nGroup Information:")
+    print(f"  Surah: {surah_info['english']} ({surah_info['arabic']})")
+    print(f"  Ayahs: {group_data.get('ayah_start')}-{group_data.get('ayah_end')}")
+    print(f"  Reciter: {reciter_names['english']}")
+    print(f"  Duration: {group_data.get('duration_ms', 0) / 1000:.1f}s")
+    
+    mode = (audio_mode or AUDIO_MODE).lower()
+    if mode not in AUDIO_MODES:
+        print(f"Unknown audio mode: {mode} (expected one of {', '.join(AUDIO_MODES)})")
+        return False
+    profile_name = (encoder_profile or ENCODER_PROFILE).lower()
+    backend = (overlay_backend or OVERLAY_BACKEND).lower()
+    
+    # Populate text overlays from ayah data (if not disabled)
+    with span("text_extraction", group_id=group_id) as record:
+        arabic_text, english_text = extract_text_segments(group_data)
+        record['segments'] = len(arabic_text) + len(english_text)
+    print(f"Generated {len(arabic_text)} Arabic text segments")
+    print(f"Generated {len(english_text)} English text segments")
+    
+    # Use populated text arrays unless overridden by function parameters
+    final_arabic_text = arabic_text if text_data is None else text_data
+    final_english_text = english_text if english_text_data is None else english_text_data
+    
+    output_video_path = output_video_path or OUTPUT_VIDEO_DIR / f"{group_id}.mp4"
+    
+    # Keep the previous render's background so unchanged inputs produce the same key
+    manifest = load_render_manifest(output_video_path)
+    if background_id is None and manifest and get_catalog().get(manifest.get('background_id')):
+        background_id = manifest['background_id']
+        print(f"Reusing background {background_id} from the previous render")
+    
+    if background_id is not None and not force:
+        video_info = get_random_background_video(background_id)
+        if video_info:
+            render_inputs = build_render_inputs(group_data, final_arabic_text, final_english_text, video_info,
+                                                get_font_path(), profile_name, backend, mode)
+            if is_render_current(output_video_path, manifest, compute_render_key(render_inputs)):
+                ENCODE_STATS[str(output_video_path)] = dict(manifest.get('stats', {}), cached=True)
+                with span("encode", group_id=group_id, profile=profile_name, backend=backend, cache="hit", bytes=0):
+                    pass
+                print(f"\n{'='*80}\nUP TO DATE: {output_video_path} matches render key, skipping render\n{'='*80}")
+                return True
+    
+    # Resolve the background here so its cached clip can be pinned along with the audio
+    video_info = get_random_background_video(background_id) if background_id is not None else \
+        select_background_video(group_data.get('duration_ms', 0) / 1000.0)
+    if not video_info:
+        return False
+    background_id = video_info.get('id')
+    
+    # Other renders in this process (render_batch jobs) trim the caches when they finish,
+    # so keep this group's files pinned until its encode is done
+    audio_urls = [ayah['audio_url'] for ayah in group_data.get('ayahs', []) if ayah.get('audio_url')]
+    background_urls = [video_info['video_url']] if video_info.get('video_url') else []
+    with AUDIO_CACHE.pinned(audio_urls), BACKGROUND_CACHE.pinned(background_urls):
+        # Process audio
+        print(f"\n{'='*70}\nAUDIO PROCESSING\n{'='*70}")
+        ayahs = group_data.get('ayahs', [])
+        print(f"Processing {len(ayahs)} ayahs")
+        
+        audio_files = [audio_path for audio_path in download_ayah_audio_files(ayahs, group_id) if audio_path]
+        
+        if not audio_files:
+            print("Error: No audio files processed")
+            return False
+        
+        # Either merge to an intermediate MP3 or hand the ayah files straight to the final render
+        if mode == "merged":
+            audio_path = MERGED_AUDIO_DIR / f"{group_id}_merged.mp3"
+            with span("merge", group_id=group_id, files=len(audio_files)) as record:
+                merged = merge_audio_files(audio_files, audio_path, ffmpeg_path)
+                record.update(status="ok" if merged else "failed", bytes=audio_path.stat().st_size if merged else 0)
+            if not merged:
+                return False
+        else:
+            audio_path = Path(write_concat_file(audio_files))
+            print(f"Streaming {len(audio_files)} ayah files directly into the final render")
+        
+        # Create video
+        print(f"\n{'='*70}\nVIDEO GENERATION\n{'='*70}")
+        
+        try:
+            rendered = create_simple_video(group_data, audio_path, output_video_path, ffmpeg_path, final_arabic_text, final_english_text,
+                                           backend, profile_name, background_id, audio_is_concat=(mode == "direct"),
+                                           encoder_threads=encoder_threads)
+        finally:
+            # Per-render temporaries: the concat list and the ASS overlay track
+            temporaries = [get_subtitle_path(group_data)] + ([audio_path] if mode == "direct" else [])
+            for temp_path in temporaries:
+                try:
+                    os.unlink(temp_path)
+                except OSError:
+                    pass
+    if not rendered:
+        return False
+    
+    stats = ENCODE_STATS.get(str(output_video_path), {})
+    video_info = get_random_background_video(stats.get('background_id')) if stats.get('background_id') else None
+    if video_info:
+        render_inputs = build_render_inputs(group_data, final_arabic_text, final_english_text, video_info,
+                                            get_font_path(), profile_name, backend, mode)
+        save_render_manifest(output_video_path, compute_render_key(render_inputs), render_inputs, stats)
+    
     print(f"\n{'='*80}\nSUCCESS!\n{'='*80}")
-    print(f"Audio: {merged_audio_path}")
+    if mode == "merged":
+        print(f"Audio: {audio_path}")
     print(f"Video: {output_video_path}")
     print(f"{'='*80}")
     
     return True
 
 
+def prefetch_group_assets(group_id: str, output_video_path: Optional[Path] = None) -> Optional[str]:
+    """
+    Download everything a group's render needs into the media caches.
+
+    Fetches the ayah audio and picks the background the same way process_group
+    would (the previous render's, else the selection policy), then downloads it
+    unless a proxy is prepared. Passing the returned id to process_group makes
+    the render itself network-free. A newly picked background is recorded as
+    used right away, and the fetched files stay pinned in the caches until
+    release_group_assets(group_id).
+
+    Args:
+        group_id: The group identifier
+        output_video_path: Output path the group will be rendered to (default generated_videos/{group_id}.mp4)
+
+    Returns:
+        Background id to render with, or None if an asset could not be fetched
+    """
+    group_data = load_group(group_id)
+    if not group_data:
+        return None
+
+    ayahs = group_data.get('ayahs', [])
+    # Pin before downloading: renders of earlier groups evict the caches while this one waits
+    pin_group_asset(group_id, AUDIO_CACHE, [ayah['audio_url'] for ayah in ayahs if ayah.get('audio_url')])
+    audio_files = download_ayah_audio_files(ayahs, group_id)
+    if not ayahs or not all(audio_files):
+        print(f"Prefetch {group_id}: {sum(1 for path in audio_files if path)}/{len(ayahs)} ayah files downloaded")
+        return None
+
+    manifest = load_render_manifest(output_video_path or OUTPUT_VIDEO_DIR / f"{group_id}.mp4")
+    video_info = None
+    if manifest and manifest.get('background_id') is not None:
+        video_info = get_catalog().get(manifest['background_id'])
+    if not video_info:
+        video_info = select_background_video(group_data.get('duration_ms', 0) / 1000.0)
+        if not video_info:
+            return None
+        # Count it as used now, so the next group's prefetch (before this render finishes) picks another
+        record_background_use(video_info.get('id'))
+
+    if not get_background_proxy(video_info):
+        if video_info.get('video_url'):
+            pin_group_asset(group_id, BACKGROUND_CACHE, [video_info['video_url']])
+        if not download_background_video(video_info, group_id):
+            return None
+    return str(video_info.get('id'))
+
+
+def pin_group_asset(group_id: str, cache: MediaCache, urls: List[str]):
+    """Keep a group's cached files from being evicted until release_group_assets(group_id)."""
+    with _group_pins_lock:
+        pins = _group_pins.setdefault(group_id, [])
+        for url in urls:
+            cache.pin(url)
+            pins.append((cache, url))
+
+
+def release_group_assets(group_id: str):
+    """Unpin everything prefetch_group_assets pinned for a group (no-op if nothing is pinned)."""
+    with _group_pins_lock:
+        pins = _group_pins.pop(group_id, [])
+    for cache, url in pins:
+        cache.unpin(url)
+
+
+def benchmark_profiles(group_id: str, ffmpeg_path: str, profiles: List[str], overlay_backend: Optional[str] = None, audio_mode: Optional[str] = None) -> List[Dict]:
+    """
+    Render one group with each encoder profile and report encode speed and size.
+    
+    All profiles use the same background so results are comparable; audio and
+    background downloads are cached after the first run.
+    """
+    group_data = load_group(group_id)
+    if not group_data:
+        return []
+    video_info = select_background_video(group_data.get('duration_ms', 0) / 1000.0)
+    if not video_info:
+        return []
+    
+    results = []
+    for profile_name in profiles:
+        output_path = OUTPUT_VIDEO_DIR / f"{group_id}_{profile_name}.mp4"
+        start = time.perf_counter()
+        success = process_group(group_id, ffmpeg_path, overlay_backend=overlay_backend, encoder_profile=profile_name,
+                                background_id=video_info.get('id'), output_video_path=output_path, audio_mode=audio_mode,
+                                force=True)
+        stats = ENCODE_STATS.get(str(output_path), {}) if success else {}
+        results.append({
+            'profile': profile_name,
+            'success': success,
+            'total_seconds': round(time.perf_counter() - start, 2),
+            **stats,
+        })
+    
+    print(f"\n{'='*70}\nENCODER PROFILE BENCHMARK: {group_id}\n{'='*70}")
+    print(f"{'Profile':<10} {'Encode (s)':>11} {'FPS':>8} {'Speed':>7} {'Size':>10}")
+    for result in results:
+        if result['success']:
+            print(f"{result['profile']:<10} {result['encode_seconds']:>11.1f} {result['encode_fps'] or 0:>8.1f} "
+                  f"{result.get('encode_speed') or 0:>6.2f}x {format_size(result['size_bytes']):>10}")
+        else:
+            print(f"{result['profile']:<10} {'FAILED':>11}")
+    
+    report_path = OUTPUT_VIDEO_DIR / f"{group_id}_benchmark.json"
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump({'group_id': group_id, 'background_id': video_info.get('id'), 'results': results}, f, indent=2)
+    print(f"Benchmark report: {report_path}")
+    return results
+
+
+def render_batch(
+    group_ids: List[str],
+    ffmpeg_path: str,
+    jobs: Optional[int] = None,
+    summary_path: Optional[Path] = None,
+    **render_options
+) -> Dict:
+    """
+    Render many groups in one process on a bounded worker pool.
+    
+    Jobs share the HTTP session, media caches and loaded group files. When more
+    than one job runs, x264 threads are split between them.
+    
+    Args:
+        group_ids: Groups to render
+        ffmpeg_path: Path to FFmpeg executable
+        jobs: Concurrent renders (default: number of CPU cores)
+        summary_path: Where to write the JSON summary (default generated_videos/batch_summary.json)
+        **render_options: Extra process_group keyword arguments (overlay_backend, encoder_profile, ...)
+    
+    Returns:
+        Summary dict with per-group status, timing and size
+    """
+    cpu_count = os.cpu_count() or 1
+    jobs = max(1, min(jobs or cpu_count, len(group_ids) or 1))
+    encoder_threads = render_options.pop('encoder_threads', None) or ENCODER_THREADS
+    if jobs > 1 and not encoder_threads:
+        encoder_threads = max(1, cpu_count // jobs)
+    
+    print(f"\n{'='*80}\nBATCH RENDER: {len(group_ids)} groups, {jobs} jobs\n{'='*80}")
+    started = datetime.now()
+    batch_start = time.perf_counter()
+    
+    def render_one(group_id: str) -> Dict:
+        output_path = OUTPUT_VIDEO_DIR / f"{group_id}.mp4"
+        start = time.perf_counter()
+        error = None
+        try:
+            success = process_group(group_id, ffmpeg_path, output_video_path=output_path,
+                                    encoder_threads=encoder_threads, **render_options)
+        except Exception as e:
+            success, error = False, str(e)
+            print(f"Error rendering {group_id}: {e}")
+        result = {
+            'group_id': group_id,
+            'status': 'ok' if success else 'failed',
+            'seconds': round(time.perf_counter() - start, 2),
+            'output': str(output_path) if success else None,
+            'size_bytes': output_path.stat().st_size if success and output_path.exists() else None,
+        }
+        if success:
+            stats = ENCODE_STATS.get(str(output_path), {})
+            result.update({k: stats.get(k) for k in ('profile', 'background_id', 'encode_seconds', 'encode_fps', 'encode_speed')})
+            result['cached'] = bool(stats.get('cached'))
+        if error:
+            result['error'] = error
+        return result
+    
+    results = {}
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="render") as executor:
+        futures = {executor.submit(render_one, group_id): group_id for group_id in group_ids}
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            results[result['group_id']] = result
+            print(f"[batch {done}/{len(group_ids)}] {result['group_id']}: {result['status']} in {result['seconds']:.1f}s")
+    
+    ordered = [results[group_id] for group_id in group_ids]
+    summary = {
+        'started': started.isoformat(),
+        'finished': datetime.now().isoformat(),
+        'jobs': jobs,
+        'encoder_threads': encoder_threads,
+        'options': {k: v for k, v in render_options.items() if isinstance(v, (str, int, float, bool, type(None)))},
+        'total_seconds': round(time.perf_counter() - batch_start, 2),
+        'succeeded': sum(1 for r in ordered if r['status'] == 'ok'),
+        'failed': sum(1 for r in ordered if r['status'] != 'ok'),
+        'groups': ordered,
+    }
+    
+    summary_path = summary_path or OUTPUT_VIDEO_DIR / "batch_summary.json"
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    
+    print(f"\n{'='*80}")
+    print(f"BATCH COMPLETE: {summary['succeeded']} ok, {summary['failed']} failed in {summary['total_seconds']:.1f}s")
+    print(f"Summary: {summary_path}")
+    print(f"{'='*80}")
+    return summary
+
+
 def main():
     """Main CLI entry point."""
     parser = argparse.ArgumentParser(
@@ -664,14 +1409,50 @@ Examples:
   
   # Generate video with only static text (no custom overlays)
   python generate_simple_video.py --group reciter2_s001_001-007 --no-arabic-text --no-english-text
-
-Note: To customize text overlays, edit ARABIC_TEXT and ENGLISH_TEXT in the script.
+  
+  # Draw all text from a single ASS subtitle track instead of chained drawtext filters
+  python generate_simple_video.py --group reciter2_s001_001-007 --overlay-backend ass
+  
+  # Composite Pillow-shaped Arabic/English text images (cached across videos)
+  python generate_simple_video.py --group reciter2_s001_001-007 --overlay-backend png
+  
+  # Fast encode for scheduled runs (or set ENCODER_PROFILE=fast)
+  python generate_simple_video.py --group reciter2_s001_001-007 --profile fast
+  
+  # Compare encode fps and output size of every profile on one group
+  python generate_simple_video.py --group reciter2_s001_001-007 --benchmark-profiles
+  
+  # Batch: render several groups in one process
+  python generate_simple_video.py --groups reciter2_s001_001-007 reciter2_s002_001-003
+  
+  # Batch: pre-render the next 96 unpublished groups from the tracker, 2 at a time
+  python generate_simple_video.py --from-tracker 96 --jobs 2 --profile fast
+  
+  # Batch: every group of surah 36 for reciter 7
+  python generate_simple_video.py --surah 36 --reciter 7
         """
     )
     
-    parser.add_argument('--group', type=str, required=True, help='Group ID (e.g., reciter2_s001_001-007)')
+    selection = parser.add_mutually_exclusive_group(required=True)
+    selection.add_argument('--group', type=str, help='Group ID (e.g., reciter2_s001_001-007)')
+    selection.add_argument('--groups', nargs='+', metavar='GROUP', help='Batch: render these group IDs')
+    selection.add_argument('--from-tracker', type=int, metavar='N', help='Batch: render the next N unpublished groups')
+    selection.add_argument('--surah', type=int, help='Batch: render every group of this surah')
+    parser.add_argument('--reciter', type=str, help='With --surah: only this reciter number')
+    parser.add_argument('--jobs', type=int, help='Batch: concurrent renders (default: CPU cores)')
+    parser.add_argument('--summary', type=Path, help='Batch: summary JSON path (default: generated_videos/batch_summary.json)')
     parser.add_argument('--no-arabic-text', action='store_true', help='Disable Arabic text overlays in center')
     parser.add_argument('--no-english-text', action='store_true', help='Disable English text overlays at bottom')
+    parser.add_argument('--overlay-backend', choices=OVERLAY_BACKENDS, default=OVERLAY_BACKEND,
+                        help=f'Text overlay renderer (default: {OVERLAY_BACKEND}, env OVERLAY_BACKEND)')
+    parser.add_argument('--audio-mode', choices=AUDIO_MODES, default=AUDIO_MODE,
+                        help=f'direct = single-pass concat into the final mux, merged = intermediate MP3 (default: {AUDIO_MODE}, env AUDIO_MODE)')
+    parser.add_argument('--profile', choices=list(ENCODER_PROFILES), default=ENCODER_PROFILE,
+                        help=f'Encoder profile (default: {ENCODER_PROFILE}, env ENCODER_PROFILE)')
+    parser.add_argument('--benchmark-profiles', nargs='*', choices=list(ENCODER_PROFILES), metavar='PROFILE',
+                        help='Render the group with each profile (all when none given) and report encode fps and size')
+    parser.add_argument('--force', action='store_true',
+                        help='Re-render even when the output matches its render manifest')
     
     args = parser.parse_args()
     
@@ -683,12 +1464,40 @@ Note: To customize text overlays, edit ARABIC_TEXT and ENGLISH_TEXT in the scrip
     
     print(f"FFmpeg found: {ffmpeg_path}\n")
     
-    # Use static text overlays unless disabled
-    text_data = None if args.no_arabic_text else ARABIC_TEXT
-    english_text_data = None if args.no_english_text else ENGLISH_TEXT
+    if args.benchmark_profiles is not None:
+        if not args.group:
+            parser.error("--benchmark-profiles needs --group")
+        results = benchmark_profiles(args.group, ffmpeg_path, args.benchmark_profiles or list(ENCODER_PROFILES), args.overlay_backend, args.audio_mode)
+        sys.exit(0 if results and all(r['success'] for r in results) else 1)
+    
+    # Extract text overlays from the ayahs unless disabled (empty list = no timed text)
+    text_data = [] if args.no_arabic_text else None
+    english_text_data = [] if args.no_english_text else None
+    
+    if args.group:
+        success = process_group(args.group, ffmpeg_path, text_data, english_text_data, args.overlay_backend, args.profile,
+                                audio_mode=args.audio_mode, force=args.force)
+        sys.exit(0 if success else 1)
+    
+    if args.groups:
+        group_ids = args.groups
+    elif args.from_tracker is not None:
+        from group_tracker import get_upcoming_groups
+        group_ids = get_upcoming_groups(args.from_tracker)
+    else:
+        group_ids = find_surah_groups(args.surah, args.reciter)
     
-    success = process_group(args.group, ffmpeg_path, text_data, english_text_data)
-    sys.exit(0 if success else 1)
+    if not group_ids:
+        print("No groups selected for batch render")
+        sys.exit(1)
+    
+    summary = render_batch(
+        group_ids, ffmpeg_path, jobs=args.jobs, summary_path=args.summary,
+        text_data=text_data, english_text_data=english_text_data,
+        overlay_backend=args.overlay_backend, encoder_profile=args.profile, audio_mode=args.audio_mode,
+        force=args.force
+    )
+    sys.exit(0 if summary['failed'] == 0 else 1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Asyncio client for publishing Reels through the Instagram Graph API.
+Does the same create container -> poll -> publish sequence as publish_reel.py,
+with the same poll timing and status handling, but on one pooled aiohttp session.
+One process can then keep many containers in flight at once, for several
+accounts or a backlog of videos.
+
+Requires aiohttp (pip install aiohttp); publish_reel.py stays the
+dependency-free path.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from typing import Dict, List, Optional
+
+try:
+    import aiohttp
+except ImportError:  # optional dependency, checked when a client is created
+    aiohttp = None
+
+from publish_reel import (
+    CAPTION, GRAPH_API_BASE, IG_USER_ID, INTERVAL_SECONDS, LONG_LIVED_TOKEN, MAX_WAIT_SECONDS,
+    classify_container_status, is_field_error
+)
+from container_poller import AdaptivePoller
+from run_report import span
+
+# Connection pool size (all accounts share one pool) and per-request timeout in seconds
+GRAPH_MAX_CONNECTIONS = int(os.environ.get("GRAPH_MAX_CONNECTIONS", "20"))
+GRAPH_REQUEST_TIMEOUT = float(os.environ.get("GRAPH_REQUEST_TIMEOUT", "30"))
+
+# Containers processed at the same time by publish_many
+GRAPH_CONCURRENCY = int(os.environ.get("GRAPH_CONCURRENCY", "5"))
+
+
+class GraphAPIError(RuntimeError):
+    """A Graph API call returned an HTTP error."""
+
+    def __init__(self, status: int, data):
+        super().__init__(f"Graph API error {status}: {json.dumps(data) if isinstance(data, dict) else data}")
+        self.status = status
+        self.data = data
+
+
+class AsyncGraphClient:
+    """
+    Pooled async Graph API client; use as `async with AsyncGraphClient() as client`.
+
+    Calls take the account (ig_user_id, token) as arguments, so one client can
+    serve several accounts.
+    """
+
+    def __init__(self, base_url: str = GRAPH_API_BASE, max_connections: int = GRAPH_MAX_CONNECTIONS,
+                 timeout: float = GRAPH_REQUEST_TIMEOUT):
+        if aiohttp is None:
+            raise RuntimeError("aiohttp is not installed (pip install aiohttp)")
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._session: Optional["aiohttp.ClientSession"] = None
+
+    async def __aenter__(self) -> "AsyncGraphClient":
+        connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.max_connections)
+        self._session = aiohttp.ClientSession(connector=connector,
+                                              timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+        self._session = None
+
+    async def _request(self, method: str, path: str, params: Dict) -> Dict:
+        async with self._session.request(method, f"{self.base_url}/{path}", params=params) as response:
+            try:
+                data = await response.json(content_type=None)
+            except ValueError:
+                data = await response.text()
+            if response.status >= 400:
+                raise GraphAPIError(response.status, data)
+            if not isinstance(data, dict):
+                raise RuntimeError(f"Invalid JSON from Graph API: {data!r}")
+            return data
+
+    async def create_video_container(self, ig_user_id: str, token: str, video_url: str, caption: str,
+                                     thumbnail_url: Optional[str] = None) -> str:
+        """Create a REELS container; returns its creation id."""
+        params = {"media_type": "REELS", "video_url": video_url, "caption": caption, "access_token": token}
+        if thumbnail_url:
+            params["thumbnail_url"] = thumbnail_url
+        with span("publish", step="create_container", ig_user_id=ig_user_id):
+            data = await self._request("POST", f"{ig_user_id}/media", params)
+        print(f"create response: {data}")
+        if not data.get("id"):
+            raise RuntimeError(f"Failed to create container: {data!r}")
+        return data["id"]
+
+    async def get_container_status(self, creation_id: str, token: str, poller: AdaptivePoller) -> Dict:
+        """Fetch the poller's fields, dropping field sets the container rejects."""
+        while True:
+            params = {"access_token": token}
+            if poller.fields:
+                params["fields"] = poller.fields
+            try:
+                return await self._request("GET", creation_id, params)
+            except GraphAPIError as e:
+                if not is_field_error(e.data if isinstance(e.data, dict) else {}) or not poller.drop_fields():
+                    raise
+                print(f"  [{creation_id}] Retrying with fields={poller.fields}...")
+
+    async def poll_until_finished(self, creation_id: str, token: str, max_wait: float = MAX_WAIT_SECONDS,
+                                  initial_interval: float = INTERVAL_SECONDS, size_bytes: Optional[int] = None) -> bool:
+        """Poll container status until finished, timing polls with AdaptivePoller."""
+        poller = AdaptivePoller(size_bytes, max_wait, initial_interval)
+        with span("container_poll", creation_id=creation_id, size_bytes=size_bytes) as record:
+            while poller.remaining() > 0:
+                data = await self.get_container_status(creation_id, token, poller)
+                status = data.get("status_code")
+                state = classify_container_status(status)
+                print(f"  [{creation_id}] poll: elapsed={poller.elapsed():.1f}s, status={status}, "
+                      f"progress={data.get('processing_progress', 'N/A')}")
+                if state == "finished":
+                    if status is not None:
+                        poller.finish()
+                    record['polls'] = poller.polls + 1
+                    return True
+                if state == "failed":
+                    raise RuntimeError(f"Container processing failed: status={status}, errors={data.get('errors', [])}")
+                await asyncio.sleep(poller.next_delay(data))
+            raise RuntimeError(f"Timed out waiting for container {creation_id} after {max_wait} seconds")
+
+    async def publish_media(self, ig_user_id: str, token: str, creation_id: str) -> Optional[str]:
+        """Publish a finished container; returns the media id."""
+        with span("publish", step="media_publish", ig_user_id=ig_user_id, creation_id=creation_id):
+            data = await self._request("POST", f"{ig_user_id}/media_publish",
+                                       {"creation_id": creation_id, "access_token": token})
+        print(f"publish response: {data}")
+        return data.get("id")
+
+    async def get_remote_size(self, url: str) -> Optional[int]:
+        """Content-Length of a public video URL (None if the host does not say)."""
+        try:
+            async with self._session.head(url, allow_redirects=True) as response:
+                return int(response.headers["Content-Length"]) if response.status < 400 else None
+        except Exception:
+            return None
+
+    async def publish_reel(self, ig_user_id: str, token: str, video_url: str, caption: str,
+                           thumbnail_url: Optional[str] = None, size_bytes: Optional[int] = None) -> Optional[str]:
+        """Create, poll and publish one Reel; returns the media id."""
+        if size_bytes is None:
+            size_bytes = await self.get_remote_size(video_url)
+        creation_id = await self.create_video_container(ig_user_id, token, video_url, caption, thumbnail_url)
+        await self.poll_until_finished(creation_id, token, size_bytes=size_bytes)
+        return await self.publish_media(ig_user_id, token, creation_id)
+
+
+async def publish_many(jobs: List[Dict], concurrency: int = GRAPH_CONCURRENCY,
+                       client: Optional[AsyncGraphClient] = None) -> List[Dict]:
+    """
+    Publish several Reels concurrently.
+
+    Args:
+        jobs: Dicts with ig_user_id, token, video_url and optional caption / thumbnail_url / size_bytes
+        concurrency: Containers in flight at once
+        client: Open client to reuse (default: a new one for this call)
+
+    Returns:
+        One result per job, in order: {'video_url', 'ig_user_id', 'media_id'} or {..., 'error'}
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(client: AsyncGraphClient, job: Dict) -> Dict:
+        result = {'video_url': job['video_url'], 'ig_user_id': job['ig_user_id']}
+        async with semaphore:
+            try:
+                result['media_id'] = await client.publish_reel(job['ig_user_id'], job['token'], job['video_url'],
+                                                               job.get('caption', CAPTION), job.get('thumbnail_url'),
+                                                               job.get('size_bytes'))
+            except Exception as e:
+                print(f"✗ {job['video_url']}: {e}")
+                result['error'] = str(e)
+        return result
+
+    if client is not None:
+        return list(await asyncio.gather(*(run(client, job) for job in jobs)))
+    async with AsyncGraphClient() as new_client:
+        return list(await asyncio.gather(*(run(new_client, job) for job in jobs)))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Publish Reels concurrently through the Graph API (asyncio)',
+        epilog="""
+Examples:
+  # Several videos to the account in IG_USER_ID / LONG_LIVED_TOKEN
+  python graph_api_async.py https://example.com/a.mp4 https://example.com/b.mp4
+
+  # Jobs for several accounts: [{"ig_user_id": ..., "token": ..., "video_url": ..., "caption": ...}]
+  python graph_api_async.py --jobs jobs.json --concurrency 10
+        """
+    )
+    parser.add_argument('video_urls', nargs='*', help='Public video URLs (published with CAPTION)')
+    parser.add_argument('--jobs', type=str, help='JSON file with a list of jobs')
+    parser.add_argument('--concurrency', type=int, default=GRAPH_CONCURRENCY,
+                        help=f'Containers in flight at once (default: {GRAPH_CONCURRENCY})')
+    args = parser.parse_args()
+
+    jobs = []
+    if args.jobs:
+        with open(args.jobs, 'r', encoding='utf-8') as f:
+            jobs = json.load(f)
+    if args.video_urls:
+        if not IG_USER_ID or not LONG_LIVED_TOKEN:
+            print("Missing IG_USER_ID or LONG_LIVED_TOKEN")
+            sys.exit(2)
+        jobs += [{'ig_user_id': IG_USER_ID, 'token': LONG_LIVED_TOKEN, 'video_url': url} for url in args.video_urls]
+    if not jobs:
+        parser.error("give video URLs or --jobs")
+
+    results = asyncio.run(publish_many(jobs, args.concurrency))
+    published = sum(1 for result in results if result.get('media_id'))
+    print(f"\nPublished {published}/{len(results)}")
+    for result in results:
+        print(f"  {result['video_url']}: {result.get('media_id') or result.get('error')}")
+    sys.exit(0 if published == len(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Persistent index of recitation groups.
+Every quran_groups/reciter_*_groups.json file is loaded into a SQLite
+index in the media cache directory, one row per group. A file is
+re-indexed only when its mtime or size changes, so a cron job pays one
+directory stat instead of reparsing whole reciter files for every lookup.
+The index gives primary-key lookup by group id and ordered iteration by
+(reciter, surah, ayah_start).
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from media_cache import CACHE_DIR
+
+QURAN_GROUPS_DIR = Path("quran_groups")
+GROUP_FILE_PATTERN = "reciter_*_groups.json"
+GROUP_INDEX_PATH = Path(os.environ.get("GROUP_INDEX", str(CACHE_DIR / "group_index.sqlite3")))
+
+# Bump when the schema or the stored group layout changes so old indexes are rebuilt
+GROUP_INDEX_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS files (
+    name TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    reciter_name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS groups (
+    group_id TEXT PRIMARY KEY,
+    reciter INTEGER NOT NULL,
+    surah INTEGER NOT NULL,
+    ayah_start INTEGER NOT NULL,
+    file TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS groups_order ON groups (reciter, surah, ayah_start, group_id);
+CREATE INDEX IF NOT EXISTS groups_file ON groups (file);
+"""
+
+
+def group_sort_key(group_id: str, group: Optional[Dict] = None) -> Tuple[int, int, int]:
+    """Sort key (reciter, surah, start ayah) for ids like reciter1_s002_015-016."""
+    try:
+        parts = group_id.split('_')
+        return (int(parts[0].replace('reciter', '') or 0), int(parts[1][1:]), int(parts[2].split('-')[0]))
+    except (IndexError, ValueError):
+        group = group or {}
+        return (int(group.get('reciter_id') or 0), int(group.get('surah') or 0), int(group.get('ayah_start') or 0))
+
+
+class GroupIndex:
+    """
+    SQLite index over the reciter group files.
+
+    Keeps one connection open for the life of the process and re-indexes
+    changed group files on access. Safe to share between threads of one
+    process; several processes may share the index file.
+    """
+
+    def __init__(self, groups_dir: Path = QURAN_GROUPS_DIR, index_path: Path = GROUP_INDEX_PATH):
+        self.groups_dir = Path(groups_dir)
+        self.index_path = Path(index_path)
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._signature: Optional[Tuple] = None
+
+    def _source_files(self) -> Dict[str, Tuple[int, int]]:
+        files = {}
+        for path in self.groups_dir.glob(GROUP_FILE_PATTERN):
+            stat = path.stat()
+            files[path.name] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    def _open(self) -> sqlite3.Connection:
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.index_path), check_same_thread=False, timeout=30)
+        conn.executescript(SCHEMA)
+        row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if not row or row[0] != str(GROUP_INDEX_VERSION):
+            with conn:
+                conn.execute("DELETE FROM groups")
+                conn.execute("DELETE FROM files")
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (str(GROUP_INDEX_VERSION),))
+        return conn
+
+    def _index_file(self, conn: sqlite3.Connection, name: str, stat: Tuple[int, int]) -> int:
+        """Replace the rows of one group file; returns the number of groups indexed."""
+        path = self.groups_dir / name
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Error loading {path}: {e}")
+            data = {}
+        reciter_name = data.get('reciter_name', '')
+
+        rows = []
+        for group_id, group in (data.get('groups') or {}).items():
+            group = dict(group)
+            group['group_id'] = group_id
+            group['reciter_name'] = reciter_name
+            reciter, surah, ayah_start = group_sort_key(group_id, dict(group, reciter_id=data.get('reciter_id')))
+            rows.append((group_id, reciter, surah, ayah_start, name, json.dumps(group, ensure_ascii=False)))
+
+        conn.execute("DELETE FROM groups WHERE file = ?", (name,))
+        conn.executemany(
+            "INSERT OR REPLACE INTO groups (group_id, reciter, surah, ayah_start, file, data) VALUES (?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO files (name, mtime_ns, size, reciter_name) VALUES (?, ?, ?, ?)",
+            (name, stat[0], stat[1], reciter_name)
+        )
+        return len(rows)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open connection to an up-to-date index, re-indexing changed group files."""
+        with self._lock:
+            source = self._source_files()
+            signature = tuple(sorted(source.items()))
+            if self._conn is not None and signature == self._signature:
+                return self._conn
+
+            conn = self._conn or self._open()
+            with conn:
+                # Take the write lock up front so concurrent processes do not index the same file twice
+                conn.execute("BEGIN IMMEDIATE")
+                indexed = {name: (mtime_ns, size) for name, mtime_ns, size in
+                           conn.execute("SELECT name, mtime_ns, size FROM files")}
+                for name in set(indexed) - set(source):
+                    conn.execute("DELETE FROM groups WHERE file = ?", (name,))
+                    conn.execute("DELETE FROM files WHERE name = ?", (name,))
+                for name, stat in sorted(source.items()):
+                    if indexed.get(name) != stat:
+                        count = self._index_file(conn, name, stat)
+                        print(f"Indexed {count} groups from {name}")
+
+            self._conn = conn
+            self._signature = signature
+            return conn
+
+    def get(self, group_id: str) -> Optional[Dict]:
+        """Look up one group (a private copy, with group_id and reciter_name filled in)."""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT data FROM groups WHERE group_id = ?", (group_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def group_ids(self, reciters: Optional[Iterable] = None, surah: Optional[int] = None) -> List[str]:
+        """
+        Group ids in recitation order (reciter, surah, start ayah).
+
+        Args:
+            reciters: Only these reciter numbers (all when omitted)
+            surah: Only this surah
+        """
+        clauses, params = [], []
+        if reciters is not None:
+            reciters = [int(r) for r in reciters]
+            clauses.append(f"reciter IN ({', '.join('?' * len(reciters))})")
+            params += reciters
+        if surah is not None:
+            clauses.append("surah = ?")
+            params.append(int(surah))
+        where = " AND ".join(clauses) or "1"
+        with self._lock:
+            rows = self._connection().execute(
+                f"SELECT group_id FROM groups WHERE {where} ORDER BY reciter, surah, ayah_start, group_id", params
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def iter_group_keys(self, reciter: int, after: Optional[Iterable] = None, page_size: int = 500) -> Iterator[Tuple[int, int, str]]:
+        """
+        Lazily yield (surah, ayah_start, group_id) for one reciter in recitation order.
+
+        Rows are fetched a page at a time (keyset pagination), so a consumer
+        that stops early never reads the rest of the reciter's groups.
+
+        Args:
+            reciter: Reciter number
+            after: Resume after this (surah, ayah_start, group_id) key
+            page_size: Rows fetched per query
+        """
+        last = tuple(after) if after else None
+        while True:
+            with self._lock:
+                conn = self._connection()
+                if last is None:
+                    rows = conn.execute(
+                        "SELECT surah, ayah_start, group_id FROM groups WHERE reciter = ? "
+                        "ORDER BY surah, ayah_start, group_id LIMIT ?", (int(reciter), page_size)
+                    ).fetchall()
+                else:
+                    rows = conn.execute(
+                        "SELECT surah, ayah_start, group_id FROM groups WHERE reciter = ? "
+                        "AND (surah, ayah_start, group_id) > (?, ?, ?) "
+                        "ORDER BY surah, ayah_start, group_id LIMIT ?", (int(reciter), *last, page_size)
+                    ).fetchall()
+            yield from rows
+            if len(rows) < page_size:
+                return
+            last = tuple(rows[-1])
+
+    def count(self, reciters: Optional[Iterable] = None) -> int:
+        """Number of indexed groups (optionally for some reciters only)."""
+        if reciters is None:
+            with self._lock:
+                return self._connection().execute("SELECT COUNT(*) FROM groups").fetchone()[0]
+        return len(self.group_ids(reciters))
+
+    def reciters(self) -> Dict[int, int]:
+        """Reciter number -> number of indexed groups."""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT reciter, COUNT(*) FROM groups GROUP BY reciter ORDER BY reciter"
+            ).fetchall()
+        return dict(rows)
+
+
+_group_index: Optional[GroupIndex] = None
+_group_index_lock = threading.Lock()
+
+
+def get_group_index() -> GroupIndex:
+    """Get the shared group index (one open connection per process)."""
+    global _group_index
+    with _group_index_lock:
+        if _group_index is None:
+            _group_index = GroupIndex()
+        return _group_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and inspect the recitation group index')
+    parser.add_argument('--group', type=str, help='Print one group')
+    parser.add_argument('--reciter', type=int, help='List group ids for this reciter')
+    parser.add_argument('--surah', type=int, help='List group ids for this surah')
+    args = parser.parse_args()
+
+    index = get_group_index()
+    print(f"Group index: {index.index_path} ({index.count()} groups)")
+    for reciter, count in index.reciters().items():
+        print(f"  reciter {reciter}: {count} groups")
+
+    if args.group:
+        group = index.get(args.group)
+        print(json.dumps(group, indent=2, ensure_ascii=False) if group else f"Group {args.group} not found")
+    if args.reciter is not None or args.surah is not None:
+        reciters = [args.reciter] if args.reciter is not None else None
+        for group_id in index.group_ids(reciters, args.surah):
+            print(group_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,137 +1,491 @@
 """
 Group tracking and selection system for sequential Quran video publishing.
 Ensures each group is published only once in order.
+
+Publishes are appended to a JSON Lines journal (one fsync'd line per post)
+and folded into the published_groups.json snapshot every
+JOURNAL_COMPACT_EVERY events, so marking a group never rewrites the full
+published list.
+
+Groups can be drawn from several reciters at once. Each reciter's groups
+are streamed lazily from the group index, starting at a saved per-reciter
+cursor, and the streams are merged by TRACKER_STRATEGY:
+  round_robin  one group per reciter in turn
+  weighted     reciters share posts in proportion to their weights
+  surah        all reciters' groups of a surah before the next surah
+TRACKER_RECITERS picks the reciters: "1" (default), "1,3,7", weighted
+"1:3,7:1" (number:weight) or "all".
 """
 
+import heapq
 import json
+import os
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+from itertools import islice
 from pathlib import Path
-from typing import Optional, Dict, List
+from typing import Optional, Dict, Iterator, List, Set, Tuple
 from datetime import datetime
 
+from group_index import QURAN_GROUPS_DIR, get_group_index, group_sort_key
+
+try:
+    import fcntl
+except ImportError:  # Windows: writes are only serialized within one process
+    fcntl = None
+
 
 PUBLISHED_GROUPS_FILE = Path("published_groups.json")
 
+# Append-only log of publish events since the last snapshot in PUBLISHED_GROUPS_FILE
+PUBLISH_JOURNAL_FILE = Path("published_groups.journal.jsonl")
 
-def load_published_groups() -> Dict:
-    """Load the published groups tracking file."""
-    if not PUBLISHED_GROUPS_FILE.exists():
-        return {
-            "last_published": None,
-            "published_groups": [],
-            "queue": [],
-            "statistics": {
-                "total_published": 0,
-                "last_run": None,
-                "success_count": 0,
-                "failure_count": 0
-            }
+# Fold the journal into the snapshot once it holds this many events
+JOURNAL_COMPACT_EVERY = int(os.environ.get("TRACKER_COMPACT_EVERY", "50"))
+
+# Reciters to publish from: "1", "1,3,7", "1:3,7:1" (number:weight) or "all"
+TRACKER_RECITERS = os.environ.get("TRACKER_RECITERS", "1")
+
+SCHEDULE_STRATEGIES = ("round_robin", "weighted", "surah")
+TRACKER_STRATEGY = os.environ.get("TRACKER_STRATEGY", "round_robin").lower()
+
+# Held while appending or compacting so concurrent workers cannot lose each other's events
+TRACKER_LOCK_FILE = Path(".published_groups.lock")
+
+_state_lock = threading.RLock()
+_state: Optional[Dict] = None
+_lock_file = None
+_lock_depth = 0
+
+
+@contextmanager
+def tracker_lock():
+    """Serialize tracker writes across threads and (where fcntl exists) processes. Re-entrant."""
+    global _lock_file, _lock_depth
+    with _state_lock:
+        if _lock_depth == 0 and fcntl is not None:
+            _lock_file = open(TRACKER_LOCK_FILE, 'a+')
+            fcntl.flock(_lock_file.fileno(), fcntl.LOCK_EX)
+        _lock_depth += 1
+        try:
+            yield
+        finally:
+            _lock_depth -= 1
+            if _lock_depth == 0 and _lock_file is not None:
+                fcntl.flock(_lock_file.fileno(), fcntl.LOCK_UN)
+                _lock_file.close()
+                _lock_file = None
+
+
+def default_tracking() -> Dict:
+    """Empty tracking data."""
+    return {
+        "last_published": None,
+        "published_groups": [],
+        "queue": [],
+        "statistics": {
+            "total_published": 0,
+            "last_run": None,
+            "success_count": 0,
+            "failure_count": 0
         }
+    }
+
+
+def fsync_directory(path: Path):
+    """Flush a directory entry so a rename survives a crash (no-op where unsupported)."""
+    try:
+        fd = os.open(str(path), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_text(path: Path, text: str):
+    """Write a file via fsync + rename so readers never see a partial file."""
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_directory(path.parent.resolve())
+
+
+def read_snapshot() -> Dict:
+    """Read the compacted tracking snapshot."""
+    if not PUBLISHED_GROUPS_FILE.exists():
+        return default_tracking()
     
     try:
         with open(PUBLISHED_GROUPS_FILE, 'r', encoding='utf-8') as f:
             return json.load(f)
     except Exception as e:
         print(f"Error loading published groups: {e}")
-        return {
-            "last_published": None,
-            "published_groups": [],
-            "queue": [],
-            "statistics": {"total_published": 0, "last_run": None, "success_count": 0, "failure_count": 0}
+        return default_tracking()
+
+
+def read_journal() -> List[Dict]:
+    """Read journal events, skipping a torn last line left by a crash."""
+    if not PUBLISH_JOURNAL_FILE.exists():
+        return []
+    events = []
+    with open(PUBLISH_JOURNAL_FILE, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                print(f"Skipping unreadable journal entry: {line[:80]}")
+    return events
+
+
+def apply_event(data: Dict, published: Set[str], event: Dict):
+    """Apply one journal event to tracking data in place."""
+    statistics = data.setdefault('statistics', default_tracking()['statistics'])
+    if event.get('op') == 'reset':
+        data['published_groups'] = []
+        published.clear()
+        statistics['total_published'] = 0
+        data['reciter_cursors'] = {}
+        return
+    
+    group_id = event['group_id']
+    if group_id not in published:
+        published.add(group_id)
+        data['published_groups'].append(group_id)
+    
+    data['last_published'] = group_id
+    statistics['last_run'] = event.get('time')
+    
+    if event.get('success', True):
+        statistics['success_count'] = statistics.get('success_count', 0) + 1
+        statistics['total_published'] = statistics.get('total_published', 0) + 1
+    else:
+        statistics['failure_count'] = statistics.get('failure_count', 0) + 1
+
+
+def files_signature():
+    """(mtime_ns, size) of the snapshot and journal, to notice writes by other processes."""
+    signature = []
+    for path in (PUBLISHED_GROUPS_FILE, PUBLISH_JOURNAL_FILE):
+        try:
+            stat = path.stat()
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def load_state() -> Dict:
+    """
+    In-memory tracking state: snapshot plus replayed journal.
+    
+    Returns:
+        {'data': tracking dict, 'published': set of group ids, 'reciter_counts':
+        published groups per reciter, 'seq': last event sequence number,
+        'pending': journal events not yet compacted}
+    """
+    global _state
+    with _state_lock:
+        signature = files_signature()
+        if _state is not None and _state['signature'] == signature:
+            return _state
+        
+        data = read_snapshot()
+        data.setdefault('published_groups', [])
+        published = set(data['published_groups'])
+        seq = data.get('journal_seq', 0)
+        pending = 0
+        for event in read_journal():
+            # Events already folded into the snapshot (crash between snapshot and journal reset)
+            if event.get('seq', 0) <= data.get('journal_seq', 0):
+                continue
+            apply_event(data, published, event)
+            seq = max(seq, event.get('seq', 0))
+            pending += 1
+        
+        data.pop('cursor', None)  # Superseded by reciter_cursors
+        _state = {
+            'data': data,
+            'published': published,
+            'reciter_counts': Counter(reciter_of(group_id) for group_id in published),
+            'seq': seq,
+            'pending': pending,
+            'signature': signature,
         }
+        return _state
+
+
+def compact_journal():
+    """Fold the journal into the snapshot, then start an empty journal."""
+    with tracker_lock():
+        state = load_state()
+        data = dict(state['data'], journal_seq=state['seq'])
+        atomic_write_text(PUBLISHED_GROUPS_FILE, json.dumps(data, indent=2, ensure_ascii=False))
+        # The snapshot records journal_seq, so a crash here only leaves events that replay skips
+        atomic_write_text(PUBLISH_JOURNAL_FILE, "")
+        state['data']['journal_seq'] = state['seq']
+        state['pending'] = 0
+        state['signature'] = files_signature()
+
+
+def append_event(event: Dict):
+    """Durably append one event to the journal and apply it to the in-memory state."""
+    with tracker_lock():
+        state = load_state()
+        event = dict(event, seq=state['seq'] + 1, time=datetime.now().isoformat())
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with open(PUBLISH_JOURNAL_FILE, 'a+b') as f:
+            # Terminate a torn line from an earlier crash so this event stays parseable
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    line = "\n" + line
+            f.write(line.encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+        
+        if event['op'] == 'reset':
+            state['reciter_counts'].clear()
+        elif event['group_id'] not in state['published']:
+            state['reciter_counts'][reciter_of(event['group_id'])] += 1
+        apply_event(state['data'], state['published'], event)
+        state['seq'] = event['seq']
+        state['pending'] += 1
+        state['signature'] = files_signature()
+        
+        if state['pending'] >= JOURNAL_COMPACT_EVERY:
+            compact_journal()
+
+
+def load_published_groups() -> Dict:
+    """Load the tracking data (snapshot plus journal)."""
+    data = load_state()['data']
+    return json.loads(json.dumps(data))
 
 
 def save_published_groups(data: Dict):
-    """Save the published groups tracking file."""
+    """Replace the tracking data outright (writes a fresh snapshot and empties the journal)."""
+    global _state
     try:
-        with open(PUBLISHED_GROUPS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        with tracker_lock():
+            seq = load_state()['seq']
+            # A caller-supplied published list may not match the saved cursors
+            data = {k: v for k, v in data.items() if k not in ('cursor', 'reciter_cursors')}
+            data['journal_seq'] = seq
+            atomic_write_text(PUBLISHED_GROUPS_FILE, json.dumps(data, indent=2, ensure_ascii=False))
+            atomic_write_text(PUBLISH_JOURNAL_FILE, "")
+            _state = None
     except Exception as e:
         print(f"Error saving published groups: {e}")
 
 
-def get_all_groups() -> List[str]:
-    """Get all available groups from reciter_1_AbdulBaset_AbdulSamad only."""
-    all_groups = []
-    quran_groups_dir = Path("quran_groups")
+def reciter_of(group_id: str) -> int:
+    """Reciter number of a group id (reciter7_s001_001-007 -> 7)."""
+    try:
+        return group_sort_key(group_id)[0]
+    except (IndexError, ValueError):
+        return 0
+
+
+def parse_reciter_weights(spec: Optional[str] = None) -> Dict[int, float]:
+    """
+    Parse a TRACKER_RECITERS spec into {reciter number: weight}, in spec order.
     
-    # Only use reciter_1_AbdulBaset_AbdulSamad_groups.json
-    reciter_1_file = quran_groups_dir / "reciter_1_AbdulBaset_AbdulSamad_groups.json"
+    "all" selects every reciter that has groups in quran_groups (weight 1).
+    """
+    spec = (spec if spec is not None else TRACKER_RECITERS).strip()
+    if spec.lower() == 'all':
+        return {reciter: 1.0 for reciter in get_group_index().reciters()}
     
-    if not reciter_1_file.exists():
-        print(f"Error: {reciter_1_file} not found!")
-        return []
+    weights = {}
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        reciter, _, weight = part.partition(':')
+        weights[int(reciter)] = float(weight) if weight else 1.0
+    return {reciter: weight for reciter, weight in weights.items() if weight > 0}
+
+
+def iter_reciter_groups(reciter: int, published: Set[str], cursors: Optional[Dict] = None) -> Iterator[Tuple[int, int, str]]:
+    """
+    Lazily yield one reciter's unpublished (surah, ayah_start, group_id) keys in order.
     
-    try:
-        with open(reciter_1_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            groups = data.get('groups', {})
-            # Sort groups by surah and ayah (numerical order)
-            sorted_groups = sorted(groups.keys(), key=lambda x: (
-                int(x.split('_')[1][1:]),  # Surah number (s001 -> 1)
-                int(x.split('_')[2].split('-')[0])  # Start ayah
-            ))
-            all_groups.extend(sorted_groups)
-    except Exception as e:
-        print(f"Error loading {reciter_1_file}: {e}")
+    With cursors, iteration resumes after the saved cursor and the cursor is
+    moved past any leading run of published groups as they are read.
+    """
+    index = get_group_index()
+    after = None
+    if cursors is not None:
+        total = index.count([reciter])
+        cursor = cursors.get(str(reciter)) or {}
+        # The cursor is only valid while the reciter's group list is unchanged
+        if cursor.get('total') == total:
+            after = cursor.get('after')
     
-    return all_groups
+    leading = True
+    for key in index.iter_group_keys(reciter, after):
+        if key[2] in published:
+            if leading and cursors is not None:
+                cursors[str(reciter)] = {'after': list(key), 'total': total}
+            continue
+        leading = False
+        yield key
 
 
-def get_next_group() -> Optional[str]:
+def merge_round_robin(streams: Dict[int, Iterator], last_reciter: Optional[int] = None) -> Iterator[str]:
+    """One group from each reciter in turn, starting after last_reciter."""
+    order = deque(streams)
+    if last_reciter in streams:
+        order.rotate(-(list(streams).index(last_reciter) + 1))
+    while order:
+        reciter = order.popleft()
+        key = next(streams[reciter], None)
+        if key is None:
+            continue
+        yield key[2]
+        order.append(reciter)
+
+
+def merge_weighted(streams: Dict[int, Iterator], weights: Dict[int, float], counts: Dict[int, int]) -> Iterator[str]:
     """
-    Get the next group to publish in sequential order.
-    Returns None if all groups have been published.
+    Share posts between reciters in proportion to their weights.
+    
+    Stride scheduling: the next group comes from the reciter with the lowest
+    (published + 1) / weight, so the order follows from the publish counts
+    alone and needs no extra saved state.
+    """
+    counts = {reciter: counts.get(reciter, 0) for reciter in streams}
+    heap = [((counts[reciter] + 1) / weights[reciter], position, reciter) for position, reciter in enumerate(streams)]
+    heapq.heapify(heap)
+    while heap:
+        _, position, reciter = heapq.heappop(heap)
+        key = next(streams[reciter], None)
+        if key is None:
+            continue
+        yield key[2]
+        counts[reciter] += 1
+        heapq.heappush(heap, ((counts[reciter] + 1) / weights[reciter], position, reciter))
+
+
+def merge_by_surah(streams: Dict[int, Iterator]) -> Iterator[str]:
+    """All reciters' groups ordered by (surah, start ayah, reciter)."""
+    def tagged(reciter: int, stream: Iterator):
+        for surah, ayah_start, group_id in stream:
+            yield surah, ayah_start, reciter, group_id
+    
+    for key in heapq.merge(*(tagged(reciter, stream) for reciter, stream in streams.items())):
+        yield key[3]
+
+
+def iter_scheduled_groups(
+    strategy: Optional[str] = None,
+    reciters: Optional[str] = None,
+    include_published: bool = False
+) -> Iterator[str]:
     """
-    tracking = load_published_groups()
-    all_groups = get_all_groups()
+    Lazily yield group ids in publishing order.
     
-    if not all_groups:
-        print("No groups found!")
-        return None
+    Args:
+        strategy: "round_robin", "weighted" or "surah" (default TRACKER_STRATEGY)
+        reciters: Reciter spec (default TRACKER_RECITERS)
+        include_published: Yield the full schedule from the start instead of
+            only unpublished groups
+    """
+    strategy = (strategy or TRACKER_STRATEGY).lower()
+    if strategy not in SCHEDULE_STRATEGIES:
+        raise ValueError(f"Unknown schedule strategy {strategy!r} (expected one of {SCHEDULE_STRATEGIES})")
+    weights = parse_reciter_weights(reciters)
     
-    published = set(tracking.get('published_groups', []))
+    if include_published:
+        published, cursors, counts, last_reciter = set(), None, {}, None
+    else:
+        state = load_state()
+        published = state['published']
+        cursors = state['data'].setdefault('reciter_cursors', {})
+        counts = state['reciter_counts']
+        last_published = state['data'].get('last_published')
+        last_reciter = reciter_of(last_published) if last_published else None
     
+    streams = {reciter: iter_reciter_groups(reciter, published, cursors) for reciter in weights}
+    if strategy == 'surah':
+        return merge_by_surah(streams)
+    if strategy == 'weighted':
+        return merge_weighted(streams, weights, counts)
+    return merge_round_robin(streams, last_reciter)
+
+
+def get_all_groups() -> List[str]:
+    """Get all available groups of the configured reciters, in publishing order."""
+    index = get_group_index()
+    reciters = parse_reciter_weights()
+    for reciter in reciters:
+        if not index.count([reciter]):
+            print(f"Error: no groups for reciter {reciter} in {QURAN_GROUPS_DIR}!")
+    return list(iter_scheduled_groups(include_published=True))
+
+
+def count_scheduled_groups() -> int:
+    """Number of groups across the configured reciters."""
+    index = get_group_index()
+    return sum(index.count([reciter]) for reciter in parse_reciter_weights())
+
+
+def get_next_group() -> Optional[str]:
+    """
+    Get the next group to publish in scheduled order.
+    Returns None if no groups are available.
+    """
     # Find the first unpublished group
-    for group in all_groups:
-        if group not in published:
-            print(f"Next group to publish: {group}")
-            return group
+    group = next(iter_scheduled_groups(), None)
+    if group:
+        print(f"Next group to publish: {group}")
+        return group
+    
+    if not count_scheduled_groups():
+        print("No groups found!")
+        return None
     
     # All groups published - restart from beginning
     print("All groups published! Restarting from the beginning...")
-    tracking['published_groups'] = []
-    tracking['statistics']['total_published'] = 0
-    save_published_groups(tracking)
-    return all_groups[0] if all_groups else None
+    append_event({'op': 'reset'})
+    return next(iter_scheduled_groups(), None)
+
+
+def get_upcoming_groups(count: int) -> List[str]:
+    """
+    Get the next `count` unpublished groups in scheduled order.
+    Unlike get_next_group, this never modifies the tracking file.
+    """
+    return list(islice(iter_scheduled_groups(), max(count, 0)))
 
 
 def mark_group_published(group_id: str, success: bool = True):
-    """Mark a group as published and update statistics."""
-    tracking = load_published_groups()
-    
-    if group_id not in tracking['published_groups']:
-        tracking['published_groups'].append(group_id)
-    
-    tracking['last_published'] = group_id
-    tracking['statistics']['last_run'] = datetime.now().isoformat()
-    
-    if success:
-        tracking['statistics']['success_count'] += 1
-        tracking['statistics']['total_published'] += 1
-    else:
-        tracking['statistics']['failure_count'] += 1
-    
-    save_published_groups(tracking)
+    """Mark a group as published and update statistics (one journal append)."""
+    append_event({'op': 'publish', 'group_id': group_id, 'success': success})
+    statistics = load_state()['data']['statistics']
     print(f"Marked {group_id} as published (Success: {success})")
-    print(f"Total published: {tracking['statistics']['total_published']}")
+    print(f"Total published: {statistics['total_published']}")
 
 
 def get_progress() -> Dict:
     """Get publishing progress statistics."""
-    tracking = load_published_groups()
-    all_groups = get_all_groups()
-    published_count = len(tracking.get('published_groups', []))
-    total_count = len(all_groups)
+    state = load_state()
+    tracking = state['data']
+    scheduled = set(iter_scheduled_groups(include_published=True))
+    # Groups published before a reciter was dropped from the schedule do not count
+    published_count = len(state['published'] & scheduled)
+    total_count = len(scheduled)
     
     return {
         'published': published_count,
@@ -139,7 +493,7 @@ def get_progress() -> Dict:
         'remaining': total_count - published_count,
         'percentage': (published_count / total_count * 100) if total_count > 0 else 0,
         'last_published': tracking.get('last_published'),
-        'statistics': tracking.get('statistics', {})
+        'statistics': dict(tracking.get('statistics', {}))
     }
 
 
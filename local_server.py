@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for a video host, for testing uploads without the internet.
+Implements the resumable upload protocol used by upload_to_cdn.py's
+"resumable" backend, serves the uploaded files back, and serves rendered
+videos straight from generated_videos (the "static" backend, a stand-in
+for the GitHub Pages hop):
+
+    POST /uploads?name=video.mp4&size=N    -> 201 {"upload_id", "offset": 0}
+    PUT  /uploads/<id>                     body = one chunk, Content-Range: bytes a-b/N
+                                           -> 200 {"offset"} or, once complete, 201 {"offset", "url"}
+                                           -> 409 {"offset"} if a is not the current offset
+    GET  /uploads/<id>                     -> 200 {"offset", "size"} (where to resume)
+    GET  /files/<name>                     -> the uploaded file
+    GET  /videos/<name>                    -> a file from LOCAL_STATIC_DIR
+
+Files are served with their Content-Type and single-range support
+(Range: bytes=a-b), which is how Instagram and players fetch video.
+
+Partial uploads live in the upload directory as <id>.part with a <id>.json
+sidecar, so an interrupted upload can resume even after a server restart.
+"""
+
+import argparse
+import json
+import mimetypes
+import os
+import re
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, quote, unquote, urlparse
+
+from media_cache import CACHE_DIR
+
+LOCAL_SERVER_DIR = Path(os.environ.get("LOCAL_SERVER_DIR", str(CACHE_DIR / "uploads")))
+LOCAL_SERVER_HOST = os.environ.get("LOCAL_SERVER_HOST", "127.0.0.1")
+LOCAL_SERVER_PORT = int(os.environ.get("LOCAL_SERVER_PORT", "8080"))
+# Base URL handed out for uploaded files (set when the server sits behind a tunnel or proxy)
+LOCAL_SERVER_PUBLIC_URL = os.environ.get("LOCAL_SERVER_PUBLIC_URL", "")
+# Rendered videos served as-is under /videos/
+LOCAL_STATIC_DIR = Path(os.environ.get("LOCAL_STATIC_DIR", "generated_videos"))
+
+COPY_BUFFER = 1024 * 1024
+CONTENT_RANGE_PATTERN = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    (start, end) inclusive for a single-range Range header.
+
+    Returns:
+        None when the header is absent or not a single byte range (serve the
+        whole file); raises ValueError when the range is unsatisfiable
+    """
+    match = RANGE_PATTERN.fullmatch((header or '').strip())
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if not length:
+            raise ValueError("empty suffix range")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("range outside the file")
+    return start, end
+
+
+class UploadStore:
+    """Partial and finished uploads in one directory. Safe to share between handler threads."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        (self.directory / "files").mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _meta_path(self, upload_id: str) -> Path:
+        return self.directory / f"{upload_id}.json"
+
+    def _part_path(self, upload_id: str) -> Path:
+        return self.directory / f"{upload_id}.part"
+
+    def file_path(self, name: str) -> Path:
+        return self.directory / "files" / name
+
+    def create(self, name: str, size: int) -> Dict:
+        upload_id = uuid.uuid4().hex
+        meta = {'upload_id': upload_id, 'name': Path(name).name or f"{upload_id}.mp4", 'size': size, 'offset': 0}
+        with self._lock:
+            self._part_path(upload_id).touch()
+            self._meta_path(upload_id).write_text(json.dumps(meta), encoding='utf-8')
+        return meta
+
+    def get(self, upload_id: str) -> Optional[Dict]:
+        if not re.fullmatch(r"[0-9a-f]{32}", upload_id):
+            return None
+        try:
+            return json.loads(self._meta_path(upload_id).read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def write_chunk(self, meta: Dict, start: int, stream, length: int) -> Dict:
+        """Append one chunk at the current offset; finishes the upload when the last byte arrives."""
+        upload_id = meta['upload_id']
+        with self._lock:
+            with open(self._part_path(upload_id), 'r+b') as f:
+                f.seek(start)
+                remaining = length
+                while remaining:
+                    data = stream.read(min(COPY_BUFFER, remaining))
+                    if not data:
+                        break
+                    f.write(data)
+                    remaining -= len(data)
+                f.truncate()
+            meta = dict(meta, offset=start + length - remaining)
+            if meta['offset'] >= meta['size']:
+                os.replace(self._part_path(upload_id), self.file_path(meta['name']))
+                self._meta_path(upload_id).unlink()
+                meta['complete'] = True
+            else:
+                self._meta_path(upload_id).write_text(json.dumps(meta), encoding='utf-8')
+        return meta
+
+
+class LocalServerHandler(BaseHTTPRequestHandler):
+    server_version = "QuranLocalServer/1.0"
+
+    def log_message(self, format, *args):
+        print(f"[local_server] {self.address_string()} {format % args}")
+
+    @property
+    def store(self) -> UploadStore:
+        return self.server.store
+
+    def public_url(self, name: str) -> str:
+        base = self.server.public_url or f"http://{self.headers.get('Host') or '%s:%d' % self.server.server_address[:2]}"
+        return f"{base.rstrip('/')}/files/{quote(name)}"
+
+    def send_json(self, status: int, data: Dict):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def route(self) -> Tuple[str, str]:
+        """(collection, item) from a /collection/item path."""
+        parts = urlparse(self.path).path.strip('/').split('/', 1)
+        return parts[0], unquote(parts[1]) if len(parts) > 1 else ""
+
+    def do_POST(self):
+        collection, item = self.route()
+        if collection != "uploads" or item:
+            return self.send_json(404, {'error': 'not found'})
+        query = parse_qs(urlparse(self.path).query)
+        try:
+            size = int(query['size'][0])
+        except (KeyError, ValueError):
+            return self.send_json(400, {'error': 'size is required'})
+        meta = self.store.create(query.get('name', [''])[0], size)
+        self.send_json(201, {'upload_id': meta['upload_id'], 'offset': 0})
+
+    def do_PUT(self):
+        collection, upload_id = self.route()
+        meta = self.store.get(upload_id) if collection == "uploads" else None
+        if not meta:
+            return self.send_json(404, {'error': 'unknown upload'})
+        match = CONTENT_RANGE_PATTERN.fullmatch(self.headers.get('Content-Range', ''))
+        length = int(self.headers.get('Content-Length', 0))
+        if not match:
+            return self.send_json(400, {'error': 'Content-Range required'})
+        start, end, total = (int(g) for g in match.groups())
+        if total != meta['size'] or end - start + 1 != length:
+            return self.send_json(400, {'error': 'Content-Range does not match the upload'})
+        if start != meta['offset']:
+            return self.send_json(409, {'offset': meta['offset']})
+        meta = self.store.write_chunk(meta, start, self.rfile, length)
+        if meta.get('complete'):
+            return self.send_json(201, {'offset': meta['offset'], 'url': self.public_url(meta['name'])})
+        self.send_json(200, {'offset': meta['offset']})
+
+    def do_GET(self):
+        self.handle_get(head_only=False)
+
+    def do_HEAD(self):
+        self.handle_get(head_only=True)
+
+    def handle_get(self, head_only: bool):
+        collection, item = self.route()
+        if collection == "uploads":
+            meta = self.store.get(item)
+            if not meta:
+                return self.send_json(404, {'error': 'unknown upload'})
+            return self.send_json(200, {'offset': meta['offset'], 'size': meta['size']})
+        roots = {'files': self.store.directory / "files", 'videos': self.server.static_dir}
+        if collection in roots and item and Path(item).name == item:
+            path = roots[collection] / item
+            if path.is_file():
+                return self.send_file(path, head_only)
+        self.send_json(404, {'error': 'not found'})
+
+    def send_file(self, path: Path, head_only: bool):
+        """Send a file, or the one byte range asked for (206)."""
+        size = path.stat().st_size
+        try:
+            byte_range = parse_range(self.headers.get('Range'), size)
+        except ValueError:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        start, end = byte_range or (0, size - 1)
+        self.send_response(206 if byte_range else 200)
+        self.send_header("Content-Type", mimetypes.guess_type(path.name)[0] or "application/octet-stream")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        if byte_range:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Last-Modified", self.date_time_string(int(path.stat().st_mtime)))
+        self.end_headers()
+        if head_only:
+            return
+        with open(path, 'rb') as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                data = f.read(min(COPY_BUFFER, remaining))
+                if not data:
+                    break
+                self.wfile.write(data)
+                remaining -= len(data)
+
+
+class LocalServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], directory: Path = LOCAL_SERVER_DIR, public_url: str = LOCAL_SERVER_PUBLIC_URL,
+                 static_dir: Path = LOCAL_STATIC_DIR):
+        super().__init__(address, LocalServerHandler)
+        self.store = UploadStore(directory)
+        self.public_url = public_url
+        self.static_dir = Path(static_dir)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_local_server(host: str = LOCAL_SERVER_HOST, port: int = 0, directory: Path = LOCAL_SERVER_DIR,
+                       static_dir: Path = LOCAL_STATIC_DIR) -> LocalServer:
+    """Start a server on a background thread (port 0 = any free port); stop it with shutdown()."""
+    server = LocalServer((host, port), directory, static_dir=static_dir)
+    threading.Thread(target=server.serve_forever, name="local-server", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in video host (resumable uploads + file serving)')
+    parser.add_argument('--host', type=str, default=LOCAL_SERVER_HOST, help=f'Bind address (default: {LOCAL_SERVER_HOST})')
+    parser.add_argument('--port', type=int, default=LOCAL_SERVER_PORT, help=f'Port (default: {LOCAL_SERVER_PORT})')
+    parser.add_argument('--dir', type=str, default=str(LOCAL_SERVER_DIR), help=f'Upload directory (default: {LOCAL_SERVER_DIR})')
+    parser.add_argument('--static-dir', type=str, default=str(LOCAL_STATIC_DIR),
+                        help=f'Directory served under /videos/ (default: {LOCAL_STATIC_DIR})')
+    args = parser.parse_args()
+
+    server = LocalServer((args.host, args.port), Path(args.dir), static_dir=Path(args.static_dir))
+    print(f"Serving uploads from {args.dir} and {args.static_dir} (/videos/) at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
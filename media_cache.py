@@ -0,0 +1,340 @@
+"""
+Persistent on-disk cache for downloaded media (ayah audio, background clips)
+and locally rendered files (text overlays). Entries are keyed by source URL, validated against ETag/Content-Length and
+evicted (least-recently or least-frequently used) once the cache grows past
+its byte budget.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows: index writes are only serialized within one process
+    fcntl = None
+
+CACHE_DIR = Path(os.environ.get("QURAN_CACHE_DIR", ".cache"))
+# Small mutable run state (recent backgrounds, poll history); kept apart from the media so CI can save it every run
+STATE_DIR = Path(os.environ.get("QURAN_STATE_DIR", str(CACHE_DIR)))
+INDEX_FILENAME = "index.json"
+INDEX_LOCK_FILENAME = ".index.lock"
+EVICTION_POLICIES = ("lru", "lfu")
+
+
+def url_cache_key(url: str) -> str:
+    """Stable content-address for a source URL."""
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]
+
+
+class MediaCache:
+    """
+    Size-bounded cache of downloaded files.
+
+    Files are stored as {key}{suffix} inside cache_dir, with an index.json
+    recording source URL, size, ETag, Content-Length and last use time.
+    Safe to share between threads, and between processes using the same
+    cache_dir: every index update re-reads index.json under a file lock.
+
+    Eviction policy is "lru" (oldest last use goes first) or "lfu" (fewest
+    hits goes first, ties broken by last use). Pinned URLs (see pin()) are
+    never evicted by this process.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int, suffix: str = "", revalidate: bool = False, policy: str = "lru"):
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy {policy!r} (expected one of {EVICTION_POLICIES})")
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.revalidate = revalidate
+        self.policy = policy
+        self.index_path = self.cache_dir / INDEX_FILENAME
+        self._lock = threading.RLock()
+        self._lock_file = None
+        self._lock_depth = 0
+        self._entries: Optional[Dict[str, Dict]] = None
+        self._pins: Dict[str, int] = {}
+
+    # ------------------------------------------------------------------
+    # Index handling
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _index_lock(self):
+        """
+        Hold the index across threads and (where fcntl exists) processes. Re-entrant.
+
+        The index is re-read when the outermost lock is taken, so every update
+        starts from what other processes saved.
+        """
+        with self._lock:
+            if self._lock_depth == 0:
+                self._entries = None
+                if fcntl is not None:
+                    self.cache_dir.mkdir(parents=True, exist_ok=True)
+                    self._lock_file = open(self.cache_dir / INDEX_LOCK_FILENAME, 'a+')
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0 and self._lock_file is not None:
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+                    self._lock_file.close()
+                    self._lock_file = None
+
+    def _load_index(self) -> Dict[str, Dict]:
+        if self._entries is None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f).get('entries', {})
+            except FileNotFoundError:
+                self._entries = {}
+            except Exception as e:
+                print(f"  Cache index unreadable ({e}), starting empty: {self.index_path}")
+                self._entries = {}
+        return self._entries
+
+    def _save_index(self):
+        entries = self._load_index()
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".index-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'entries': entries}, f)
+            os.replace(tmp_path, self.index_path)
+        except Exception as e:
+            print(f"  Could not save cache index: {e}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    def path_for(self, url: str) -> Path:
+        """Stable on-disk path for a URL."""
+        return self.cache_dir / f"{url_cache_key(url)}{self.suffix}"
+
+    def total_bytes(self) -> int:
+        with self._index_lock():
+            return sum(entry.get('size', 0) for entry in self._load_index().values())
+
+    # ------------------------------------------------------------------
+    # Lookup and download
+    # ------------------------------------------------------------------
+
+    def _remote_headers(self, url: str, session: requests.Session) -> Dict[str, Optional[str]]:
+        response = session.head(url, timeout=15, allow_redirects=True)
+        response.raise_for_status()
+        return {
+            'etag': response.headers.get('ETag'),
+            'content_length': response.headers.get('Content-Length'),
+        }
+
+    def _is_valid(self, entry: Dict, path: Path, url: str, session: Optional[requests.Session]) -> bool:
+        if not path.exists():
+            return False
+        size = path.stat().st_size
+        if size == 0 or size != entry.get('size'):
+            return False
+        expected_length = entry.get('content_length')
+        if expected_length is not None and str(size) != str(expected_length):
+            return False
+        if self.revalidate and session is not None:
+            try:
+                remote = self._remote_headers(url, session)
+            except Exception as e:
+                # Offline or flaky origin: trust the local copy
+                print(f"  Cache revalidation skipped ({e})")
+                return True
+            if remote['etag'] and entry.get('etag') and remote['etag'] != entry['etag']:
+                return False
+            if remote['content_length'] and str(remote['content_length']) != str(size):
+                return False
+        return True
+
+    def get(self, url: str, session: Optional[requests.Session] = None) -> Optional[Path]:
+        """Return the cached file for a URL, or None on a miss or stale entry."""
+        key = url_cache_key(url)
+        path = self.path_for(url)
+        with self._index_lock():
+            entry = self._load_index().get(key)
+        if entry is None:
+            return None
+
+        if not self._is_valid(entry, path, url, session):
+            self.discard(url)
+            return None
+
+        with self._index_lock():
+            # Re-read: another process may have evicted the entry meanwhile
+            entry = self._load_index().get(key)
+            if entry is None or not path.exists():
+                return None
+            entry['last_used'] = time.time()
+            entry['hits'] = entry.get('hits', 0) + 1
+            self._save_index()
+        return path
+
+    def fetch(self, url: str, session: requests.Session, timeout: int = 30) -> Optional[Path]:
+        """Return a cached file for a URL, downloading it on a miss."""
+        return self.fetch_with_status(url, session, timeout)[0]
+
+    def fetch_with_status(self, url: str, session: requests.Session, timeout: int = 30) -> Tuple[Optional[Path], bool]:
+        """Like fetch, but returns (path, cache_hit)."""
+        cached = self.get(url, session)
+        if cached:
+            return cached, True
+
+        path = self.path_for(url)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f".{path.name}-", suffix=".part")
+        try:
+            with session.get(url, timeout=timeout, stream=True) as response:
+                response.raise_for_status()
+                with os.fdopen(fd, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        f.write(chunk)
+                etag = response.headers.get('ETag')
+                # Content-Length describes the encoded body, so only trust it for identity transfers
+                content_length = None if response.headers.get('Content-Encoding') else response.headers.get('Content-Length')
+
+            size = os.path.getsize(tmp_path)
+            if size == 0:
+                raise IOError("empty response body")
+            if content_length is not None and str(size) != str(content_length):
+                raise IOError(f"truncated download ({size} of {content_length} bytes)")
+
+            # Atomic publish: readers only ever see complete files
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        self._add_entry(url, path, size, etag, content_length)
+        return path, False
+
+    def put(self, url: str, source_path: Path) -> Path:
+        """
+        Add a locally produced file to the cache under url, then trim the cache.
+
+        source_path is moved into place, so it should be on the cache's
+        filesystem (e.g. a temp file inside cache_dir).
+        """
+        path = self.path_for(url)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        os.replace(source_path, path)
+        self._add_entry(url, path, path.stat().st_size)
+        return path
+
+    def _add_entry(self, url: str, path: Path, size: int, etag: Optional[str] = None, content_length: Optional[str] = None):
+        now = time.time()
+        with self._index_lock():
+            self._load_index()[url_cache_key(url)] = {
+                'url': url,
+                'filename': path.name,
+                'size': size,
+                'etag': etag,
+                'content_length': content_length,
+                'created': now,
+                'last_used': now,
+                'hits': 0,
+            }
+            self._save_index()
+        # Never evict the file being returned, even when everything older is pinned
+        with self.pinned([url]):
+            self.evict()
+
+    # ------------------------------------------------------------------
+    # Eviction
+    # ------------------------------------------------------------------
+
+    def discard(self, url: str):
+        """Remove a single URL from the cache."""
+        key = url_cache_key(url)
+        with self._index_lock():
+            entry = self._load_index().pop(key, None)
+            if entry is not None:
+                self._save_index()
+        try:
+            self.path_for(url).unlink()
+        except FileNotFoundError:
+            pass
+
+    def pin(self, url: str):
+        """Keep a URL from being evicted until a matching unpin() (pins nest)."""
+        key = url_cache_key(url)
+        with self._lock:
+            self._pins[key] = self._pins.get(key, 0) + 1
+
+    def unpin(self, url: str):
+        """Release one pin() of a URL."""
+        key = url_cache_key(url)
+        with self._lock:
+            if self._pins.get(key, 0) <= 1:
+                self._pins.pop(key, None)
+            else:
+                self._pins[key] -= 1
+
+    @contextmanager
+    def pinned(self, urls: Iterable[str]):
+        """Pin URLs for the duration of a with block."""
+        urls = list(urls)
+        for url in urls:
+            self.pin(url)
+        try:
+            yield
+        finally:
+            for url in urls:
+                self.unpin(url)
+
+    def _eviction_order(self, entry: Dict):
+        if self.policy == "lfu":
+            return (entry.get('hits', 0), entry.get('last_used', 0))
+        return entry.get('last_used', 0)
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """
+        Evict entries according to the cache policy until the cache fits its budget.
+        Pinned entries are skipped, so the cache may stay over budget while they are held.
+
+        Returns:
+            Number of bytes freed
+        """
+        budget = self.max_bytes if max_bytes is None else max_bytes
+        freed = 0
+        with self._index_lock():
+            entries = self._load_index()
+            total = sum(entry.get('size', 0) for entry in entries.values())
+            if total <= budget:
+                return 0
+
+            for key, entry in sorted(entries.items(), key=lambda item: self._eviction_order(item[1])):
+                if total <= budget:
+                    break
+                if key in self._pins:
+                    continue
+                try:
+                    (self.cache_dir / entry['filename']).unlink()
+                except FileNotFoundError:
+                    pass
+                except Exception as e:
+                    print(f"  Could not evict {entry.get('filename')}: {e}")
+                    continue
+                del entries[key]
+                total -= entry.get('size', 0)
+                freed += entry.get('size', 0)
+            self._save_index()
+        return freed
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Mock Instagram Graph API for testing the publish path offline.
+Point the clients at it with GRAPH_API_BASE=http://127.0.0.1:8090/v17.0.
+
+Implements the calls publish_reel.py and graph_api_async.py make:
+
+    POST /<version>/<ig_user_id>/media          create a REELS container
+    GET  /<version>/<creation_id>?fields=...    status_code, processing_progress, status
+    POST /<version>/<ig_user_id>/media_publish  publish a FINISHED container
+    GET  /<version>/oauth/access_token          token refresh (returns the same token)
+
+Like Instagram, a container downloads its video_url. The download has to
+succeed with a video/* Content-Type. Processing then takes
+MOCK_PROCESSING_SECONDS, with processing_progress rising along the way. A
+container whose download fails goes to ERROR.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+MOCK_GRAPH_HOST = os.environ.get("MOCK_GRAPH_HOST", "127.0.0.1")
+MOCK_GRAPH_PORT = int(os.environ.get("MOCK_GRAPH_PORT", "8090"))
+MOCK_PROCESSING_SECONDS = float(os.environ.get("MOCK_PROCESSING_SECONDS", "3"))
+
+SUPPORTED_FIELDS = ("id", "status_code", "processing_progress", "status")
+
+
+class MockGraphState:
+    """Containers and published media. Safe to share between handler threads."""
+
+    def __init__(self, processing_seconds: float = MOCK_PROCESSING_SECONDS):
+        self.processing_seconds = processing_seconds
+        self.containers: Dict[str, Dict] = {}
+        self.published: Dict[str, Dict] = {}
+        self._ids = itertools.count(17841400000000001)
+        self._lock = threading.Lock()
+
+    def next_id(self) -> str:
+        with self._lock:
+            return str(next(self._ids))
+
+    def create_container(self, ig_user_id: str, video_url: str, caption: str) -> Dict:
+        container = {
+            'id': self.next_id(),
+            'ig_user_id': ig_user_id,
+            'video_url': video_url,
+            'caption': caption,
+            'created': time.monotonic(),
+            'downloaded': None,
+            'bytes': 0,
+            'error': None,
+        }
+        with self._lock:
+            self.containers[container['id']] = container
+        threading.Thread(target=self._download, args=(container,), daemon=True).start()
+        return container
+
+    def _download(self, container: Dict):
+        """Fetch the video the way Instagram does (streamed GET, Content-Type checked)."""
+        try:
+            with requests.get(container['video_url'], stream=True, timeout=30) as response:
+                response.raise_for_status()
+                content_type = response.headers.get('Content-Type', '')
+                if not content_type.startswith('video/'):
+                    raise ValueError(f"unsupported Content-Type {content_type!r}")
+                for chunk in response.iter_content(1024 * 1024):
+                    container['bytes'] += len(chunk)
+            container['downloaded'] = time.monotonic()
+            print(f"[mock_graph] container {container['id']}: fetched {container['bytes']} bytes")
+        except Exception as e:
+            container['error'] = str(e)
+            print(f"[mock_graph] container {container['id']}: download failed: {e}")
+
+    def status(self, container: Dict) -> Tuple[str, int]:
+        """(status_code, processing_progress percent)."""
+        if container['error']:
+            return "ERROR", 0
+        if container['downloaded'] is None:
+            return "IN_PROGRESS", 0
+        if not self.processing_seconds:
+            return "FINISHED", 100
+        progress = (time.monotonic() - container['downloaded']) / self.processing_seconds
+        return ("FINISHED", 100) if progress >= 1 else ("IN_PROGRESS", int(progress * 100))
+
+
+class MockGraphHandler(BaseHTTPRequestHandler):
+    server_version = "MockGraphAPI/1.0"
+
+    def log_message(self, format, *args):
+        print(f"[mock_graph] {format % args}")
+
+    @property
+    def state(self) -> MockGraphState:
+        return self.server.state
+
+    def send_json(self, status: int, data: Dict):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status: int, message: str, code: int = 100):
+        self.send_json(status, {'error': {'message': message, 'type': 'OAuthException', 'code': code}})
+
+    def request_params(self) -> Dict[str, str]:
+        """Query string plus form body, first value of each."""
+        params = parse_qs(urlparse(self.path).query)
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            params.update(parse_qs(self.rfile.read(length).decode('utf-8')))
+        return {key: values[0] for key, values in params.items()}
+
+    def path_parts(self):
+        """Path segments after the API version (v17.0/...)."""
+        parts = urlparse(self.path).path.strip('/').split('/')
+        return parts[1:] if parts and parts[0].startswith('v') and '.' in parts[0] else parts
+
+    def do_POST(self):
+        params = self.request_params()
+        parts = self.path_parts()
+        if not params.get('access_token'):
+            return self.send_error_json(400, "An active access token must be used", 2500)
+        if len(parts) == 2 and parts[1] == "media":
+            if params.get('media_type') != "REELS" or not params.get('video_url'):
+                return self.send_error_json(400, "media_type=REELS and video_url are required")
+            container = self.state.create_container(parts[0], params['video_url'], params.get('caption', ''))
+            return self.send_json(200, {'id': container['id']})
+        if len(parts) == 2 and parts[1] == "media_publish":
+            container = self.state.containers.get(params.get('creation_id', ''))
+            if not container or container['ig_user_id'] != parts[0]:
+                return self.send_error_json(400, "Invalid creation_id")
+            if self.state.status(container)[0] != "FINISHED":
+                return self.send_error_json(400, "Media ID is not available", 9007)
+            media_id = self.state.next_id()
+            self.state.published[media_id] = container
+            print(f"[mock_graph] published media {media_id} from container {container['id']}")
+            return self.send_json(200, {'id': media_id})
+        self.send_error_json(404, "Unknown path")
+
+    def do_GET(self):
+        params = self.request_params()
+        parts = self.path_parts()
+        if parts == ["oauth", "access_token"]:
+            return self.send_json(200, {'access_token': params.get('fb_exchange_token', ''), 'token_type': 'bearer',
+                                        'expires_in': 60 * 86400})
+        if not params.get('access_token'):
+            return self.send_error_json(400, "An active access token must be used", 2500)
+        container = self.state.containers.get(parts[0]) if len(parts) == 1 else None
+        if not container:
+            return self.send_error_json(404, "Unsupported get request")
+        fields = [f for f in params.get('fields', 'id').split(',') if f]
+        unknown = [f for f in fields if f not in SUPPORTED_FIELDS]
+        if unknown:
+            return self.send_error_json(400, f"Tried accessing nonexisting field ({unknown[0]})")
+        status_code, progress = self.state.status(container)
+        values = {
+            'id': container['id'],
+            'status_code': status_code,
+            'processing_progress': progress,
+            'status': f"{status_code}: {container['error']}" if container['error'] else status_code,
+        }
+        self.send_json(200, {field: values[field] for field in fields})
+
+
+class MockGraphServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], processing_seconds: float = MOCK_PROCESSING_SECONDS):
+        super().__init__(address, MockGraphHandler)
+        self.state = MockGraphState(processing_seconds)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v17.0"
+
+
+def start_mock_graph_api(host: str = MOCK_GRAPH_HOST, port: int = 0,
+                         processing_seconds: Optional[float] = None) -> MockGraphServer:
+    """Start the mock on a background thread (port 0 = any free port); use server.base_url as GRAPH_API_BASE."""
+    server = MockGraphServer((host, port), MOCK_PROCESSING_SECONDS if processing_seconds is None else processing_seconds)
+    threading.Thread(target=server.serve_forever, name="mock-graph-api", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock Instagram Graph API for offline publish tests')
+    parser.add_argument('--host', type=str, default=MOCK_GRAPH_HOST, help=f'Bind address (default: {MOCK_GRAPH_HOST})')
+    parser.add_argument('--port', type=int, default=MOCK_GRAPH_PORT, help=f'Port (default: {MOCK_GRAPH_PORT})')
+    parser.add_argument('--processing-seconds', type=float, default=MOCK_PROCESSING_SECONDS,
+                        help=f'Simulated processing time after download (default: {MOCK_PROCESSING_SECONDS})')
+    args = parser.parse_args()
+
+    server = MockGraphServer((args.host, args.port), args.processing_seconds)
+    print(f"Mock Graph API at {server.base_url} (set GRAPH_API_BASE to this)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Pipelined render-and-publish runner.
+Three stages run on their own threads, connected by bounded queues:
+
+    prefetch  claim a group lease, download its ayah audio and background
+    render    process_group (the only CPU-heavy stage)
+    publish   caption, upload/publish, poll, then complete the lease
+
+While group N is being uploaded and polled, group N+1 is rendering and
+group N+2 is downloading, so the encoder does not sit idle behind network
+steps. The queues hold at most PIPELINE_QUEUE_SIZE groups each, which caps
+how far prefetch runs ahead (and how many leases one runner holds).
+"""
+
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from generate_caption import generate_caption
+from generate_simple_video import (
+    ENCODE_STATS, OUTPUT_VIDEO_DIR, find_ffmpeg, prefetch_group_assets, process_group, release_group_assets
+)
+from group_tracker import iter_scheduled_groups
+from publish_reel import (
+    APP_ID, APP_SECRET, create_video_container, poll_until_finished, publish_media, refresh_long_lived_token
+)
+from publish_reel_instagrapi import load_credentials, publish_with_instagrapi
+from run_report import get_run_id, span, write_run_summary
+from upload_to_cdn import upload_video
+from work_queue import LeaseHeartbeat, get_work_queue
+
+# Groups waiting between two stages (1 = prefetch at most one group ahead of the encoder)
+PIPELINE_QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE_SIZE", "1"))
+
+# "auto" picks graph_api or instagrapi from the available credentials; "none" renders without publishing
+PUBLISH_METHODS = ("auto", "graph_api", "instagrapi", "none")
+PUBLISH_METHOD = os.environ.get("PIPELINE_PUBLISH_METHOD", "auto").lower()
+
+# Temporary host the Graph API fetches the video from (see upload_to_cdn.py)
+UPLOAD_SERVICE = os.environ.get("UPLOAD_SERVICE", "0x0")
+
+# Marks the end of a stage's input
+STOP = None
+
+
+def publish_video(video_path: Path, caption: str, method: str, credentials: Dict) -> Optional[str]:
+    """
+    Publish one rendered video.
+
+    Args:
+        video_path: Rendered video
+        caption: Post caption
+        method: "graph_api" or "instagrapi"
+        credentials: Result of load_credentials() (token already refreshed)
+
+    Returns:
+        Media id (or a method marker when the method reports none), None on failure
+    """
+    if method == "instagrapi":
+        with span("publish", step="instagrapi", video=video_path.name, bytes=video_path.stat().st_size) as record:
+            ok = publish_with_instagrapi(video_path, caption, credentials['username'], credentials['password'])
+            record['status'] = "ok" if ok else "failed"
+        return "instagrapi" if ok else None
+
+    video_url = upload_video(video_path, UPLOAD_SERVICE)
+    if not video_url:
+        return None
+    creation_id = create_video_container(credentials['user_id'], credentials['token'], video_url, caption)
+    poll_until_finished(creation_id, credentials['token'], size_bytes=video_path.stat().st_size)
+    return publish_media(credentials['user_id'], credentials['token'], creation_id)
+
+
+class PipelineRunner:
+    """
+    Runs the prefetch, render and publish stages concurrently.
+
+    Every group is claimed through the work queue, so several runners (or a
+    runner next to the scheduled workflow) never handle the same group. A
+    group that fails at any stage has its lease released and is retried by a
+    later run.
+    """
+
+    def __init__(
+        self,
+        ffmpeg_path: str,
+        publish_method: str = PUBLISH_METHOD,
+        credentials: Optional[Dict] = None,
+        max_groups: int = 0,
+        queue_size: int = PIPELINE_QUEUE_SIZE,
+        **render_options
+    ):
+        """
+        Args:
+            ffmpeg_path: Path to FFmpeg executable
+            publish_method: "graph_api", "instagrapi" or "none"
+            credentials: Publishing credentials (see load_credentials)
+            max_groups: Stop after claiming this many groups (0 = until none are left)
+            queue_size: Groups buffered between two stages
+            **render_options: Extra process_group keyword arguments (encoder_profile, overlay_backend, ...)
+        """
+        self.ffmpeg_path = ffmpeg_path
+        self.publish_method = publish_method
+        self.credentials = credentials or {}
+        self.max_groups = max_groups
+        self.render_options = render_options
+        self.work_queue = get_work_queue()
+        self.render_queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self.publish_queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self.stop_event = threading.Event()
+        self.results: List[Dict] = []
+        self.render_idle_seconds = 0.0
+        # Groups this run already handled (whatever the outcome); never claimed twice per run
+        self.handled_groups = set()
+        self._results_lock = threading.Lock()
+
+    def _finish(self, job: Dict, status: str, error: Optional[str] = None):
+        """Stop the job's heartbeat, settle its lease and record the result. Never raises."""
+        release_group_assets(job['group_id'])
+        try:
+            job['heartbeat'].stop()
+            lease = job['lease']
+            if status == 'published':
+                if not self.work_queue.complete(lease['group_id'], lease['token']):
+                    status = 'lease_lost'
+            else:
+                self.work_queue.release(lease['group_id'], lease['token'])
+        except Exception as e:
+            # The lease expires on its own; the result is still recorded
+            print(f"[pipeline] {job['group_id']}: could not settle lease: {e}")
+            error = f"{error}; lease: {e}" if error else f"lease: {e}"
+
+        result = {
+            'group_id': job['group_id'],
+            'status': status,
+            'background_id': job.get('background_id'),
+            'media_id': job.get('media_id'),
+            'timings': {k: round(v, 2) for k, v in job['timings'].items()},
+            'total_seconds': round(time.perf_counter() - job['claimed'], 2),
+        }
+        stats = ENCODE_STATS.get(str(job.get('output_path')), {})
+        if stats:
+            result.update({k: stats.get(k) for k in ('profile', 'encode_seconds', 'encode_fps', 'encode_speed')})
+            result['cached'] = bool(stats.get('cached'))
+        if error:
+            result['error'] = error
+        with self._results_lock:
+            self.results.append(result)
+        print(f"[pipeline] {job['group_id']}: {status} in {result['total_seconds']:.1f}s")
+
+    def _drain(self, upstream: queue.Queue):
+        """After a stage died: cancel the jobs still coming from upstream so it never blocks on put()."""
+        while True:
+            job = upstream.get()
+            if job is STOP:
+                return
+            self._finish(job, 'cancelled', "pipeline stopped")
+
+    def _prefetch_stage(self):
+        claimed = 0
+        try:
+            while not self.stop_event.is_set() and (not self.max_groups or claimed < self.max_groups):
+                candidates = (g for g in iter_scheduled_groups() if g not in self.handled_groups)
+                lease = self.work_queue.claim(candidates=candidates)
+                if not lease:
+                    print("[prefetch] No more groups to claim")
+                    break
+                claimed += 1
+                self.handled_groups.add(lease['group_id'])
+                job = {
+                    'group_id': lease['group_id'],
+                    'lease': lease,
+                    'heartbeat': LeaseHeartbeat(self.work_queue, lease).start(),
+                    'claimed': time.perf_counter(),
+                    'output_path': OUTPUT_VIDEO_DIR / f"{lease['group_id']}.mp4",
+                    'timings': {},
+                }
+                try:
+                    self._prefetch_job(job)
+                except Exception as e:
+                    self._finish(job, 'prefetch_failed', str(e))
+        except Exception as e:
+            print(f"[prefetch] stage stopped: {e}")
+            self.stop_event.set()
+        finally:
+            self.render_queue.put(STOP)
+
+    def _prefetch_job(self, job: Dict):
+        print(f"[prefetch] {job['group_id']}")
+        start = time.perf_counter()
+        try:
+            job['background_id'] = prefetch_group_assets(job['group_id'], job['output_path'])
+        except Exception as e:
+            job['background_id'] = None
+            print(f"[prefetch] {job['group_id']} failed: {e}")
+        job['timings']['prefetch'] = time.perf_counter() - start
+        if job['background_id'] is None:
+            self._finish(job, 'prefetch_failed')
+            return
+        self.render_queue.put(job)
+
+    def _render_stage(self):
+        try:
+            while True:
+                waiting = time.perf_counter()
+                job = self.render_queue.get()
+                self.render_idle_seconds += time.perf_counter() - waiting
+                if job is STOP:
+                    return
+                try:
+                    self._render_job(job)
+                except Exception as e:
+                    self._finish(job, 'render_failed', str(e))
+        except Exception as e:
+            print(f"[render] stage stopped: {e}")
+            self.stop_event.set()
+            self._drain(self.render_queue)
+        finally:
+            self.publish_queue.put(STOP)
+
+    def _render_job(self, job: Dict):
+        if self.stop_event.is_set() or job['heartbeat'].lost.is_set():
+            self._finish(job, 'cancelled')
+            return
+        print(f"[render] {job['group_id']}")
+        start = time.perf_counter()
+        try:
+            rendered = process_group(job['group_id'], self.ffmpeg_path, background_id=job['background_id'],
+                                     output_video_path=job['output_path'], **self.render_options)
+            error = None
+        except Exception as e:
+            rendered, error = False, str(e)
+        job['timings']['render'] = time.perf_counter() - start
+        if not rendered:
+            self._finish(job, 'render_failed', error)
+            return
+        self.publish_queue.put(job)
+
+    def _publish_stage(self):
+        try:
+            while True:
+                job = self.publish_queue.get()
+                if job is STOP:
+                    return
+                try:
+                    self._publish_job(job)
+                except Exception as e:
+                    self._finish(job, 'publish_failed', str(e))
+        except Exception as e:
+            print(f"[publish] stage stopped: {e}")
+            self.stop_event.set()
+            self._drain(self.publish_queue)
+
+    def _publish_job(self, job: Dict):
+        if self.stop_event.is_set() or job['heartbeat'].lost.is_set():
+            self._finish(job, 'cancelled')
+            return
+        if self.publish_method == "none":
+            # Render-only run: give the group back so it is still published later
+            self._finish(job, 'rendered')
+            return
+        print(f"[publish] {job['group_id']}")
+        start = time.perf_counter()
+        try:
+            caption = generate_caption(job['group_id'])
+            job['media_id'] = publish_video(job['output_path'], caption, self.publish_method, self.credentials)
+            error = None if job['media_id'] else "publish returned no media id"
+        except Exception as e:
+            job['media_id'], error = None, str(e)
+        job['timings']['publish'] = time.perf_counter() - start
+        self._finish(job, 'published' if job['media_id'] else 'publish_failed', error)
+
+    def run(self, summary_path: Optional[Path] = None) -> Dict:
+        """
+        Run all stages until the queue is exhausted or max_groups were claimed.
+
+        Returns:
+            Summary dict with per-group status and stage timings
+        """
+        print(f"\n{'='*80}\nPIPELINE: publish via {self.publish_method}, "
+              f"{self.max_groups or 'all'} groups, queue size {self.render_queue.maxsize}\n{'='*80}")
+        started = datetime.now()
+        start = time.perf_counter()
+        threads = [
+            threading.Thread(target=stage, name=f"pipeline-{name}")
+            for name, stage in (('prefetch', self._prefetch_stage), ('render', self._render_stage),
+                                ('publish', self._publish_stage))
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=1)
+        except KeyboardInterrupt:
+            print("\nStopping after the groups in flight (leases are released)...")
+            self.stop_event.set()
+            for thread in threads:
+                thread.join()
+
+        summary = {
+            'started': started.isoformat(),
+            'finished': datetime.now().isoformat(),
+            'publish_method': self.publish_method,
+            'queue_size': self.render_queue.maxsize,
+            'total_seconds': round(time.perf_counter() - start, 2),
+            'render_idle_seconds': round(self.render_idle_seconds, 2),
+            'published': sum(1 for r in self.results if r['status'] == 'published'),
+            'rendered': sum(1 for r in self.results if r['status'] == 'rendered'),
+            'failed': sum(1 for r in self.results if r['status'] not in ('published', 'rendered')),
+            'groups': self.results,
+            'run_id': get_run_id(),
+            'stages': (write_run_summary() or {}).get('stages', {}),
+        }
+        summary_path = summary_path or OUTPUT_VIDEO_DIR / "pipeline_summary.json"
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+
+        print(f"\n{'='*80}")
+        print(f"PIPELINE COMPLETE: {summary['published']} published, {summary['rendered']} rendered only, "
+              f"{summary['failed']} failed "
+              f"in {summary['total_seconds']:.1f}s (encoder idle {summary['render_idle_seconds']:.1f}s)")
+        print(f"Summary: {summary_path} (stage report: python run_report.py --run {summary['run_id']})")
+        print(f"{'='*80}")
+        return summary
+
+
+def resolve_publish_method(method: str) -> Tuple[str, Dict]:
+    """Resolve "auto" from the available credentials and refresh the Graph API token once."""
+    credentials = load_credentials() if method != "none" else {}
+    if method == "auto":
+        method = credentials.get('method') or ""
+        if not method:
+            raise ValueError("No Instagram credentials found (use --publish none to render only)")
+    if method == "graph_api":
+        if not credentials.get('user_id') or not credentials.get('token'):
+            raise ValueError("graph_api needs IG_USER_ID and LONG_LIVED_TOKEN")
+        credentials['token'] = refresh_long_lived_token(credentials['token'], APP_ID, APP_SECRET)
+    elif method == "instagrapi" and not (credentials.get('username') and credentials.get('password')):
+        raise ValueError("instagrapi needs INSTAGRAM_USERNAME and INSTAGRAM_PASSWORD")
+    return method, credentials
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Render and publish groups in a pipeline (prefetch / render / publish)',
+        epilog="""
+Examples:
+  # Publish every remaining group, prefetching and rendering ahead of the upload
+  python pipeline_runner.py
+
+  # Render the next 5 groups without publishing
+  python pipeline_runner.py --count 5 --publish none --encoder-profile fast
+        """
+    )
+    parser.add_argument('--count', type=int, default=0, help='Groups to claim (default: until none are left)')
+    parser.add_argument('--publish', type=str, default=PUBLISH_METHOD, choices=PUBLISH_METHODS,
+                        help=f'Publishing method (default: {PUBLISH_METHOD})')
+    parser.add_argument('--queue-size', type=int, default=PIPELINE_QUEUE_SIZE,
+                        help=f'Groups buffered between stages (default: {PIPELINE_QUEUE_SIZE})')
+    parser.add_argument('--encoder-profile', type=str, help='Encoder profile (default: ENCODER_PROFILE)')
+    parser.add_argument('--overlay-backend', type=str, help='Text overlay backend (default: OVERLAY_BACKEND)')
+    parser.add_argument('--audio-mode', type=str, help='Audio mode (default: AUDIO_MODE)')
+    parser.add_argument('--summary', type=str, help='Summary JSON path (default: generated_videos/pipeline_summary.json)')
+    args = parser.parse_args()
+
+    ffmpeg_path = find_ffmpeg()
+    if not ffmpeg_path:
+        print("Error: FFmpeg not found")
+        sys.exit(1)
+
+    try:
+        method, credentials = resolve_publish_method(args.publish)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(2)
+
+    render_options = {k: v for k, v in (('encoder_profile', args.encoder_profile),
+                                        ('overlay_backend', args.overlay_backend),
+                                        ('audio_mode', args.audio_mode)) if v}
+    runner = PipelineRunner(ffmpeg_path, method, credentials, args.count, args.queue_size, **render_options)
+    summary = runner.run(Path(args.summary) if args.summary else None)
+    sys.exit(0 if not summary['failed'] else 1)
+
+
+if __name__ == "__main__":
+    main()
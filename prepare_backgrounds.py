@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Prepare a library of pre-normalized background proxies.
+Transcodes each approved Pixabay clip once into a cropped, color-adjusted
+1080x1920@30 mezzanine file. generate_simple_video.py picks a proxy up
+automatically when one exists, skipping scale/crop/eq on every render.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from background_catalog import get_catalog
+from generate_simple_video import (
+    BACKGROUND_PROXY_DIR,
+    BACKGROUND_PROXY_INDEX,
+    VIDEO_FPS,
+    VIDEO_HEIGHT,
+    VIDEO_WIDTH,
+    build_background_filter,
+    download_background_video,
+    find_ffmpeg,
+    format_size,
+    get_background_proxy,
+    load_proxy_index,
+)
+
+# Mezzanine encoding: visually lossless, short GOP so looping/seeking stays cheap
+PROXY_CRF = os.environ.get("PROXY_CRF", "16")
+PROXY_PRESET = os.environ.get("PROXY_PRESET", "medium")
+
+_index_lock = threading.Lock()
+
+
+def load_approved_videos() -> List[Dict]:
+    """Load approved background entries with a normalized 'video_url' field."""
+    return list(get_catalog().iter_videos())
+
+
+def save_proxy_entry(video_id: str, entry: Dict):
+    """Record one proxy in the index (atomic rewrite)."""
+    with _index_lock:
+        proxies = load_proxy_index()
+        proxies[video_id] = entry
+        BACKGROUND_PROXY_DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=BACKGROUND_PROXY_DIR, prefix=".index-", suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'proxies': proxies}, f, indent=2)
+        os.replace(tmp_path, BACKGROUND_PROXY_INDEX)
+
+
+def transcode_proxy(source_path: Path, output_path: Path, ffmpeg_path: str) -> bool:
+    """Transcode a source clip into a 1080x1920@30 proxy."""
+    filter_complex = ";".join(build_background_filter("0:v", "normalized") + [f"[normalized]fps={VIDEO_FPS}[proxy]"])
+    tmp_path = output_path.with_name(f".{output_path.stem}.part{output_path.suffix}")
+    cmd = [
+        ffmpeg_path, '-i', str(source_path),
+        '-filter_complex', filter_complex, '-map', '[proxy]',
+        '-an',
+        '-c:v', 'libx264',
+        '-preset', PROXY_PRESET,
+        '-crf', PROXY_CRF,
+        '-pix_fmt', 'yuv420p',
+        '-g', str(VIDEO_FPS),
+        '-movflags', '+faststart',
+        '-y', str(tmp_path)
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+
+    if result.returncode != 0 or not tmp_path.exists() or tmp_path.stat().st_size == 0:
+        print(f"  FFmpeg error:\n{result.stderr[-2000:]}")
+        try:
+            tmp_path.unlink()
+        except FileNotFoundError:
+            pass
+        return False
+
+    os.replace(tmp_path, output_path)
+    return True
+
+
+def prepare_background(video_info: Dict, ffmpeg_path: str, force: bool = False) -> Optional[Path]:
+    """Build (or reuse) the proxy for a single approved background."""
+    video_id = str(video_info.get('id'))
+    existing = get_background_proxy(video_info)
+    if existing and not force:
+        print(f"[{video_id}] Proxy already prepared: {existing.name}")
+        return existing
+
+    print(f"[{video_id}] {video_info.get('width')}x{video_info.get('height')} source")
+    source_path = download_background_video(video_info)
+    if not source_path:
+        return None
+
+    BACKGROUND_PROXY_DIR.mkdir(parents=True, exist_ok=True)
+    output_path = BACKGROUND_PROXY_DIR / f"{video_id}.mp4"
+    if not transcode_proxy(source_path, output_path, ffmpeg_path):
+        print(f"[{video_id}] Failed to prepare proxy")
+        return None
+
+    save_proxy_entry(video_id, {
+        'filename': output_path.name,
+        'source_url': video_info.get('video_url'),
+        'source_width': video_info.get('width'),
+        'source_height': video_info.get('height'),
+        'width': VIDEO_WIDTH,
+        'height': VIDEO_HEIGHT,
+        'fps': VIDEO_FPS,
+        'size': output_path.stat().st_size,
+        'created': datetime.now().isoformat(),
+    })
+    print(f"[{video_id}] Proxy ready: {format_size(output_path.stat().st_size)}")
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Prepare pre-normalized 1080x1920 background proxies',
+        epilog="""
+Examples:
+  # Prepare every approved background
+  python prepare_backgrounds.py
+
+  # Prepare the first 20 water clips, two at a time
+  python prepare_backgrounds.py --category water --limit 20 --jobs 2
+
+  # Rebuild specific proxies
+  python prepare_backgrounds.py --ids water_1 water_3 --force
+        """
+    )
+    parser.add_argument('--category', type=str, help='Only prepare backgrounds in this category')
+    parser.add_argument('--ids', nargs='+', help='Only prepare these video ids')
+    parser.add_argument('--limit', type=int, help='Maximum number of backgrounds to prepare')
+    parser.add_argument('--jobs', type=int, default=1, help='Parallel transcodes (default: 1)')
+    parser.add_argument('--force', action='store_true', help='Rebuild proxies that already exist')
+
+    args = parser.parse_args()
+
+    ffmpeg_path = find_ffmpeg()
+    if not ffmpeg_path:
+        print("ERROR: FFmpeg not found!")
+        sys.exit(1)
+
+    videos = load_approved_videos()
+    if args.category:
+        videos = [v for v in videos if v.get('category') == args.category]
+    if args.ids:
+        wanted = set(args.ids)
+        videos = [v for v in videos if str(v.get('id')) in wanted]
+    # Entries without dimensions were never probed and are usually broken
+    videos = [v for v in videos if v.get('video_url') and v.get('width') and v.get('height')]
+    if args.limit:
+        videos = videos[:args.limit]
+
+    if not videos:
+        print("No backgrounds to prepare")
+        sys.exit(1)
+
+    print(f"Preparing {len(videos)} background proxies in {BACKGROUND_PROXY_DIR}\n")
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        results = list(executor.map(lambda v: prepare_background(v, ffmpeg_path, args.force), videos))
+
+    prepared = sum(1 for r in results if r)
+    print(f"\nPrepared {prepared}/{len(videos)} proxies")
+    sys.exit(0 if prepared == len(videos) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
 # publish_reel.py (concise)
 import time, requests, os, sys, json
 
+from container_poller import AdaptivePoller
+from run_report import span
+
 IG_USER_ID = os.environ.get("IG_USER_ID")
 LONG_LIVED_TOKEN = os.environ.get("LONG_LIVED_TOKEN")
 APP_ID = os.environ.get("APP_ID")
@@ -11,6 +14,34 @@ CAPTION = os.environ.get("CAPTION", "Automated post")
 MAX_WAIT_SECONDS = int(os.environ.get("MAX_POLL_SECONDS", "1500"))
 INTERVAL_SECONDS = int(os.environ.get("POLL_INTERVAL", "10"))
 DEFAULT_VIDEO_URL = "https://interactive-examples.mdn.mozilla.net/media/cc0-videos/flower.mp4"
+GRAPH_API_BASE = os.environ.get("GRAPH_API_BASE", "https://graph.facebook.com/v17.0").rstrip("/")
+
+# Container status handling (shared with graph_api_async.py)
+FINISHED_STATUSES = ("FINISHED", "SUCCEEDED", "COMPLETED", "SUCCESS")
+FAILED_STATUSES = ("ERROR", "ERR", "FAILED")
+
+def classify_container_status(status):
+    """Map a container status_code to 'finished', 'failed' or 'pending' (no status = ready)."""
+    if status is None:
+        return "finished"
+    if status.upper() in FINISHED_STATUSES:
+        return "finished"
+    if status.upper() in FAILED_STATUSES:
+        return "failed"
+    return "pending"
+
+def is_field_error(error_data):
+    """True when a Graph API error complains about the requested fields."""
+    error = (error_data or {}).get('error', {})
+    return 'field' in error.get('message', '').lower()
+
+def get_remote_size(url):
+    """Content-Length of a public video URL (None if the host does not say)."""
+    try:
+        r = requests.head(url, allow_redirects=True, timeout=10)
+        return int(r.headers["Content-Length"]) if r.ok and r.headers.get("Content-Length") else None
+    except Exception:
+        return None
 
 def refresh_long_lived_token(token, app_id=None, app_secret=None):
     """
@@ -24,7 +55,7 @@ def refresh_long_lived_token(token, app_id=None, app_secret=None):
     
     try:
         print("🔄 Attempting to refresh token...")
-        url = f"https://graph.facebook.com/v17.0/oauth/access_token"
+        url = f"{GRAPH_API_BASE}/oauth/access_token"
         params = {
             "grant_type": "fb_exchange_token",
             "client_id": app_id,
@@ -107,102 +138,96 @@ def update_github_secret(secret_name, secret_value, github_token, repository):
         return False
 
 def create_video_container(ig_user_id, token, video_url, caption, thumbnail_url=None):
-    url = f"https://graph.facebook.com/v17.0/{ig_user_id}/media"
+    url = f"{GRAPH_API_BASE}/{ig_user_id}/media"
     params = {"media_type":"REELS","video_url":video_url,"caption":caption,"access_token":token}
     if thumbnail_url:
         params["thumbnail_url"]=thumbnail_url
-    r = requests.post(url, params=params, timeout=30)
-    r.raise_for_status()
-    data = r.json()
+    with span("publish", step="create_container"):
+        r = requests.post(url, params=params, timeout=30)
+        r.raise_for_status()
+        data = r.json()
     print("create response:", data)
     cid = data.get("id")
     if not cid:
         raise RuntimeError("Failed to create container: %r" % (data,))
     return cid
 
-def poll_until_finished(creation_id, token, max_wait=MAX_WAIT_SECONDS, initial_interval=INTERVAL_SECONDS):
-    """Poll container status with exponential backoff until finished"""
-    poll_url = f"https://graph.facebook.com/v17.0/{creation_id}"
-    elapsed = 0.0
-    interval = initial_interval
-    max_interval = 30  # Cap exponential backoff
+def poll_until_finished(creation_id, token, max_wait=MAX_WAIT_SECONDS, initial_interval=INTERVAL_SECONDS, size_bytes=None):
+    """Poll container status until finished, timing polls with AdaptivePoller (see container_poller.py)"""
+    with span("container_poll", creation_id=creation_id, size_bytes=size_bytes) as record:
+        poll_url = f"{GRAPH_API_BASE}/{creation_id}"
+        poller = AdaptivePoller(size_bytes, max_wait, initial_interval)
+        if poller.expected is not None:
+            print(f"Expected processing time: ~{poller.expected:.0f}s (from previous uploads)")
     
-    print(f"\nPolling container status (timeout: {max_wait}s)...")
+        print(f"\nPolling container status (timeout: {max_wait}s)...")
     
-    while elapsed < max_wait:
-        # Try with just status_code field first (some containers don't support all fields)
-        params = {
-            "fields": "status_code",
-            "access_token": token
-        }
+        while poller.remaining() > 0:
+            # Ask for status_code (and progress); fields the container does not support are dropped
+            params = {"access_token": token}
+            if poller.fields:
+                params["fields"] = poller.fields
         
-        try:
-            r = requests.get(poll_url, params=params, timeout=30)
-            print(f"  Poll attempt: status={r.status_code}")
-            r.raise_for_status()
-            j = r.json()
-        except requests.HTTPError as e:
-            print(f"✗ HTTP error during polling: {e}")
-            if e.response is not None:
-                try:
-                    error_data = e.response.json()
+            try:
+                r = requests.get(poll_url, params=params, timeout=30)
+                print(f"  Poll attempt: status={r.status_code}")
+                r.raise_for_status()
+                j = r.json()
+            except requests.HTTPError as e:
+                print(f"✗ HTTP error during polling: {e}")
+                if e.response is not None:
+                    try:
+                        error_data = e.response.json()
+                    except ValueError:
+                        print(f"  Response: {e.response.text}")
+                        raise e
                     print(f"Error details: {json.dumps(error_data, indent=2)}")
-                    
-                    # Check if it's a field error - try without fields parameter
-                    error = error_data.get('error', {})
-                    if 'field' in error.get('message', '').lower():
-                        print("  Retrying without fields parameter...")
-                        params = {"access_token": token}
-                        r = requests.get(poll_url, params=params, timeout=30)
-                        r.raise_for_status()
-                        j = r.json()
-                    else:
-                        raise
-                except Exception as retry_error:
-                    print(f"  Retry also failed: {retry_error}")
-                    if hasattr(retry_error, 'response') and retry_error.response:
-                        print(f"  Response: {retry_error.response.text}")
-                    raise
-            else:
+                
+                    # Check if it's a field error - retry with fewer fields
+                    if is_field_error(error_data) and poller.drop_fields():
+                        print(f"  Retrying with fields={poller.fields}...")
+                        continue
                 raise
-        except ValueError:
-            print(f"✗ Invalid JSON response: {r.text}")
-            raise RuntimeError(f"Invalid JSON while checking container: {r.text}")
-        
-        status = j.get("status_code")
-        progress = j.get("processing_progress", "N/A")
-        print(f"poll: elapsed={elapsed:.1f}s, status={status}, progress={progress}")
-        
-        # Handle missing status (common for images)
-        if status is None:
-            print("No status_code returned — container may be ready immediately")
-            return True
-        
-        # Check for completion
-        if status.upper() in ("FINISHED", "SUCCEEDED", "COMPLETED", "SUCCESS"):
-            print("✓ Container finished processing")
-            return True
-        
-        # Check for errors
-        if status.upper() in ("ERROR", "ERR", "FAILED"):
-            errors = j.get("errors", [])
-            raise RuntimeError(f"Container processing failed: status={status}, errors={errors}")
-        
-        # Still processing
-        time.sleep(interval)
-        elapsed += interval
-        
-        # Exponential backoff (capped)
-        interval = min(max_interval, interval * 1.5)
+            except ValueError:
+                print(f"✗ Invalid JSON response: {r.text}")
+                raise RuntimeError(f"Invalid JSON while checking container: {r.text}")
+        
+            status = j.get("status_code")
+            progress = j.get("processing_progress", "N/A")
+            print(f"poll: elapsed={poller.elapsed():.1f}s, status={status}, progress={progress}")
+        
+            state = classify_container_status(status)
+        
+            # Handle missing status (common for images)
+            if status is None:
+                print("No status_code returned — container may be ready immediately")
+                record['polls'] = poller.polls + 1
+                return True
+        
+            # Check for completion
+            if state == "finished":
+                print("✓ Container finished processing")
+                poller.finish()
+                record['polls'] = poller.polls + 1
+                return True
+        
+            # Check for errors
+            if state == "failed":
+                errors = j.get("errors", [])
+                raise RuntimeError(f"Container processing failed: status={status}, errors={errors}")
+        
+            # Still processing: wait until it should be ready (or back off)
+            time.sleep(poller.next_delay(j))
     
-    raise RuntimeError(f"Timed out waiting for container {creation_id} after {max_wait} seconds")
+        raise RuntimeError(f"Timed out waiting for container {creation_id} after {max_wait} seconds")
 
 def publish_media(ig_user_id, token, creation_id):
-    url = f"https://graph.facebook.com/v17.0/{ig_user_id}/media_publish"
+    url = f"{GRAPH_API_BASE}/{ig_user_id}/media_publish"
     params = {"creation_id":creation_id,"access_token":token}
-    r = requests.post(url, params=params, timeout=30)
-    r.raise_for_status()
-    data = r.json()
+    with span("publish", step="media_publish", creation_id=creation_id):
+        r = requests.post(url, params=params, timeout=30)
+        r.raise_for_status()
+        data = r.json()
     print("publish response:", data)
     return data.get("id")
 
@@ -223,7 +248,7 @@ def main():
     
     # Publish the reel
     creation_id = create_video_container(IG_USER_ID, token, video_url, CAPTION, thumbnail_url=thumb_url)
-    poll_until_finished(creation_id, token)
+    poll_until_finished(creation_id, token, size_bytes=get_remote_size(video_url))
     mid = publish_media(IG_USER_ID, token, creation_id)
     
     print("\n" + "=" * 70)
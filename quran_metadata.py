@@ -0,0 +1,98 @@
+"""
+Shared surah and reciter metadata lookups.
+Each JSON file is parsed once per process and turned into normalized
+lookup indexes, so video generation, captions and batch runs stop
+re-reading surah_names.json and reciter_names.json on every call.
+"""
+
+import json
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+
+SURAH_NAMES_FILE = Path("surah_names.json")
+RECITER_NAMES_FILE = Path("reciter_names.json")
+AVAILABLE_RECITERS_FILE = Path("quran_groups") / "available_reciters.json"
+
+
+def load_json(file_path: Path):
+    """Load JSON file."""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error loading {file_path}: {e}")
+        return {}
+
+
+def normalize_name(name: str) -> str:
+    """Normalize a reciter name the way reciter_names.json keys are written."""
+    name = name.lower().strip().replace('_', ' ').replace('`', "'").replace('’', "'")
+    return re.sub(r'\s+', ' ', name)
+
+
+def alias_key(name: str) -> str:
+    """Loose key that ignores spacing and punctuation (al-afasy == alafasy == al `afasy)."""
+    return re.sub(r'[^0-9a-z]', '', normalize_name(name))
+
+
+@lru_cache(maxsize=1)
+def load_surah_index() -> Dict[int, Dict[str, str]]:
+    """Surah number -> {'arabic', 'english'}."""
+    surahs = load_json(SURAH_NAMES_FILE).get('surahs', {})
+    index = {}
+    for key, value in surahs.items():
+        try:
+            index[int(key)] = value
+        except ValueError:
+            continue
+    return index
+
+
+@lru_cache(maxsize=1)
+def load_reciter_index() -> Dict[str, Dict[str, Dict[str, str]]]:
+    """
+    Reciter lookup indexes built from reciter_names.json.
+
+    Returns:
+        {'names': normalized name -> entry, 'aliases': alias key -> entry}
+    """
+    reciters = load_json(RECITER_NAMES_FILE).get('reciters', {})
+    names = {}
+    aliases = {}
+    for name, entry in reciters.items():
+        names[normalize_name(name)] = entry
+        # First spelling wins so the canonical entry is kept for ambiguous aliases
+        aliases.setdefault(alias_key(name), entry)
+    return {'names': names, 'aliases': aliases}
+
+
+@lru_cache(maxsize=1)
+def load_reciter_ids() -> Dict[str, str]:
+    """Reciter id (as string) -> reciter name, from available_reciters.json."""
+    data = load_json(AVAILABLE_RECITERS_FILE)
+    if not isinstance(data, list):
+        return {}
+    return {str(entry.get('id')): entry.get('reciter_name', '') for entry in data if entry.get('id') is not None}
+
+
+def find_surah(surah_number: int) -> Optional[Dict[str, str]]:
+    """Look up a surah's names, or None if unknown."""
+    try:
+        return load_surah_index().get(int(surah_number))
+    except (TypeError, ValueError):
+        return None
+
+
+def find_reciter(reciter_name: str) -> Optional[Dict[str, str]]:
+    """Look up a reciter's names by any spelling listed in reciter_names.json."""
+    if not reciter_name:
+        return None
+    index = load_reciter_index()
+    return index['names'].get(normalize_name(reciter_name)) or index['aliases'].get(alias_key(reciter_name))
+
+
+def find_reciter_by_id(reciter_id) -> Optional[Dict[str, str]]:
+    """Look up a reciter's names by the numeric id used in group ids (reciter7_...)."""
+    return find_reciter(load_reciter_ids().get(str(reciter_id), ''))
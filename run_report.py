@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Per-stage timing for a run, written as JSON Lines.
+
+Every timed stage (download, merge, text_extraction, filter_graph, encode,
+upload, container_poll, publish) is one span:
+
+    with span("download", group_id=group_id, url=url) as record:
+        path, hit = cache.fetch_with_status(url, session)
+        record.update(cache="hit" if hit else "miss", bytes=path.stat().st_size)
+
+A span is appended to RUN_REPORT_DIR/<run_id>.jsonl when it ends. Each line has
+its wall time, the bytes it moved and whether it hit a cache, plus whatever the
+caller added. The run id comes from RUN_ID, else GITHUB_RUN_ID (and
+GITHUB_RUN_ATTEMPT). The separate workflow steps (render, upload, publish) of
+one Actions run therefore share a single report. Run this module to aggregate a
+report into <run_id>.summary.json.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+RUN_REPORT_DIR = Path(os.environ.get("RUN_REPORT_DIR", "run_reports"))
+RUN_REPORTS_ENABLED = os.environ.get("RUN_REPORTS", "1") != "0"
+
+# Stages in pipeline order (summaries list them first, then any others)
+STAGES = ("download", "merge", "text_extraction", "filter_graph", "encode", "upload", "container_poll", "publish")
+
+_run_id: Optional[str] = None
+_report_lock = threading.Lock()
+
+
+def get_run_id() -> str:
+    """Id of this run: RUN_ID, GITHUB_RUN_ID[-attempt], else a timestamp and pid."""
+    global _run_id
+    with _report_lock:
+        if _run_id is None:
+            if os.environ.get("RUN_ID"):
+                _run_id = os.environ["RUN_ID"]
+            elif os.environ.get("GITHUB_RUN_ID"):
+                _run_id = f"{os.environ['GITHUB_RUN_ID']}-{os.environ.get('GITHUB_RUN_ATTEMPT', '1')}"
+            else:
+                _run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        return _run_id
+
+
+def run_report_path(run_id: Optional[str] = None) -> Path:
+    return RUN_REPORT_DIR / f"{run_id or get_run_id()}.jsonl"
+
+
+def run_summary_path(run_id: Optional[str] = None) -> Path:
+    return RUN_REPORT_DIR / f"{run_id or get_run_id()}.summary.json"
+
+
+def write_span(record: Dict):
+    """Append one finished span to the run's report (never raises)."""
+    if not RUN_REPORTS_ENABLED:
+        return
+    try:
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        RUN_REPORT_DIR.mkdir(parents=True, exist_ok=True)
+        # One O_APPEND write per line keeps lines whole across threads and workflow steps
+        with _report_lock:
+            fd = os.open(run_report_path(record.get('run_id')), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, line.encode('utf-8'))
+            finally:
+                os.close(fd)
+    except Exception as e:
+        print(f"Could not write run report: {e}")
+
+
+@contextmanager
+def span(stage: str, **attrs):
+    """
+    Time a stage and record it as one span.
+
+    Args:
+        stage: Stage name (see STAGES)
+        **attrs: Fields stored with the span (group_id, url, ...)
+
+    Yields:
+        The span record. Set 'bytes' and 'cache' ("hit"/"miss") on it, and
+        'status' when the stage fails without raising (default "ok"; an
+        exception sets "error")
+    """
+    record = {'run_id': get_run_id(), 'stage': stage, **attrs}
+    started = time.time()
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record['status'] = "error"
+        record['error'] = str(e) or type(e).__name__
+        raise
+    finally:
+        record['seconds'] = round(time.perf_counter() - start, 4)
+        record['started'] = round(started, 3)
+        record['thread'] = threading.current_thread().name
+        record.setdefault('status', "ok")
+        write_span(record)
+
+
+def load_spans(run_id: Optional[str] = None) -> List[Dict]:
+    """All spans of a run, in the order they finished (unreadable lines skipped)."""
+    spans = []
+    try:
+        with open(run_report_path(run_id), 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    spans.append(json.loads(line))
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return spans
+
+
+def summarize_spans(spans: List[Dict]) -> Dict:
+    """
+    Aggregate spans per stage and per group.
+
+    Returns:
+        {'spans', 'wall_seconds', 'stages': {stage: {'count', 'total_seconds', 'mean_seconds',
+        'median_seconds', 'max_seconds', 'bytes', 'cache_hits', 'cache_misses', 'errors'}},
+        'groups': {group_id: {stage: seconds}}}
+    """
+    by_stage: Dict[str, List[Dict]] = {}
+    groups: Dict[str, Dict[str, float]] = {}
+    for record in spans:
+        by_stage.setdefault(record.get('stage', 'unknown'), []).append(record)
+        if record.get('group_id'):
+            stages = groups.setdefault(record['group_id'], {})
+            stages[record['stage']] = round(stages.get(record['stage'], 0) + record.get('seconds', 0), 4)
+
+    order = [stage for stage in STAGES if stage in by_stage] + sorted(set(by_stage) - set(STAGES))
+    stages = {}
+    for stage in order:
+        records = by_stage[stage]
+        seconds = [record.get('seconds', 0) for record in records]
+        stages[stage] = {
+            'count': len(records),
+            'total_seconds': round(sum(seconds), 3),
+            'mean_seconds': round(statistics.mean(seconds), 3),
+            'median_seconds': round(statistics.median(seconds), 3),
+            'max_seconds': round(max(seconds), 3),
+            'bytes': sum(record.get('bytes') or 0 for record in records),
+            'cache_hits': sum(1 for record in records if record.get('cache') == "hit"),
+            'cache_misses': sum(1 for record in records if record.get('cache') == "miss"),
+            'errors': sum(1 for record in records if record.get('status') != "ok"),
+        }
+
+    wall_seconds = 0.0
+    if spans:
+        first = min(record.get('started', 0) for record in spans)
+        last = max(record.get('started', 0) + record.get('seconds', 0) for record in spans)
+        wall_seconds = round(last - first, 3)
+    return {'spans': len(spans), 'wall_seconds': wall_seconds, 'stages': stages, 'groups': groups}
+
+
+def write_run_summary(run_id: Optional[str] = None) -> Optional[Dict]:
+    """Aggregate a run's report into <run_id>.summary.json (atomic write); None if it has no spans."""
+    run_id = run_id or get_run_id()
+    spans = load_spans(run_id)
+    if not spans:
+        return None
+    summary = dict(run_id=run_id, **summarize_spans(spans))
+    try:
+        RUN_REPORT_DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=RUN_REPORT_DIR, prefix=".summary-", suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        os.replace(tmp_path, run_summary_path(run_id))
+    except Exception as e:
+        print(f"Could not save run summary: {e}")
+    return summary
+
+
+def format_summary(summary: Dict) -> str:
+    """Plain-text table of a run summary."""
+    lines = [f"Run {summary['run_id']}: {summary['spans']} spans over {summary['wall_seconds']:.1f}s",
+             f"  {'stage':<16}{'count':>6}{'total s':>10}{'median s':>10}{'max s':>9}{'MB':>10}{'hit/miss':>10}{'errors':>8}"]
+    for stage, stats in summary['stages'].items():
+        lines.append(f"  {stage:<16}{stats['count']:>6}{stats['total_seconds']:>10.2f}{stats['median_seconds']:>10.2f}"
+                     f"{stats['max_seconds']:>9.2f}{stats['bytes'] / 1e6:>10.2f}"
+                     f"{stats['cache_hits']:>5}/{stats['cache_misses']:<4}{stats['errors']:>8}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarize the per-stage timing report of a run')
+    parser.add_argument('--run', type=str, help='Run id (default: this run, see RUN_ID / GITHUB_RUN_ID)')
+    parser.add_argument('--list', action='store_true', help='List the runs that have reports')
+    parser.add_argument('--json', action='store_true', help='Print the summary as JSON')
+    args = parser.parse_args()
+
+    if args.list:
+        for path in sorted(RUN_REPORT_DIR.glob("*.jsonl"), key=lambda p: p.stat().st_mtime):
+            print(path.stem)
+        return
+
+    summary = write_run_summary(args.run)
+    if not summary:
+        print(f"No spans recorded for run {args.run or get_run_id()}")
+        sys.exit(1)
+    print(json.dumps(summary, indent=2) if args.json else format_summary(summary))
+    print(f"\nSummary saved to {run_summary_path(summary['run_id'])}")
+
+
+if __name__ == "__main__":
+    main()
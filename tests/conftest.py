@@ -0,0 +1,41 @@
+import multiprocessing
+import sys
+from pathlib import Path
+
+import pytest
+
+# The modules live flat at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import group_tracker  # noqa: E402
+import run_report  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def isolated_cwd(tmp_path, monkeypatch):
+    """Run every test in its own directory, without writing run reports."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(run_report, "RUN_REPORTS_ENABLED", False)
+    return tmp_path
+
+
+@pytest.fixture
+def tracker(tmp_path, monkeypatch):
+    """group_tracker writing to tmp_path, with no cached state."""
+    monkeypatch.setattr(group_tracker, "PUBLISHED_GROUPS_FILE", tmp_path / "published_groups.json")
+    monkeypatch.setattr(group_tracker, "PUBLISH_JOURNAL_FILE", tmp_path / "published_groups.journal.jsonl")
+    monkeypatch.setattr(group_tracker, "TRACKER_LOCK_FILE", tmp_path / ".published_groups.lock")
+    monkeypatch.setattr(group_tracker, "_state", None)
+    yield group_tracker
+    group_tracker._state = None
+
+
+def run_processes(target, args_list):
+    """Run target(*args) in one forked process per args tuple; fail if any of them fails."""
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=target, args=args) for args in args_list]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+    assert [process.exitcode for process in processes] == [0] * len(processes)
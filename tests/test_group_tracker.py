@@ -0,0 +1,82 @@
+import json
+
+from conftest import run_processes
+
+
+def reload_state(tracker):
+    """State as a fresh process would read it from disk."""
+    tracker._state = None
+    return tracker.load_state()
+
+
+def test_replay_skips_torn_last_line(tracker):
+    tracker.mark_group_published("reciter1_s001_001-003")
+    tracker.mark_group_published("reciter1_s001_004-006")
+    # A crash in the middle of an append leaves half a line behind
+    with open(tracker.PUBLISH_JOURNAL_FILE, "a", encoding="utf-8") as f:
+        f.write('{"op": "publish", "group_id": "reciter1_s0')
+
+    state = reload_state(tracker)
+    assert state['published'] == {"reciter1_s001_001-003", "reciter1_s001_004-006"}
+    assert state['data']['statistics']['total_published'] == 2
+
+    # The next append terminates the torn line instead of merging with it
+    tracker.mark_group_published("reciter1_s001_007-009")
+    state = reload_state(tracker)
+    assert state['published'] == {"reciter1_s001_001-003", "reciter1_s001_004-006", "reciter1_s001_007-009"}
+    assert state['data']['last_published'] == "reciter1_s001_007-009"
+
+
+def test_replay_skips_events_folded_into_snapshot(tracker, monkeypatch):
+    monkeypatch.setattr(tracker, "JOURNAL_COMPACT_EVERY", 1000)
+    for ayah in range(1, 4):
+        tracker.mark_group_published(f"reciter1_s001_{ayah:03d}-{ayah:03d}")
+    journal = tracker.PUBLISH_JOURNAL_FILE.read_text(encoding="utf-8")
+
+    # Crash after the snapshot was written but before the journal was emptied
+    tracker.compact_journal()
+    tracker.PUBLISH_JOURNAL_FILE.write_text(journal, encoding="utf-8")
+
+    state = reload_state(tracker)
+    assert len(state['published']) == 3
+    assert state['data']['statistics']['total_published'] == 3
+    assert state['pending'] == 0
+
+
+def test_compaction_folds_journal_into_snapshot(tracker, monkeypatch):
+    monkeypatch.setattr(tracker, "JOURNAL_COMPACT_EVERY", 3)
+    for ayah in range(1, 8):
+        tracker.mark_group_published(f"reciter1_s002_{ayah:03d}-{ayah:03d}")
+
+    snapshot = json.loads(tracker.PUBLISHED_GROUPS_FILE.read_text(encoding="utf-8"))
+    assert len(snapshot['published_groups']) == 6
+    assert snapshot['journal_seq'] == 6
+    assert len(tracker.read_journal()) == 1
+    assert len(reload_state(tracker)['published']) == 7
+
+
+def publish_many(tracker, worker: int, count: int):
+    tracker._state = None
+    for i in range(count):
+        tracker.mark_group_published(f"reciter{worker}_s001_{i:03d}-{i:03d}")
+
+
+def test_compaction_while_writers_append(tracker, monkeypatch):
+    # Small compaction interval: every worker compacts repeatedly while the others append
+    monkeypatch.setattr(tracker, "JOURNAL_COMPACT_EVERY", 4)
+    workers, count = 4, 15
+    run_processes(publish_many, [(tracker, worker, count) for worker in range(1, workers + 1)])
+
+    state = reload_state(tracker)
+    expected = {f"reciter{worker}_s001_{i:03d}-{i:03d}" for worker in range(1, workers + 1) for i in range(count)}
+    assert state['published'] == expected
+    assert state['data']['statistics']['total_published'] == workers * count
+    assert state['seq'] == workers * count
+
+
+def test_reset_clears_published_groups(tracker):
+    tracker.mark_group_published("reciter1_s001_001-003")
+    tracker.append_event({'op': 'reset'})
+    state = reload_state(tracker)
+    assert state['published'] == set()
+    assert state['data']['statistics']['total_published'] == 0
@@ -0,0 +1,111 @@
+import functools
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from conftest import run_processes
+from media_cache import MediaCache
+
+FILE_SIZE = 1000
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def origin(tmp_path):
+    """HTTP server with 40 files of FILE_SIZE bytes; yields its base URL."""
+    source = tmp_path / "origin"
+    source.mkdir()
+    for i in range(40):
+        (source / f"{i}.bin").write_bytes(bytes([i]) * FILE_SIZE)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=str(source)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def index_files(cache: MediaCache):
+    """(filenames in the index, cached files on disk), re-read from disk."""
+    with cache._index_lock():
+        indexed = {entry['filename'] for entry in cache._load_index().values()}
+    on_disk = {path.name for path in cache.cache_dir.glob("*.bin")}
+    return indexed, on_disk
+
+
+def fetch_range(cache_dir, max_bytes, base_url, first, count, verify=True):
+    cache = MediaCache(cache_dir, max_bytes, suffix=".bin")
+    session = requests.Session()
+    for i in (n % 40 for n in range(first, first + count)):
+        path = cache.fetch(f"{base_url}/{i}.bin", session)
+        if verify:
+            assert path.read_bytes() == bytes([i]) * FILE_SIZE
+
+
+def test_fetch_hit_and_miss(tmp_path, origin):
+    cache = MediaCache(tmp_path / "cache", 10 * FILE_SIZE, suffix=".bin")
+    session = requests.Session()
+    path, hit = cache.fetch_with_status(f"{origin}/1.bin", session)
+    assert not hit and path.read_bytes() == bytes([1]) * FILE_SIZE
+    assert cache.fetch_with_status(f"{origin}/1.bin", session) == (path, True)
+
+
+def test_processes_share_the_index(tmp_path, origin):
+    cache_dir = tmp_path / "cache"
+    # Each process adds its own 10 files and 5 that the next process also fetches
+    run_processes(fetch_range, [(cache_dir, 100 * FILE_SIZE, origin, worker * 10, 15) for worker in range(4)])
+
+    cache = MediaCache(cache_dir, 100 * FILE_SIZE, suffix=".bin")
+    indexed, on_disk = index_files(cache)
+    assert len(indexed) == 40
+    assert indexed == on_disk
+
+
+def test_eviction_across_processes_stays_in_budget(tmp_path, origin):
+    cache_dir = tmp_path / "cache"
+    budget = 8 * FILE_SIZE
+    # Pins are per process, so another process may evict a file before it is read back
+    run_processes(fetch_range, [(cache_dir, budget, origin, worker * 10, 10, False) for worker in range(4)])
+
+    cache = MediaCache(cache_dir, budget, suffix=".bin")
+    indexed, on_disk = index_files(cache)
+    assert cache.total_bytes() <= budget
+    assert indexed == on_disk
+
+
+def test_eviction_order_lru(tmp_path, origin):
+    cache = MediaCache(tmp_path / "cache", 3 * FILE_SIZE, suffix=".bin")
+    session = requests.Session()
+    for i in range(3):
+        cache.fetch(f"{origin}/{i}.bin", session)
+    cache.get(f"{origin}/0.bin", session)
+    cache.fetch(f"{origin}/3.bin", session)
+    assert cache.get(f"{origin}/1.bin") is None
+    assert cache.get(f"{origin}/0.bin") is not None
+
+
+def test_pinned_entries_survive_eviction(tmp_path, origin):
+    cache = MediaCache(tmp_path / "cache", FILE_SIZE, suffix=".bin")
+    session = requests.Session()
+    with cache.pinned([f"{origin}/0.bin"]):
+        first = cache.fetch(f"{origin}/0.bin", session)
+        # Over budget with everything older pinned: the new file is still returned intact
+        second = cache.fetch(f"{origin}/1.bin", session)
+        assert first.exists() and second.exists()
+    cache.evict()
+    assert cache.total_bytes() <= FILE_SIZE
+
+
+def test_put_adds_local_files(tmp_path):
+    cache = MediaCache(tmp_path / "cache", 10 * FILE_SIZE, suffix=".bin")
+    source = tmp_path / "cache" / ".render.bin"
+    source.parent.mkdir()
+    source.write_bytes(b"x" * 10)
+    path = cache.put("text:abc", source)
+    assert not source.exists()
+    assert cache.get("text:abc") == path
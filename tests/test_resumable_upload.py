@@ -0,0 +1,119 @@
+import os
+
+import pytest
+import requests
+
+import upload_to_cdn
+from local_server import parse_range, start_local_server
+from upload_to_cdn import ResumableUploader
+
+CHUNK = 1000
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(os.urandom(3 * CHUNK + 500))
+    return path
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = start_local_server(port=0, directory=tmp_path / "uploads", static_dir=tmp_path)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(upload_to_cdn.time, "sleep", lambda seconds: None)
+
+
+def create_upload(base_url, size, name="video.mp4"):
+    response = requests.post(f"{base_url}/uploads", params={'name': name, 'size': size})
+    assert response.status_code == 201
+    return f"{base_url}/uploads/{response.json()['upload_id']}"
+
+
+def put_chunk(upload_url, data, start, size):
+    return requests.put(upload_url, data=data, headers={'Content-Range': f"bytes {start}-{start + len(data) - 1}/{size}"})
+
+
+def test_upload_in_chunks(server, video):
+    url = ResumableUploader(server.base_url, chunk_bytes=CHUNK).upload(video)
+    assert url == f"{server.base_url}/files/video.mp4"
+    assert requests.get(url).content == video.read_bytes()
+
+
+def test_upload_resumes_after_a_dropped_chunk(server, video, monkeypatch):
+    uploader = ResumableUploader(server.base_url, chunk_bytes=CHUNK)
+    put = uploader.session.put
+    calls = []
+
+    def flaky_put(*args, **kwargs):
+        calls.append(kwargs['headers']['Content-Range'])
+        if len(calls) == 2:
+            raise requests.ConnectionError("connection reset")
+        return put(*args, **kwargs)
+
+    monkeypatch.setattr(uploader.session, "put", flaky_put)
+    url = uploader.upload(video)
+    assert requests.get(url).content == video.read_bytes()
+    # The failed chunk is sent again from the server's offset, nothing earlier
+    assert calls[1] == calls[2] == f"bytes {CHUNK}-{2 * CHUNK - 1}/{video.stat().st_size}"
+    assert len(calls) == 5
+
+
+def test_out_of_order_chunk_gets_the_offset(server, video):
+    data = video.read_bytes()
+    upload_url = create_upload(server.base_url, len(data))
+    assert put_chunk(upload_url, data[:CHUNK], 0, len(data)).json() == {'offset': CHUNK}
+
+    response = put_chunk(upload_url, data[2 * CHUNK:3 * CHUNK], 2 * CHUNK, len(data))
+    assert response.status_code == 409
+    assert response.json() == {'offset': CHUNK}
+
+
+def test_mismatched_content_range_is_rejected(server, video):
+    data = video.read_bytes()
+    upload_url = create_upload(server.base_url, len(data))
+    assert put_chunk(upload_url, data[:CHUNK], 0, len(data) + 1).status_code == 400
+    response = requests.put(upload_url, data=data[:CHUNK])
+    assert response.status_code == 400
+
+
+def test_upload_resumes_after_server_restart(tmp_path, server, video):
+    data = video.read_bytes()
+    upload_url = create_upload(server.base_url, len(data))
+    put_chunk(upload_url, data[:CHUNK], 0, len(data))
+    server.shutdown()
+    server.server_close()
+
+    restarted = start_local_server(port=0, directory=tmp_path / "uploads", static_dir=tmp_path)
+    try:
+        upload_url = upload_url.replace(server.base_url, restarted.base_url)
+        assert requests.get(upload_url).json() == {'offset': CHUNK, 'size': len(data)}
+        response = put_chunk(upload_url, data[CHUNK:], CHUNK, len(data))
+        assert response.status_code == 201
+        assert requests.get(response.json()['url']).content == data
+    finally:
+        restarted.shutdown()
+        restarted.server_close()
+
+
+def test_range_requests(server, video):
+    url = ResumableUploader(server.base_url, chunk_bytes=CHUNK).upload(video)
+    response = requests.get(url, headers={'Range': "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.headers['Content-Range'] == f"bytes 10-19/{video.stat().st_size}"
+    assert response.content == video.read_bytes()[10:20]
+
+
+def test_parse_range():
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    with pytest.raises(ValueError):
+        parse_range("bytes=100-", 100)
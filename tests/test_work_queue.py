@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+import work_queue
+from work_queue import WorkQueue
+
+
+@pytest.fixture
+def db_path(tmp_path, tracker):
+    return tmp_path / "work_queue.sqlite3"
+
+
+def test_two_claims_on_the_same_group(db_path):
+    first = WorkQueue(db_path).claim("worker-a", candidates=["reciter1_s001_001-003"])
+    second = WorkQueue(db_path).claim("worker-b", candidates=["reciter1_s001_001-003"])
+    assert first['group_id'] == "reciter1_s001_001-003"
+    assert second is None
+
+
+def test_claim_skips_held_groups(db_path):
+    candidates = ["reciter1_s001_001-003", "reciter1_s001_004-006"]
+    first = WorkQueue(db_path).claim("worker-a", candidates=candidates)
+    second = WorkQueue(db_path).claim("worker-b", candidates=candidates)
+    assert (first['group_id'], second['group_id']) == tuple(candidates)
+
+
+def test_concurrent_claims_never_share_a_group(db_path):
+    candidates = [f"reciter1_s001_{i:03d}-{i:03d}" for i in range(1, 4)]
+    leases = []
+    barrier = threading.Barrier(8)
+
+    def claim(worker):
+        queue = WorkQueue(db_path)
+        barrier.wait()
+        leases.append(queue.claim(worker, candidates=candidates))
+
+    threads = [threading.Thread(target=claim, args=(f"worker-{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    claimed = [lease['group_id'] for lease in leases if lease]
+    assert sorted(claimed) == candidates
+    assert leases.count(None) == 5
+
+
+def test_claim_after_expiry(db_path, monkeypatch):
+    queue = WorkQueue(db_path)
+    stale = queue.claim("worker-a", ttl=60, candidates=["reciter1_s001_001-003"])
+    assert queue.claim("worker-b", ttl=60, candidates=["reciter1_s001_001-003"]) is None
+
+    now = time.time()
+    monkeypatch.setattr(work_queue.time, "time", lambda: now + 61)
+    fresh = queue.claim("worker-b", ttl=60, candidates=["reciter1_s001_001-003"])
+    assert fresh['group_id'] == "reciter1_s001_001-003"
+    assert fresh['token'] != stale['token']
+
+    # The expired holder can no longer touch the group
+    assert not queue.heartbeat(stale['group_id'], stale['token'])
+    assert not queue.release(stale['group_id'], stale['token'])
+    assert not queue.complete(stale['group_id'], stale['token'])
+    assert queue.complete(fresh['group_id'], fresh['token'])
+
+
+def test_heartbeat_keeps_the_lease(db_path, monkeypatch):
+    queue = WorkQueue(db_path)
+    lease = queue.claim("worker-a", ttl=60, candidates=["reciter1_s001_001-003"])
+    now = time.time()
+    monkeypatch.setattr(work_queue.time, "time", lambda: now + 50)
+    assert queue.heartbeat(lease['group_id'], lease['token'], ttl=60)
+    monkeypatch.setattr(work_queue.time, "time", lambda: now + 100)
+    assert queue.claim("worker-b", candidates=["reciter1_s001_001-003"]) is None
+
+
+def test_complete_marks_published_and_frees_the_lease(db_path, tracker):
+    queue = WorkQueue(db_path)
+    lease = queue.claim("worker-a", candidates=["reciter1_s001_001-003"])
+    assert queue.complete(lease['group_id'], lease['token'])
+    assert "reciter1_s001_001-003" in tracker.load_state()['published']
+    assert queue.active_leases() == []
+    # Published groups are not handed out again
+    assert queue.claim("worker-b", candidates=["reciter1_s001_001-003"]) is None
+
+
+def test_release_makes_the_group_claimable(db_path):
+    queue = WorkQueue(db_path)
+    lease = queue.claim("worker-a", candidates=["reciter1_s001_001-003"])
+    assert queue.release(lease['group_id'], lease['token'])
+    assert queue.claim("worker-b", candidates=["reciter1_s001_001-003"])['worker'] == "worker-b"
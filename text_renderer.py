@@ -0,0 +1,180 @@
+"""
+Shape, reorder and rasterize overlay text with Pillow.
+Arabic is shaped with arabic-reshaper and reordered with python-bidi before
+drawing, and each rendered segment is stored as a transparent PNG in a
+content-hashed cache keyed by (text, font, size, colors, alignment), so
+repeated lines such as the surah header are rendered once and reused across
+videos. The cache is a size-bounded MediaCache (TEXT_CACHE_MAX_MB).
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional
+
+from media_cache import CACHE_DIR, MediaCache
+
+TEXT_CACHE_DIR = CACHE_DIR / "text"
+TEXT_CACHE_MAX_MB = int(os.environ.get("TEXT_CACHE_MAX_MB", "256"))
+TEXT_CACHE = MediaCache(TEXT_CACHE_DIR, max_bytes=TEXT_CACHE_MAX_MB * 1024 * 1024, suffix=".png")
+
+# Bump when the drawing code changes so stale renders are not reused
+RENDER_VERSION = 1
+
+# Extra transparent padding around the glyphs (pixels)
+PADDING = 4
+
+
+def contains_arabic(text: str) -> bool:
+    """Check whether text contains Arabic script characters."""
+    return any('\u0600' <= ch <= '\u06ff' or '\u0750' <= ch <= '\u077f' or '\ufb50' <= ch <= '\ufeff' for ch in text)
+
+
+@lru_cache(maxsize=1)
+def get_reshaper():
+    """Arabic reshaper that keeps diacritics and skips word ligatures most fonts lack."""
+    import arabic_reshaper
+    return arabic_reshaper.ArabicReshaper(configuration={
+        'delete_harakat': False,
+        'ARABIC LIGATURE ALLAH': False,
+        'ARABIC LIGATURE SALLALLAHOU ALAYHE WASALLAM': False,
+    })
+
+
+def shape_line(line: str) -> str:
+    """Shape and reorder a single line for left-to-right drawing."""
+    if not contains_arabic(line):
+        return line
+    from bidi.algorithm import get_display
+    return get_display(get_reshaper().reshape(line))
+
+
+@lru_cache(maxsize=32)
+def load_font(font_path: str, font_size: int):
+    """Load a font without Pillow's own shaping (text is pre-shaped)."""
+    from PIL import ImageFont
+    return ImageFont.truetype(font_path, font_size, layout_engine=ImageFont.Layout.BASIC)
+
+
+def wrap_to_width(text: str, font, max_width: Optional[int], stroke_width: int) -> List[str]:
+    """Greedy word wrap on logical text, measuring shaped line widths."""
+    lines = []
+    for paragraph in text.split('\n'):
+        words = paragraph.split()
+        if not words or not max_width:
+            lines.append(paragraph)
+            continue
+
+        current = words[0]
+        for word in words[1:]:
+            candidate = f"{current} {word}"
+            if font.getlength(shape_line(candidate)) + 2 * stroke_width <= max_width:
+                current = candidate
+            else:
+                lines.append(current)
+                current = word
+        lines.append(current)
+    return lines
+
+
+def text_cache_key(
+    text: str,
+    font_path: str,
+    font_size: int,
+    color: str,
+    alpha: float,
+    border_color: str,
+    border_width: int,
+    max_width: Optional[int],
+    align: str = 'center'
+) -> str:
+    """Content hash identifying one rendered text image."""
+    payload = json.dumps(
+        [RENDER_VERSION, text, font_path, font_size, color, alpha, border_color, border_width, max_width, align],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+def render_text_image(
+    text: str,
+    font_path: str,
+    font_size: int,
+    color: str = 'white',
+    alpha: float = 1.0,
+    border_color: str = 'black',
+    border_width: int = 2,
+    max_width: Optional[int] = None,
+    align: str = 'center'
+) -> Optional[Path]:
+    """
+    Render text to a tightly cropped transparent PNG.
+
+    Args:
+        text: Text in logical order (Arabic is shaped and reordered here)
+        font_path: Font file path
+        font_size: Font size in pixels
+        color: Fill color name or #hex
+        alpha: Fill opacity (0-1)
+        border_color: Outline color name or #hex
+        border_width: Outline width in pixels
+        max_width: Wrap lines to this pixel width (None to disable)
+        align: Line alignment within the image ('left', 'center', 'right')
+
+    Returns:
+        Path to the cached PNG, or None on failure
+    """
+    source = f"text:{text_cache_key(text, font_path, font_size, color, alpha, border_color, border_width, max_width, align)}"
+    cached = TEXT_CACHE.get(source)
+    if cached:
+        return cached
+
+    try:
+        from PIL import Image, ImageColor, ImageDraw
+
+        font = load_font(font_path, font_size)
+        lines = [shape_line(line) for line in wrap_to_width(text, font, max_width, border_width)]
+
+        ascent, descent = font.getmetrics()
+        line_height = ascent + descent + 2 * border_width
+        line_widths = [int(font.getlength(line)) + 2 * border_width for line in lines]
+        width = max(line_widths + [1]) + 2 * PADDING
+        height = line_height * len(lines) + 2 * PADDING
+
+        fill = ImageColor.getrgb(color)[:3] + (round(alpha * 255),)
+        stroke = ImageColor.getrgb(border_color)[:3] + (255,)
+
+        image = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(image)
+        for i, (line, line_width) in enumerate(zip(lines, line_widths)):
+            if align == 'left':
+                x = PADDING
+            elif align == 'right':
+                x = width - PADDING - line_width
+            else:
+                x = (width - line_width) // 2
+            y = PADDING + i * line_height
+            draw.text(
+                (x + border_width, y + border_width), line, font=font, fill=fill,
+                stroke_width=border_width, stroke_fill=stroke
+            )
+
+        TEXT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=TEXT_CACHE_DIR, prefix=".render-", suffix=".png")
+        os.close(fd)
+        try:
+            image.save(tmp_path, format='PNG')
+            return TEXT_CACHE.put(source, tmp_path)
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+    except Exception as e:
+        print(f"Error rendering text {text[:30]!r}: {e}")
+        return None
+
@@ -5,75 +5,398 @@ Supports multiple services:
 - file.io (free, 1 download only, expires in 14 days)
 - tmpfiles.org (free, temporary)
 - 0x0.st (free, temporary)
+- resumable: any host speaking the chunked Content-Range protocol of
+  local_server.py (RESUMABLE_UPLOAD_URL, default a local_server.py on this machine)
+- static: no upload at all; the video is served from generated_videos by a
+  host such as local_server.py (STATIC_HOST_URL) as soon as it is readable
+
+Every service is an Uploader with its own timeouts. Multipart bodies are
+streamed from disk instead of being read into memory, resumable uploads
+send fixed-size chunks and continue from the server's offset after a
+dropped connection, and upload_video races two services and keeps the
+first URL.
 """
 
+import os
 import sys
+import json
+import time
+import uuid
+import shutil
 import argparse
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from urllib.parse import quote
 
+from run_report import span
 
-def upload_to_fileio(video_path):
+# (connect, read) timeouts in seconds per service; override with UPLOAD_TIMEOUTS='{"0x0": [5, 120]}'
+UPLOAD_TIMEOUTS = {
+    'fileio': (10, 300),
+    '0x0': (10, 300),
+    'tmpfiles': (10, 300),
+    'resumable': (5, 60),
+    'static': (5, 60),
+}
+
+# Services tried in this order after the requested one (the first of them races it)
+UPLOAD_FALLBACK_ORDER = ('0x0', 'tmpfiles', 'fileio')
+# Race the requested service against the next one in parallel (0 = one at a time)
+UPLOAD_RACE = os.environ.get("UPLOAD_RACE", "1") == "1"
+
+RESUMABLE_UPLOAD_URL = os.environ.get("RESUMABLE_UPLOAD_URL", "http://127.0.0.1:8080")
+UPLOAD_CHUNK_BYTES = int(os.environ.get("UPLOAD_CHUNK_MB", "8")) * 1024 * 1024
+# Consecutive failed attempts on one chunk before giving up
+UPLOAD_CHUNK_RETRIES = int(os.environ.get("UPLOAD_CHUNK_RETRIES", "5"))
+
+# Host serving STATIC_HOST_DIR under /videos/ (local_server.py, or a tunnel to it)
+STATIC_HOST_URL = os.environ.get("STATIC_HOST_URL", "http://127.0.0.1:8080")
+STATIC_HOST_DIR = Path(os.environ.get("STATIC_HOST_DIR", "generated_videos"))
+# Seconds between readiness checks of a published URL
+SERVABLE_POLL_INTERVAL = float(os.environ.get("SERVABLE_POLL_INTERVAL", "0.5"))
+
+STREAM_BUFFER = 1024 * 1024
+
+
+class UploadCancelled(Exception):
+    """Another upload in the race already succeeded."""
+
+
+def load_upload_timeouts():
+    """UPLOAD_TIMEOUTS overridden by the UPLOAD_TIMEOUTS environment variable (JSON)."""
+    timeouts = dict(UPLOAD_TIMEOUTS)
+    raw = os.environ.get("UPLOAD_TIMEOUTS", "").strip()
+    if raw:
+        try:
+            for name, value in json.loads(raw).items():
+                timeouts[name] = tuple(value) if isinstance(value, list) else (10, float(value))
+        except Exception as e:
+            print(f"⚠️  Could not read UPLOAD_TIMEOUTS ({e}), using defaults")
+    return timeouts
+
+
+class MultipartStream:
     """
-    Upload to file.io (free, simple, 1-download limit).
-    Returns: Public URL or None
+    multipart/form-data body read from disk piece by piece.
+
+    Has a length, so requests sends Content-Length instead of chunked
+    encoding. Raises UploadCancelled from read() once cancel is set, which
+    aborts the request mid-body.
     """
-    try:
-        print("📤 Uploading to file.io...")
-        
-        with open(video_path, 'rb') as f:
-            files = {'file': f}
-            response = requests.post(
-                'https://file.io',
-                files=files,
-                data={'expires': '1d'}  # Expire in 1 day
-            )
-        
-        response.raise_for_status()
+
+    def __init__(self, video_path, field='file', data=None, cancel=None):
+        self.boundary = uuid.uuid4().hex
+        self.path = Path(video_path)
+        self.cancel = cancel
+        head = b''
+        for name, value in (data or {}).items():
+            head += (f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n').encode('utf-8')
+        head += (f'--{self.boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{self.path.name}"\r\n'
+                 f'Content-Type: video/mp4\r\n\r\n').encode('utf-8')
+        self.parts = [head, None, f'\r\n--{self.boundary}--\r\n'.encode('utf-8')]
+        self.length = len(head) + self.path.stat().st_size + len(self.parts[2])
+        self.file = None
+        self.part = 0
+        self.part_offset = 0
+
+    @property
+    def content_type(self):
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def __len__(self):
+        return self.length
+
+    def read(self, size=-1):
+        if self.cancel is not None and self.cancel.is_set():
+            raise UploadCancelled()
+        size = STREAM_BUFFER if size is None or size < 0 else size
+        while self.part < len(self.parts):
+            if self.parts[self.part] is None:
+                if self.file is None:
+                    self.file = open(self.path, 'rb')
+                chunk = self.file.read(size)
+                if chunk:
+                    return chunk
+                self.file.close()
+            else:
+                chunk = self.parts[self.part][self.part_offset:self.part_offset + size]
+                if chunk:
+                    self.part_offset += len(chunk)
+                    return chunk
+            self.part += 1
+            self.part_offset = 0
+        return b''
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def wait_until_servable(url, size=None, timeout=60, interval=SERVABLE_POLL_INTERVAL, cancel=None):
+    """
+    Poll a URL with HEAD until it serves the video.
+
+    Ready means HTTP 200, a video/* Content-Type and (when size is given) the
+    expected Content-Length, so a stale previous deploy does not count.
+
+    Returns:
+        Seconds it took, or None on timeout
+    """
+    start = time.monotonic()
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            response = requests.head(url, allow_redirects=True, timeout=10)
+            content_type = response.headers.get('Content-Type', '')
+            length = response.headers.get('Content-Length')
+            if response.status_code == 200 and content_type.startswith('video/') and (size is None or length == str(size)):
+                elapsed = time.monotonic() - start
+                print(f"✅ {url} servable after {elapsed:.1f}s ({attempt} checks)")
+                return elapsed
+        except requests.RequestException:
+            pass
+        if time.monotonic() - start + interval > timeout or (cancel is not None and cancel.is_set()):
+            print(f"❌ {url} not servable after {time.monotonic() - start:.1f}s")
+            return None
+        time.sleep(interval)
+
+
+class Uploader:
+    """An upload service: upload(video_path, cancel) returns a public URL or None."""
+
+    name = ''
+    label = ''
+    # Worth starting a second service in parallel (False for hosts that need no transfer)
+    races = True
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout or load_upload_timeouts().get(self.name, (10, 300))
+
+    def upload(self, video_path, cancel=None):
+        raise NotImplementedError
+
+
+class MultipartUploader(Uploader):
+    """Single streamed multipart POST (file.io, 0x0.st, tmpfiles.org)."""
+
+    url = ''
+    form_data = None
+
+    def parse_response(self, response):
+        """Public URL from the service's response, or None."""
+        raise NotImplementedError
+
+    def upload(self, video_path, cancel=None):
+        try:
+            print(f"📤 Uploading to {self.label}...")
+            body = MultipartStream(video_path, data=self.form_data, cancel=cancel)
+            try:
+                response = requests.post(self.url, data=body, headers={'Content-Type': body.content_type},
+                                         timeout=self.timeout)
+            finally:
+                body.close()
+            response.raise_for_status()
+            url = self.parse_response(response)
+            if url:
+                print(f"✅ Uploaded to {self.label}: {url}")
+            return url
+        except Exception as e:
+            if cancel is not None and cancel.is_set():
+                print(f"⏹  {self.label} upload cancelled")
+            else:
+                print(f"❌ {self.label} upload error: {e}")
+            return None
+
+
+class FileIOUploader(MultipartUploader):
+    """file.io (free, simple, 1-download limit)."""
+
+    name = 'fileio'
+    label = 'file.io'
+    url = 'https://file.io'
+    form_data = {'expires': '1d'}  # Expire in 1 day
+
+    def parse_response(self, response):
         data = response.json()
-        
         if data.get('success'):
-            url = data.get('link')
-            print(f"✅ Uploaded to file.io: {url}")
             print("⚠️  Note: This link expires after 1 download or 1 day")
+            return data.get('link')
+        print(f"❌ file.io upload failed: {data}")
+        return None
+
+
+class ZeroXZeroUploader(MultipartUploader):
+    """0x0.st (free, longer retention)."""
+
+    name = '0x0'
+    label = '0x0.st'
+    url = 'https://0x0.st'
+
+    def parse_response(self, response):
+        url = response.text.strip()
+        if url.startswith('http'):
             return url
-        else:
-            print(f"❌ file.io upload failed: {data}")
-            return None
-            
-    except Exception as e:
-        print(f"❌ file.io upload error: {e}")
+        print(f"❌ 0x0.st upload failed: {url}")
         return None
 
 
-def upload_to_0x0(video_path):
+class TmpfilesUploader(MultipartUploader):
+    """tmpfiles.org (free temporary hosting)."""
+
+    name = 'tmpfiles'
+    label = 'tmpfiles.org'
+    url = 'https://tmpfiles.org/api/v1/upload'
+
+    def parse_response(self, response):
+        data = response.json()
+        if data.get('status') != 'success':
+            print(f"❌ tmpfiles.org upload failed: {data}")
+            return None
+        # tmpfiles.org returns URL like https://tmpfiles.org/123456
+        # But actual file is at https://tmpfiles.org/dl/123456
+        url = data['data']['url']
+        if '/dl/' not in url:
+            url = url.replace('tmpfiles.org/', 'tmpfiles.org/dl/')
+        return url
+
+
+class ResumableUploader(Uploader):
     """
-    Upload to 0x0.st (free, longer retention).
-    Returns: Public URL or None
+    Chunked, resumable upload (protocol documented in local_server.py).
+
+    Each chunk is a PUT with Content-Range. After a failed chunk the server
+    is asked for its offset and the upload continues from there, so a
+    dropped connection costs at most one chunk.
     """
-    try:
-        print("📤 Uploading to 0x0.st...")
-        
-        with open(video_path, 'rb') as f:
-            files = {'file': f}
-            response = requests.post(
-                'https://0x0.st',
-                files=files
-            )
-        
+
+    name = 'resumable'
+    label = 'resumable host'
+
+    def __init__(self, base_url=None, chunk_bytes=UPLOAD_CHUNK_BYTES, timeout=None):
+        super().__init__(timeout)
+        self.base_url = (base_url or RESUMABLE_UPLOAD_URL).rstrip('/')
+        self.chunk_bytes = chunk_bytes
+        self.session = requests.Session()
+
+    def server_offset(self, upload_url):
+        response = self.session.get(upload_url, timeout=self.timeout)
         response.raise_for_status()
-        url = response.text.strip()
-        
-        if url.startswith('http'):
-            print(f"✅ Uploaded to 0x0.st: {url}")
+        return response.json()['offset']
+
+    def upload(self, video_path, cancel=None):
+        video_file = Path(video_path)
+        size = video_file.stat().st_size
+        try:
+            print(f"📤 Uploading to {self.base_url} in {max(1, -(-size // self.chunk_bytes))} chunks...")
+            response = self.session.post(f"{self.base_url}/uploads", params={'name': video_file.name, 'size': size},
+                                         timeout=self.timeout)
+            response.raise_for_status()
+            upload_url = f"{self.base_url}/uploads/{response.json()['upload_id']}"
+        except Exception as e:
+            print(f"❌ {self.label} upload error: {e}")
+            return None
+
+        offset, failures = 0, 0
+        with open(video_file, 'rb') as f:
+            while True:
+                if cancel is not None and cancel.is_set():
+                    print(f"⏹  {self.label} upload cancelled at {offset}/{size} bytes")
+                    return None
+                f.seek(offset)
+                chunk = f.read(self.chunk_bytes)
+                end = offset + len(chunk) - 1
+                try:
+                    response = self.session.put(upload_url, data=chunk, timeout=self.timeout,
+                                                headers={'Content-Range': f"bytes {offset}-{end}/{size}"})
+                    if response.status_code == 409:
+                        offset = response.json()['offset']
+                        continue
+                    response.raise_for_status()
+                    data = response.json()
+                except Exception as e:
+                    failures += 1
+                    if failures > UPLOAD_CHUNK_RETRIES:
+                        print(f"❌ {self.label} upload failed at {offset}/{size} bytes: {e}")
+                        return None
+                    print(f"⚠️  Chunk at {offset} failed ({e}), resuming (attempt {failures}/{UPLOAD_CHUNK_RETRIES})")
+                    time.sleep(min(30, 2 ** failures))
+                    try:
+                        offset = self.server_offset(upload_url)
+                    except Exception:
+                        pass
+                    continue
+                failures = 0
+                offset = data['offset']
+                if data.get('url'):
+                    print(f"✅ Uploaded to {self.label}: {data['url']}")
+                    return data['url']
+
+
+class StaticHostUploader(Uploader):
+    """
+    Serve the video in place from a static host (stand-in for the GitHub Pages hop).
+
+    Videos outside STATIC_HOST_DIR are copied in first. The URL is returned
+    the moment the host serves the complete file; there is no fixed wait.
+    """
+
+    name = 'static'
+    label = 'static host'
+    races = False
+
+    def __init__(self, base_url=None, directory=None, timeout=None):
+        super().__init__(timeout)
+        self.base_url = (base_url or STATIC_HOST_URL).rstrip('/')
+        self.directory = Path(directory or STATIC_HOST_DIR)
+
+    def upload(self, video_path, cancel=None):
+        video_file = Path(video_path)
+        try:
+            target = self.directory / video_file.name
+            if not target.exists() or not os.path.samefile(video_file, target):
+                self.directory.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(video_file, target)
+            url = f"{self.base_url}/videos/{quote(video_file.name)}"
+            print(f"📤 Serving from {self.label}: {url}")
+            if wait_until_servable(url, target.stat().st_size, timeout=self.timeout[1], cancel=cancel) is None:
+                return None
             return url
-        else:
-            print(f"❌ 0x0.st upload failed: {url}")
+        except Exception as e:
+            print(f"❌ {self.label} error: {e}")
             return None
-            
-    except Exception as e:
-        print(f"❌ 0x0.st upload error: {e}")
-        return None
+
+
+UPLOADERS = {
+    'fileio': FileIOUploader,
+    '0x0': ZeroXZeroUploader,
+    'tmpfiles': TmpfilesUploader,
+    'resumable': ResumableUploader,
+    'static': StaticHostUploader,
+}
+
+
+def get_uploader(service):
+    """Uploader instance for a service name (unknown names fall back to file.io)."""
+    return UPLOADERS.get(service.lower(), FileIOUploader)()
+
+
+def upload_to_fileio(video_path):
+    """
+    Upload to file.io (free, simple, 1-download limit).
+    Returns: Public URL or None
+    """
+    return FileIOUploader().upload(video_path)
+
+
+def upload_to_0x0(video_path):
+    """
+    Upload to 0x0.st (free, longer retention).
+    Returns: Public URL or None
+    """
+    return ZeroXZeroUploader().upload(video_path)
 
 
 def upload_to_tmpfiles(video_path):
@@ -81,45 +404,42 @@ def upload_to_tmpfiles(video_path):
     Upload to tmpfiles.org (free temporary hosting).
     Returns: Public URL or None
     """
+    return TmpfilesUploader().upload(video_path)
+
+
+def race_uploads(video_path, services):
+    """
+    Upload to several services at once and keep the first URL.
+
+    The slower uploads are cancelled (multipart bodies stop streaming,
+    resumable uploads stop before the next chunk).
+
+    Returns:
+        (service, url) of the winner, or (None, None) if all failed
+    """
+    cancel = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=len(services), thread_name_prefix="upload")
     try:
-        print("📤 Uploading to tmpfiles.org...")
-        
-        with open(video_path, 'rb') as f:
-            files = {'file': f}
-            response = requests.post(
-                'https://tmpfiles.org/api/v1/upload',
-                files=files
-            )
-        
-        response.raise_for_status()
-        data = response.json()
-        
-        if data.get('status') == 'success':
-            # tmpfiles.org returns URL like https://tmpfiles.org/123456
-            # But actual file is at https://tmpfiles.org/dl/123456
-            url = data['data']['url']
-            # Convert to direct download URL
-            if '/dl/' not in url:
-                url = url.replace('tmpfiles.org/', 'tmpfiles.org/dl/')
-            
-            print(f"✅ Uploaded to tmpfiles.org: {url}")
-            return url
-        else:
-            print(f"❌ tmpfiles.org upload failed: {data}")
-            return None
-            
-    except Exception as e:
-        print(f"❌ tmpfiles.org upload error: {e}")
-        return None
+        futures = {executor.submit(get_uploader(service).upload, video_path, cancel): service for service in services}
+        for future in as_completed(futures):
+            url = future.result()
+            if url:
+                cancel.set()
+                return futures[future], url
+        return None, None
+    finally:
+        # Do not wait for the losers; they stop at their next read or chunk
+        executor.shutdown(wait=False)
 
 
-def upload_video(video_path, service='fileio'):
+def upload_video(video_path, service='fileio', race=UPLOAD_RACE):
     """
     Upload video to temporary CDN service.
     
     Args:
         video_path: Path to video file
-        service: Service to use ('fileio', '0x0', 'tmpfiles')
+        service: Service to use ('fileio', '0x0', 'tmpfiles', 'resumable', 'static')
+        race: Also start the first fallback service in parallel and keep whichever finishes first
     
     Returns:
         str: Public URL or None if failed
@@ -134,28 +454,28 @@ def upload_video(video_path, service='fileio'):
     print(f"📹 Video: {video_file.name}")
     print(f"📏 Size: {file_size_mb:.2f} MB")
     
-    if file_size_mb > 100:
-        print("⚠️  Warning: File is quite large. Upload may be slow or fail.")
-    
-    # Try selected service
-    services = {
-        'fileio': upload_to_fileio,
-        '0x0': upload_to_0x0,
-        'tmpfiles': upload_to_tmpfiles
-    }
+    service = service.lower() if service.lower() in UPLOADERS else 'fileio'
+    order = [service] + [name for name in UPLOAD_FALLBACK_ORDER if name != service]
+    first = order[:2] if race and UPLOADERS[service].races else order[:1]
     
-    upload_func = services.get(service.lower(), upload_to_fileio)
-    url = upload_func(video_path)
-    
-    # If primary service fails, try fallback
-    if not url:
-        print("⚠️  Primary service failed, trying fallback...")
-        for fallback_service, fallback_func in services.items():
-            if fallback_service != service.lower():
-                url = fallback_func(video_path)
+    with span("upload", video=video_file.name, bytes=video_file.stat().st_size, services=first) as record:
+        start = time.monotonic()
+        winner, url = race_uploads(video_path, first) if len(first) > 1 else (first[0], get_uploader(first[0]).upload(video_path))
+        
+        # If the first attempt fails, try the remaining services one by one
+        if not url:
+            print("⚠️  Primary service failed, trying fallback...")
+            for fallback_service in order[len(first):]:
+                url = get_uploader(fallback_service).upload(video_path)
                 if url:
+                    winner = fallback_service
                     break
-    
+        
+        if url:
+            print(f"⏱  Upload via {winner} took {time.monotonic() - start:.1f}s")
+            record.update(service=winner, url=url)
+        else:
+            record['status'] = "failed"
     return url
 
 
@@ -165,19 +485,46 @@ def main():
     )
     parser.add_argument(
         '--video',
-        required=True,
         help='Path to video file'
     )
     parser.add_argument(
         '--service',
         default='0x0',
-        choices=['fileio', '0x0', 'tmpfiles'],
+        choices=sorted(UPLOADERS),
         help='CDN service to use (default: 0x0)'
     )
+    parser.add_argument(
+        '--no-race',
+        action='store_true',
+        help='Do not race the first fallback service in parallel'
+    )
+    parser.add_argument(
+        '--wait-url',
+        help='Instead of uploading, wait until this URL serves the video (size checked against --video)'
+    )
+    parser.add_argument(
+        '--timeout',
+        type=float,
+        default=300,
+        help='Seconds to wait with --wait-url (default: 300)'
+    )
+    parser.add_argument(
+        '--interval',
+        type=float,
+        default=SERVABLE_POLL_INTERVAL,
+        help=f'Seconds between checks with --wait-url (default: {SERVABLE_POLL_INTERVAL})'
+    )
     
     args = parser.parse_args()
     
-    url = upload_video(args.video, args.service)
+    if args.wait_url:
+        size = Path(args.video).stat().st_size if args.video else None
+        elapsed = wait_until_servable(args.wait_url, size, args.timeout, args.interval)
+        sys.exit(0 if elapsed is not None else 1)
+    if not args.video:
+        parser.error('--video is required')
+    
+    url = upload_video(args.video, args.service, race=UPLOAD_RACE and not args.no_race)
     
     if url:
         print(f"\n✅ Success! Public URL:")
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Lease-based work queue on top of the group tracker.
+A worker claims the next unpublished group for a limited time (a lease),
+heartbeats while rendering and publishing, then completes it (which marks
+the group published in the tracker) or releases it. Leases live in a
+SQLite database and claims run in an IMMEDIATE transaction, so parallel
+workers never hold the same group. A lease that is not renewed expires and
+the group becomes claimable again.
+
+All workers must see the same database file (WORK_QUEUE_DB) and the same
+tracker files: several processes or threads on one machine, or runners
+sharing a volume. Separate CI runners with their own checkouts cannot
+coordinate through it.
+"""
+
+import argparse
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from group_tracker import get_next_group, iter_scheduled_groups, load_state, mark_group_published
+from media_cache import CACHE_DIR
+
+WORK_QUEUE_DB = Path(os.environ.get("WORK_QUEUE_DB", str(CACHE_DIR / "work_queue.sqlite3")))
+
+# Lease length in seconds; workers should heartbeat well before it runs out
+LEASE_TTL = int(os.environ.get("LEASE_TTL", "1800"))
+
+# Upper bound on scheduled groups inspected per claim (skipping leased ones)
+MAX_CLAIM_SCAN = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    group_id TEXT PRIMARY KEY,
+    token TEXT NOT NULL,
+    worker TEXT NOT NULL,
+    claimed_at REAL NOT NULL,
+    heartbeat_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS leases_expiry ON leases (expires_at);
+"""
+
+
+def default_worker_id() -> str:
+    """Worker name: WORKER_ID, else host:pid (plus the CI run id when set)."""
+    worker = os.environ.get("WORKER_ID")
+    if worker:
+        return worker
+    run_id = os.environ.get("GITHUB_RUN_ID")
+    return f"{socket.gethostname()}:{os.getpid()}" + (f":run{run_id}" if run_id else "")
+
+
+class WorkQueue:
+    """
+    Claim/heartbeat/complete/release leases on groups.
+
+    Each lease carries a random token; only the holder of the current token
+    can renew, complete or release it, so a worker whose lease expired and
+    was re-claimed cannot clobber the new holder.
+    """
+
+    def __init__(self, db_path: Path = WORK_QUEUE_DB, lease_ttl: int = LEASE_TTL):
+        self.db_path = Path(db_path)
+        self.lease_ttl = lease_ttl
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None, check_same_thread=False)
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _transaction(self, work):
+        """Run work(conn) inside one write transaction."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(conn)
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return result
+
+    def claim(self, worker: Optional[str] = None, ttl: Optional[int] = None,
+              candidates: Optional[Iterable[str]] = None) -> Optional[Dict]:
+        """
+        Lease the first scheduled, unpublished group nobody else holds.
+
+        Args:
+            worker: Worker name recorded on the lease (default default_worker_id())
+            ttl: Lease length in seconds (default LEASE_TTL)
+            candidates: Group ids to consider, in order (default: the tracker schedule)
+
+        Returns:
+            Lease dict ({'group_id', 'token', 'worker', 'expires_at'}), or None if nothing is free
+        """
+        worker = worker or default_worker_id()
+        ttl = ttl or self.lease_ttl
+
+        def work(conn):
+            now = time.time()
+            conn.execute("DELETE FROM leases WHERE expires_at <= ?", (now,))
+            held = {row[0] for row in conn.execute("SELECT group_id FROM leases")}
+            # Re-read the tracker inside the transaction so groups completed by others are skipped
+            published = load_state()['published']
+            groups = candidates if candidates is not None else iter_scheduled_groups()
+            for scanned, group_id in enumerate(groups):
+                if scanned >= MAX_CLAIM_SCAN:
+                    break
+                if group_id in held or group_id in published:
+                    continue
+                lease = {'group_id': group_id, 'token': uuid.uuid4().hex, 'worker': worker, 'expires_at': now + ttl}
+                conn.execute(
+                    "INSERT INTO leases (group_id, token, worker, claimed_at, heartbeat_at, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (group_id, lease['token'], worker, now, now, lease['expires_at'])
+                )
+                return lease
+            return None
+
+        return self._transaction(work)
+
+    def heartbeat(self, group_id: str, token: str, ttl: Optional[int] = None) -> bool:
+        """Extend a lease; False if it is no longer held with this token."""
+        ttl = ttl or self.lease_ttl
+
+        def work(conn):
+            now = time.time()
+            cursor = conn.execute(
+                "UPDATE leases SET heartbeat_at = ?, expires_at = ? WHERE group_id = ? AND token = ?",
+                (now, now + ttl, group_id, token)
+            )
+            return cursor.rowcount == 1
+
+        return self._transaction(work)
+
+    def complete(self, group_id: str, token: str, success: bool = True) -> bool:
+        """
+        Finish a lease: mark the group in the tracker and drop the lease.
+
+        Returns:
+            False (and leaves the tracker alone) if the lease was lost
+        """
+        def work(conn):
+            row = conn.execute("SELECT token FROM leases WHERE group_id = ?", (group_id,)).fetchone()
+            if not row or row[0] != token:
+                return False
+            mark_group_published(group_id, success)
+            conn.execute("DELETE FROM leases WHERE group_id = ?", (group_id,))
+            return True
+
+        completed = self._transaction(work)
+        if not completed:
+            print(f"Lease on {group_id} was lost (expired or claimed by another worker)")
+        return completed
+
+    def release(self, group_id: str, token: str) -> bool:
+        """Give a group back without publishing it."""
+        def work(conn):
+            cursor = conn.execute("DELETE FROM leases WHERE group_id = ? AND token = ?", (group_id, token))
+            return cursor.rowcount == 1
+
+        return self._transaction(work)
+
+    def active_leases(self) -> List[Dict]:
+        """Unexpired leases, oldest claim first."""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT group_id, worker, claimed_at, heartbeat_at, expires_at FROM leases "
+                "WHERE expires_at > ? ORDER BY claimed_at", (time.time(),)
+            ).fetchall()
+        keys = ('group_id', 'worker', 'claimed_at', 'heartbeat_at', 'expires_at')
+        return [dict(zip(keys, row)) for row in rows]
+
+
+_work_queue: Optional[WorkQueue] = None
+_work_queue_lock = threading.Lock()
+
+
+def get_work_queue() -> WorkQueue:
+    """Get the shared work queue (one open connection per process)."""
+    global _work_queue
+    with _work_queue_lock:
+        if _work_queue is None:
+            _work_queue = WorkQueue()
+        return _work_queue
+
+
+class LeaseHeartbeat:
+    """
+    Background thread that renews a lease every interval seconds.
+
+    Use as a context manager around long work (rendering, uploading), or
+    start()/stop() it when the work spans several threads. `lost` is set if
+    a renewal fails.
+    """
+
+    def __init__(self, queue: WorkQueue, lease: Dict, interval: Optional[float] = None):
+        self.queue = queue
+        self.lease = lease
+        self.interval = interval or max(queue.lease_ttl / 3, 1)
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{lease['group_id']}", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                renewed = self.queue.heartbeat(self.lease['group_id'], self.lease['token'])
+            except Exception as e:
+                print(f"Heartbeat for {self.lease['group_id']} failed: {e}")
+                continue
+            if not renewed:
+                print(f"Lease on {self.lease['group_id']} was lost")
+                self.lost.set()
+                return
+
+    def start(self) -> 'LeaseHeartbeat':
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Lease groups to parallel workers',
+        epilog="""
+Examples:
+  # Claim the next free group (prints GROUP_ID=... and LEASE_TOKEN=...)
+  python work_queue.py claim --ttl 1800
+
+  # Keep the lease alive, then finish it
+  python work_queue.py heartbeat reciter1_s001_001-007 <token>
+  python work_queue.py complete reciter1_s001_001-007 <token>
+
+  # Give the group back after a failure
+  python work_queue.py release reciter1_s001_001-007 <token>
+        """
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    claim = subparsers.add_parser('claim', help='Lease the next free group')
+    claim.add_argument('--ttl', type=int, default=LEASE_TTL, help=f'Lease length in seconds (default: {LEASE_TTL})')
+    claim.add_argument('--worker', type=str, help='Worker name (default: WORKER_ID or host:pid)')
+    for name, help_text in (('heartbeat', 'Extend a lease'), ('complete', 'Mark published and drop the lease'),
+                            ('release', 'Drop a lease without publishing')):
+        command = subparsers.add_parser(name, help=help_text)
+        command.add_argument('group_id')
+        command.add_argument('token')
+        if name == 'heartbeat':
+            command.add_argument('--ttl', type=int, default=LEASE_TTL, help='New lease length in seconds')
+        if name == 'complete':
+            command.add_argument('--failed', action='store_true', help='Record a failed publish')
+    subparsers.add_parser('status', help='List active leases')
+
+    args = parser.parse_args()
+    queue = get_work_queue()
+
+    if args.command == 'claim':
+        lease = queue.claim(args.worker, args.ttl)
+        if not lease and get_next_group():
+            # Either every group was published (get_next_group reset the tracker) or the rest are leased
+            lease = queue.claim(args.worker, args.ttl)
+        if not lease:
+            print("No group available to claim")
+            sys.exit(1)
+        print(f"Claimed {lease['group_id']} for {lease['worker']} ({args.ttl}s lease)")
+        print(f"GROUP_ID={lease['group_id']}")
+        print(f"LEASE_TOKEN={lease['token']}")
+    elif args.command == 'heartbeat':
+        sys.exit(0 if queue.heartbeat(args.group_id, args.token, args.ttl) else 1)
+    elif args.command == 'complete':
+        sys.exit(0 if queue.complete(args.group_id, args.token, not args.failed) else 1)
+    elif args.command == 'release':
+        sys.exit(0 if queue.release(args.group_id, args.token) else 1)
+    else:
+        leases = queue.active_leases()
+        print(f"{len(leases)} active leases")
+        for lease in leases:
+            remaining = lease['expires_at'] - time.time()
+            print(f"  {lease['group_id']}: {lease['worker']} ({remaining:.0f}s left)")
+
+
+if __name__ == "__main__":
+    main()